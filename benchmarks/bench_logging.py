@@ -0,0 +1,55 @@
+"""
+Status and heartbeat callback throughput with the package logger at DEBUG level and with logging disabled.
+
+Usage: python -m benchmarks.bench_logging [--messages N]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, cast
+
+import asyncio_mqtt as aiomqtt
+
+from inels_mqtt_wrapper import RFTI10B, GatewayRouter, logger
+
+from .fake_client import FakeClient
+
+MAC_ADDRESS = "00:00:00:00:00:00"
+
+
+def measure(callback: Callable[[bytes], None], payload: bytes, messages: int) -> float:
+    started_at = time.perf_counter()
+    for _ in range(messages):
+        callback(payload)
+    return messages / (time.perf_counter() - started_at)
+
+
+async def main(messages: int) -> None:
+    client = cast(aiomqtt.Client, FakeClient())
+    router = GatewayRouter(mac_address=MAC_ADDRESS, mqtt_client=client)
+    device = RFTI10B(mac_address=MAC_ADDRESS, device_address="000001", mqtt_client=client, router=router)
+
+    with Path(os.devnull).open("w") as devnull:
+        handler = logging.StreamHandler(devnull)
+        for level in (logging.DEBUG, logging.WARNING):
+            logger.setLevel(level)
+            logger.addHandler(handler)
+            status_rate = measure(device._status_callback, b"00 66 08 66 08", messages)
+            heartbeat_rate = measure(device._connected_callback, b"on", messages)
+            logger.removeHandler(handler)
+            sys.stdout.write(
+                f"{logging.getLevelName(level):>7}: status {status_rate:>12,.0f} msg/s, "
+                f"heartbeat {heartbeat_rate:>12,.0f} msg/s\n"
+            )
+
+    await router.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100_000)
+    asyncio.run(main(parser.parse_args().messages))
@@ -0,0 +1,69 @@
+"""
+Throughput of the instrumented hot paths (router dispatch of status and heartbeat messages, 'set' publishing)
+with the metrics registry disabled and enabled. Each figure is the best of several rounds.
+
+Usage: python -m benchmarks.bench_metrics [--messages N] [--rounds N]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Awaitable, Callable, cast
+
+import asyncio_mqtt as aiomqtt
+
+from inels_mqtt_wrapper import RFDAC71B, GatewayRouter, metrics
+
+from .fake_client import NullClient
+
+MAC_ADDRESS = "00:00:00:00:00:00"
+
+
+def measure(callback: Callable[[], object], messages: int, rounds: int) -> float:
+    best = 0.0
+    for _ in range(rounds):
+        started_at = time.perf_counter()
+        for _ in range(messages):
+            callback()
+        best = max(best, messages / (time.perf_counter() - started_at))
+    return best
+
+
+async def measure_async(callback: Callable[[], Awaitable[None]], messages: int, rounds: int) -> float:
+    best = 0.0
+    for _ in range(rounds):
+        started_at = time.perf_counter()
+        for _ in range(messages):
+            await callback()
+        best = max(best, messages / (time.perf_counter() - started_at))
+    return best
+
+
+async def main(messages: int, rounds: int) -> None:
+    client = cast(aiomqtt.Client, NullClient())
+    router = GatewayRouter(mac_address=MAC_ADDRESS, mqtt_client=client)
+    device = RFDAC71B(mac_address=MAC_ADDRESS, device_address="000001", mqtt_client=client, router=router)
+    status_topic = "inels/status/000000000000/05/000001"
+    connected_topic = "inels/connected/000000000000/05/000001"
+
+    for enabled in (False, True):
+        metrics.enabled = enabled
+        status_rate = measure(lambda: router.dispatch(status_topic, b"B1 DF"), messages, rounds)
+        heartbeat_rate = measure(lambda: router.dispatch(connected_topic, b"on"), messages, rounds)
+        publish_rate = await measure_async(device.toggle_switch, messages, rounds)
+        sys.stdout.write(
+            f"metrics {'enabled' if enabled else 'disabled':>8}: status {status_rate:>12,.0f} msg/s, "
+            f"heartbeat {heartbeat_rate:>12,.0f} msg/s, publish {publish_rate:>12,.0f} msg/s\n"
+        )
+
+    metrics.disable()
+    metrics.reset()
+    await router.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.rounds))
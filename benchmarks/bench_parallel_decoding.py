@@ -0,0 +1,118 @@
+"""
+Throughput of the status ingestion with the statuses decoded inline on the event loop and in a ParallelDecoder
+with an increasing number of worker processes. Every status is read in full by a status callback, so that
+the lazily decoded inline statuses are decoded as well.
+
+The workers only add throughput when there are spare CPU cores: on a machine with a single core the pickling
+of the batches makes the parallel decoding slower than the inline one.
+
+Usage: python -m benchmarks.bench_parallel_decoding [--messages N] [--devices N] [--workers 1 2 4]
+    [--batch-size N]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import List, Optional, cast
+
+import asyncio_mqtt as aiomqtt
+
+from inels_mqtt_wrapper import (
+    RFATV2,
+    RFDAC71B,
+    RFGB40,
+    RFJA12B,
+    RFSA66M,
+    RFTC10G,
+    RFTI10B,
+    GatewayRouter,
+    ParallelDecoder,
+    background_tasks,
+)
+from inels_mqtt_wrapper.AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus
+from inels_mqtt_wrapper.StatusDecoder import StatusDataType
+
+from .fake_client import NullClient
+from .suite import STATUS_SAMPLES
+
+MAC_ADDRESS = "00:00:00:00:00:00"
+TOPIC_MAC_ADDRESS = MAC_ADDRESS.replace(":", "")
+DEVICE_CLASSES = (RFSA66M, RFJA12B, RFDAC71B, RFATV2, RFTI10B, RFTC10G, RFGB40)
+# Messages dispatched between yielding to the event loop, like a burst read from the socket
+BURST_SIZE = 500
+
+
+def read_all_fields(status: StatusDataType) -> None:
+    for _ in status.values():
+        pass
+
+
+async def measure(messages: int, device_count: int, workers: Optional[int], batch_size: int) -> float:
+    """
+    Dispatch the status messages to the devices and wait until all of them are decoded and applied.
+
+    :param messages: The number of status messages
+    :param device_count: The number of devices
+    :param workers: The number of worker processes, None for the inline decoding
+    :param batch_size: The number of messages in a batch sent to a worker
+    :return: The number of status messages applied per second
+    """
+    client = cast(aiomqtt.Client, NullClient())
+    router = GatewayRouter(mac_address=MAC_ADDRESS, mqtt_client=client)
+    devices: List[AbstractDeviceSupportsStatus] = []
+    for i in range(device_count):
+        device_class = DEVICE_CLASSES[i % len(DEVICE_CLASSES)]
+        device: AbstractDeviceSupportsStatus = device_class(
+            mac_address=MAC_ADDRESS, device_address=f"{i:06X}", mqtt_client=client, router=router
+        )
+        device.add_status_callback(read_all_fields)
+        devices.append(device)
+    topics = [f"inels/status/{TOPIC_MAC_ADDRESS}/{device.device_type}/{device.device_address}" for device in devices]
+    payloads = [STATUS_SAMPLES[device.device_type][1] for device in devices]
+
+    decoder = None
+    if workers is not None:
+        decoder = ParallelDecoder(max_workers=workers, batch_size=batch_size)
+        decoder.attach(*devices)
+        # Start the worker processes before measuring
+        decoder.submit(devices[0], payloads[0])
+        await decoder.drain()
+
+    started_at = time.perf_counter()
+    for i in range(messages):
+        router.dispatch(topics[i % device_count], payloads[i % device_count])
+        if i % BURST_SIZE == BURST_SIZE - 1:
+            await asyncio.sleep(0)
+    if decoder is not None:
+        await decoder.drain()
+    elapsed_sec = time.perf_counter() - started_at
+
+    if decoder is not None:
+        await decoder.aclose()
+    for device in devices:
+        await device.aclose()
+    await router.aclose()
+    await background_tasks.aclose_all()
+    return messages / elapsed_sec
+
+
+async def main(args: argparse.Namespace) -> None:
+    sys.stdout.write(f"{args.messages} status messages, {args.devices} devices, {os.cpu_count()} CPUs\n")
+    inline_throughput = await measure(args.messages, args.devices, None, args.batch_size)
+    sys.stdout.write(f"{'inline':>12}: {inline_throughput:>12,.0f} statuses/s\n")
+    for workers in args.workers:
+        throughput = await measure(args.messages, args.devices, workers, args.batch_size)
+        sys.stdout.write(
+            f"{f'{workers} workers':>12}: {throughput:>12,.0f} statuses/s "
+            f"({throughput / inline_throughput:.2f}x inline)\n"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--batch-size", type=int, default=256)
+    asyncio.run(main(parser.parse_args()))
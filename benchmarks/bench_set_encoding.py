@@ -0,0 +1,83 @@
+"""
+Throughput of the 'set' commands with the payloads encoded on every publish (as the commands did
+before the per-class encoded payload tables) and with the encoded payloads looked up in the tables.
+
+Usage: python -m benchmarks.bench_set_encoding [--commands N]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Any, Awaitable, Callable, cast
+
+import asyncio_mqtt as aiomqtt
+
+from inels_mqtt_wrapper import RFDAC71B, RFSA66M, GatewayRouter
+from inels_mqtt_wrapper.AbstractDeviceSupportsSet import AbstractDeviceSupportsSet
+
+from .fake_client import NullClient
+
+MAC_ADDRESS = "00:00:00:00:00:00"
+
+
+def encode_on_publish(device: AbstractDeviceSupportsSet, payload: bytes) -> str:
+    """The encoding the commands performed on every publish before the encoded payloads were cached"""
+    payload_copy = bytearray(payload)
+    payload_copy.extend(bytearray(0 for _ in range(device.set_message_len_bytes - len(payload_copy))))
+    return payload_copy.hex(" ").upper()
+
+
+def encode_cached(device: AbstractDeviceSupportsSet, payload: bytes) -> str:
+    return device._encoded_set_payloads[payload]
+
+
+async def measure_commands(command: Callable[[], Awaitable[None]], commands: int) -> float:
+    started_at = time.perf_counter()
+    for _ in range(commands):
+        await command()
+    return commands / (time.perf_counter() - started_at)
+
+
+def measure_encoding(encode: Callable[[AbstractDeviceSupportsSet, bytes], str], device: Any, commands: int) -> float:
+    started_at = time.perf_counter()
+    for _ in range(commands):
+        encode(device, b"\x01")
+    return commands / (time.perf_counter() - started_at)
+
+
+async def main(commands: int) -> None:
+    client = cast(aiomqtt.Client, NullClient())
+    router = GatewayRouter(mac_address=MAC_ADDRESS, mqtt_client=client)
+    switch = RFSA66M(mac_address=MAC_ADDRESS, device_address="000001", mqtt_client=client, router=router)
+    dimmer = RFDAC71B(mac_address=MAC_ADDRESS, device_address="000002", mqtt_client=client, router=router)
+    brightness_payload = dimmer._brightness_payloads[50]
+
+    async def switch_on_encoded_on_publish() -> None:
+        await switch._publish_encoded_payload(encode_on_publish(switch, b"\x01"))
+
+    async def set_brightness_encoded_on_publish() -> None:
+        await dimmer._publish_encoded_payload(encode_on_publish(dimmer, brightness_payload))
+
+    sys.stdout.write("Encoding only:\n")
+    sys.stdout.write(
+        f"{'encoded on publish':>32}: {measure_encoding(encode_on_publish, switch, commands):>12,.0f} commands/s\n"
+    )
+    sys.stdout.write(f"{'cached':>32}: {measure_encoding(encode_cached, switch, commands):>12,.0f} commands/s\n")
+
+    sys.stdout.write("Commands:\n")
+    cases = {
+        "switch_on, encoded on publish": switch_on_encoded_on_publish,
+        "switch_on, cached": switch.switch_on,
+        "set_brightness, encoded on publish": set_brightness_encoded_on_publish,
+        "set_brightness, cached": lambda: dimmer.set_brightness_percentage(50),
+    }
+    for name, command in cases.items():
+        sys.stdout.write(f"{name:>36}: {await measure_commands(command, commands):>12,.0f} commands/s\n")
+
+    await router.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commands", type=int, default=500_000)
+    asyncio.run(main(parser.parse_args().commands))
@@ -0,0 +1,118 @@
+"""
+End-to-end load test against the device simulator: thousands of virtual devices behind one gateway router
+send heartbeats and status messages while confirmed commands are sent to the dimmers, with optional faults.
+
+Usage: python -m benchmarks.bench_simulator [--devices-per-type N] [--duration SEC] [--status-interval SEC]
+    [--drop-rate R] [--malformed-rate R] [--max-response-delay SEC]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from typing import cast
+
+import asyncio_mqtt as aiomqtt
+
+from inels_mqtt_wrapper import (
+    RFATV2,
+    RFDAC71B,
+    RFGB40,
+    RFJA12B,
+    RFSA66M,
+    RFTC10G,
+    RFTI10B,
+    CommandNotConfirmedError,
+    GatewayRouter,
+    background_tasks,
+    confirmation_latency,
+    logger,
+    metrics,
+)
+from inels_mqtt_wrapper.simulator import DeviceSimulator, FaultProfile, SimulatedClient
+
+MAC_ADDRESS = "00:00:00:00:00:00"
+DEVICE_CLASSES = {
+    "02": RFSA66M,
+    "03": RFJA12B,
+    "05": RFDAC71B,
+    "09": RFATV2,
+    "10": RFTI10B,
+    "12": RFTC10G,
+    "19": RFGB40,
+}
+
+
+async def main(args: argparse.Namespace) -> None:
+    client = SimulatedClient()
+    simulator = DeviceSimulator(
+        client,
+        mac_address=MAC_ADDRESS,
+        heartbeat_interval_sec=args.status_interval * 5,
+        status_interval_sec=args.status_interval,
+        faults=FaultProfile(
+            drop_rate=args.drop_rate,
+            malformed_rate=args.malformed_rate,
+            response_delay_sec=(0.0, args.max_response_delay),
+        ),
+        seed=0,
+    )
+    for device_type in DEVICE_CLASSES:
+        simulator.add_devices(device_type, args.devices_per_type)
+
+    router = GatewayRouter(mac_address=MAC_ADDRESS, mqtt_client=cast(aiomqtt.Client, client))
+    devices = [
+        DEVICE_CLASSES[virtual_device.device_type](
+            mac_address=MAC_ADDRESS,
+            device_address=virtual_device.device_address,
+            mqtt_client=cast(aiomqtt.Client, client),
+            router=router,
+        )
+        for virtual_device in simulator.devices
+    ]
+    dimmers = [device for device in devices if isinstance(device, RFDAC71B)]
+
+    metrics.enable()
+    simulator.start()
+    started_at = time.perf_counter()
+    unconfirmed_commands = 0
+    i = 0
+    while time.perf_counter() - started_at < args.duration:
+        try:
+            await dimmers[i % len(dimmers)].set_brightness_percentage_confirmed(i % 11 * 10, timeout_sec=1)
+        except CommandNotConfirmedError:
+            unconfirmed_commands += 1
+        i += 1
+    elapsed_sec = time.perf_counter() - started_at
+
+    received = sum(metrics.messages_received.values())
+    latency = confirmation_latency["05"]
+    sys.stdout.write(f"Devices: {len(devices)}, duration: {elapsed_sec:.1f}s\n")
+    sys.stdout.write(
+        f"Messages sent by the simulator: {simulator.sent_messages} ({simulator.dropped_messages} dropped)\n"
+    )
+    sys.stdout.write(f"Messages received by the devices: {received} ({received / elapsed_sec:,.0f} msg/s)\n")
+    sys.stdout.write(
+        f"Decode errors: {sum(metrics.decode_errors.values())} ({simulator.malformed_messages} malformed messages)\n"
+    )
+    sys.stdout.write(f"Connected devices: {sum(device.is_connected for device in devices)}\n")
+    sys.stdout.write(
+        f"Confirmed commands: {latency.count}, unconfirmed: {unconfirmed_commands}, "
+        f"latency p50 <= {latency.quantile(0.5)}s, p99 <= {latency.quantile(0.99)}s\n"
+    )
+
+    metrics.disable()
+    await background_tasks.aclose_all()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices-per-type", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--status-interval", type=float, default=1.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--max-response-delay", type=float, default=0.0)
+    # The malformed messages are logged as errors, which would flood the output
+    logger.setLevel(logging.CRITICAL)
+    asyncio.run(main(parser.parse_args()))
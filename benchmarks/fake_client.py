@@ -0,0 +1,74 @@
+import asyncio
+import contextlib
+from typing import Any, AsyncGenerator, AsyncIterator, List, Tuple, Union
+
+from paho.mqtt.client import topic_matches_sub
+
+
+class FakeMessage:
+    """A stand-in for paho.mqtt.client.MQTTMessage"""
+
+    def __init__(self, topic: str, payload: bytes) -> None:
+        self.topic = topic
+        self.payload = payload
+
+
+class FakeClient:
+    """
+    An in-process stand-in for asyncio_mqtt.Client. Nothing is sent over the network:
+    subscriptions and publications are counted and the messages are delivered with 'inject()'.
+    """
+
+    def __init__(self) -> None:
+        self.subscribe_calls = 0
+        self.unsubscribe_calls = 0
+        self.published: List[Tuple[str, Any]] = []
+        self._filters: List[Tuple[str, "asyncio.Queue[FakeMessage]"]] = []
+
+    async def subscribe(self, topic: Union[str, List[Tuple[str, int]]], *args: Any, **kwargs: Any) -> None:
+        self.subscribe_calls += 1
+
+    async def unsubscribe(self, topic: Union[str, List[str]], *args: Any, **kwargs: Any) -> None:
+        self.unsubscribe_calls += 1
+
+    async def publish(self, topic: str, payload: Any = None, *args: Any, **kwargs: Any) -> None:
+        self.published.append((topic, payload))
+
+    @contextlib.asynccontextmanager
+    async def filtered_messages(
+        self, topic_filter: str, *, queue_maxsize: int = 0
+    ) -> AsyncIterator[AsyncGenerator[FakeMessage, None]]:
+        queue: "asyncio.Queue[FakeMessage]" = asyncio.Queue(maxsize=queue_maxsize)
+        entry = (topic_filter, queue)
+        self._filters.append(entry)
+
+        async def messages() -> AsyncGenerator[FakeMessage, None]:
+            while True:
+                yield await queue.get()
+
+        try:
+            yield messages()
+        finally:
+            self._filters.remove(entry)
+
+    def inject(self, topic: str, payload: bytes) -> int:
+        """
+        Deliver the message to every listener with a matching topic filter.
+
+        :param topic: The topic of the message
+        :param payload: The payload of the message
+        :return: The number of listeners the message was delivered to
+        """
+        delivered = 0
+        for topic_filter, queue in self._filters:
+            if topic_matches_sub(topic_filter, topic):
+                queue.put_nowait(FakeMessage(topic, payload))
+                delivered += 1
+        return delivered
+
+
+class NullClient(FakeClient):
+    """A FakeClient dropping the published messages to keep the measurements focused on the library code"""
+
+    async def publish(self, topic: str, payload: Any = None, *args: Any, **kwargs: Any) -> None:
+        pass
@@ -0,0 +1,293 @@
+"""
+Benchmark suite for the decode, dispatch and publish hot paths, run offline against an in-process fake MQTT client.
+
+Every benchmark reports the throughput and the p50/p99 latency of a single operation. The results are written
+as JSON, so that the runs of different versions can be compared with '--compare'.
+
+Usage: python -m benchmarks.suite [--output results.json] [--compare baseline.json] [--quick] [--filter NAME]
+"""
+import argparse
+import asyncio
+import functools
+import itertools
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, cast
+
+import asyncio_mqtt as aiomqtt
+
+from inels_mqtt_wrapper import (
+    RFATV2,
+    RFDAC71B,
+    RFGB40,
+    RFJA12B,
+    RFSA66M,
+    RFTC10G,
+    RFTI10B,
+    GatewayRouter,
+    background_tasks,
+)
+
+from .fake_client import NullClient
+
+MAC_ADDRESS = "00:00:00:00:00:00"
+TOPIC_MAC_ADDRESS = MAC_ADDRESS.replace(":", "")
+
+# A concrete device of every interface supporting the 'status' topic and a valid status message for it
+STATUS_SAMPLES: Dict[str, Any] = {
+    "02": (RFSA66M, b"02 01"),
+    "03": (RFJA12B, b"03 00"),
+    "05": (RFDAC71B, b"B1 DF"),
+    "09": (RFATV2, b"64 28 00 2B 00"),
+    "10": (RFTI10B, b"00 66 08 66 08"),
+    "12": (RFTC10G, b"2A 00 01 00 00"),
+    "19": (RFGB40, b"90 02 00 00 00"),
+}
+DISPATCH_DEVICE_COUNTS = (10, 100, 1000, 5000)
+STARTUP_DEVICE_COUNTS = (100, 1000, 5000)
+
+
+def _result(name: str, samples_ns: List[int], total_ns: int, **params: Any) -> Dict[str, Any]:
+    """
+    Summarize the timings of a benchmark.
+
+    :param name: The benchmark name
+    :param samples_ns: The durations of the individual operations in nanoseconds
+    :param total_ns: The duration of the whole run in nanoseconds
+    :param params: The benchmark parameters
+    :return: A dict containing the benchmark name, parameters, throughput and latency percentiles
+    """
+    samples_ns = sorted(samples_ns)
+    ops = len(samples_ns)
+    return {
+        "name": name,
+        "params": params,
+        "ops": ops,
+        "total_sec": total_ns / 1e9,
+        "ops_per_sec": ops / (total_ns / 1e9),
+        "p50_us": samples_ns[ops // 2] / 1e3,
+        "p99_us": samples_ns[min(ops - 1, int(ops * 0.99))] / 1e3,
+    }
+
+
+def measure(name: str, operation: Callable[[], object], ops: int, **params: Any) -> Dict[str, Any]:
+    """
+    Run the operation the given number of times after a short warm-up, timing every run.
+
+    :param name: The benchmark name
+    :param operation: The operation to measure
+    :param ops: The number of runs
+    :param params: The benchmark parameters
+    :return: The benchmark result
+    """
+    for _ in range(max(ops // 10, 1)):
+        operation()
+
+    clock = time.perf_counter_ns
+    samples_ns = [0] * ops
+    started_at = clock()
+    for i in range(ops):
+        operation_started_at = clock()
+        operation()
+        samples_ns[i] = clock() - operation_started_at
+    return _result(name, samples_ns, clock() - started_at, **params)
+
+
+async def measure_async(name: str, operation: Callable[[], Awaitable[None]], ops: int, **params: Any) -> Dict[str, Any]:
+    """
+    Same as measure(), but for coroutine functions.
+
+    :param name: The benchmark name
+    :param operation: The coroutine function to measure
+    :param ops: The number of runs
+    :param params: The benchmark parameters
+    :return: The benchmark result
+    """
+    for _ in range(max(ops // 10, 1)):
+        await operation()
+
+    clock = time.perf_counter_ns
+    samples_ns = [0] * ops
+    started_at = clock()
+    for i in range(ops):
+        operation_started_at = clock()
+        await operation()
+        samples_ns[i] = clock() - operation_started_at
+    return _result(name, samples_ns, clock() - started_at, **params)
+
+
+def _device_address(index: int) -> str:
+    return f"{index:06X}"
+
+
+def _dispatch_next(router: GatewayRouter, topics: Iterator[str], payload: bytes) -> bool:
+    return router.dispatch(next(topics), payload)
+
+
+async def bench_decode(ops: int) -> List[Dict[str, Any]]:
+    results = []
+    for device_type, (device_class, payload) in STATUS_SAMPLES.items():
+        status_data = bytes.fromhex(payload.decode("ascii"))
+        decode = functools.partial(device_class._decode_status, status_data)
+        results.append(measure("decode_status", decode, ops, device_type=device_type))
+    return results
+
+
+async def bench_status_callback(ops: int) -> List[Dict[str, Any]]:
+    client = cast(aiomqtt.Client, NullClient())
+    router = GatewayRouter(mac_address=MAC_ADDRESS, mqtt_client=client)
+    results = []
+    for device_type, (device_class, payload) in STATUS_SAMPLES.items():
+        device = device_class(mac_address=MAC_ADDRESS, device_address="000001", mqtt_client=client, router=router)
+        status_callback = functools.partial(device._status_callback, payload)
+        results.append(measure("status_callback", status_callback, ops, device_type=device_type))
+    await background_tasks.aclose_all()
+    return results
+
+
+async def bench_dispatch(ops: int) -> List[Dict[str, Any]]:
+    results = []
+    _, payload = STATUS_SAMPLES["10"]
+    for device_count in DISPATCH_DEVICE_COUNTS:
+        client = cast(aiomqtt.Client, NullClient())
+        router = GatewayRouter(mac_address=MAC_ADDRESS, mqtt_client=client)
+        for i in range(device_count):
+            RFTI10B(mac_address=MAC_ADDRESS, device_address=_device_address(i), mqtt_client=client, router=router)
+
+        topics = [f"inels/status/{TOPIC_MAC_ADDRESS}/10/{_device_address(i)}" for i in range(device_count)]
+        dispatch = functools.partial(_dispatch_next, router, itertools.cycle(topics), payload)
+        results.append(measure("dispatch", dispatch, ops, devices=device_count))
+        await background_tasks.aclose_all()
+    return results
+
+
+async def bench_startup(ops: int) -> List[Dict[str, Any]]:
+    results = []
+    for device_count in STARTUP_DEVICE_COUNTS:
+        for use_router in (True, False):
+            if not use_router and device_count > 1000:
+                # Every device without a router runs two listener tasks, which is not the intended setup at this scale
+                continue
+
+            client = cast(aiomqtt.Client, NullClient())
+            router = GatewayRouter(mac_address=MAC_ADDRESS, mqtt_client=client) if use_router else None
+            clock = time.perf_counter_ns
+            samples_ns = [0] * device_count
+            started_at = clock()
+            for i in range(device_count):
+                device_started_at = clock()
+                RFTI10B(mac_address=MAC_ADDRESS, device_address=_device_address(i), mqtt_client=client, router=router)
+                samples_ns[i] = clock() - device_started_at
+            # Let the listener tasks start and subscribe
+            await asyncio.sleep(0)
+            results.append(
+                _result("startup", samples_ns, clock() - started_at, devices=device_count, router=use_router)
+            )
+            await background_tasks.aclose_all()
+    return results
+
+
+async def bench_publish(ops: int) -> List[Dict[str, Any]]:
+    client = cast(aiomqtt.Client, NullClient())
+    router = GatewayRouter(mac_address=MAC_ADDRESS, mqtt_client=client)
+    switch = RFSA66M(mac_address=MAC_ADDRESS, device_address="000001", mqtt_client=client, router=router)
+    dimmer = RFDAC71B(mac_address=MAC_ADDRESS, device_address="000002", mqtt_client=client, router=router)
+    results = [
+        await measure_async(
+            "publish", lambda: switch._publish_to_set_topic(bytearray(b"\x01")), ops, device_type="02", cached=False
+        ),
+        await measure_async(
+            "publish", lambda: switch._publish_to_set_topic(b"\x01"), ops, device_type="02", cached=True
+        ),
+        await measure_async(
+            "publish",
+            lambda: dimmer._publish_to_set_topic(bytearray(b"\x01\x9e\x57")),
+            ops,
+            device_type="05",
+            cached=False,
+        ),
+        await measure_async(
+            "publish",
+            lambda: dimmer._publish_to_set_topic(dimmer._brightness_payloads[50]),
+            ops,
+            device_type="05",
+            cached=True,
+        ),
+    ]
+    await background_tasks.aclose_all()
+    return results
+
+
+BENCHMARKS: Dict[str, Callable[[int], Awaitable[List[Dict[str, Any]]]]] = {
+    "decode_status": bench_decode,
+    "status_callback": bench_status_callback,
+    "dispatch": bench_dispatch,
+    "startup": bench_startup,
+    "publish": bench_publish,
+}
+
+
+def _result_key(result: Dict[str, Any]) -> str:
+    params = ",".join(f"{key}={value}" for key, value in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]"
+
+
+def print_results(results: List[Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+    """
+    Print the results as a table, with the throughput relative to the baseline if provided.
+
+    :param results: The benchmark results
+    :param baseline: The baseline results by their keys. Defaults to None
+    :return: None
+    """
+    for result in results:
+        key = _result_key(result)
+        line = (
+            f"{key:<48} {result['ops_per_sec']:>14,.0f} ops/s  "
+            f"p50 {result['p50_us']:>9.2f}us  p99 {result['p99_us']:>9.2f}us"
+        )
+        if baseline is not None and key in baseline:
+            line += f"  x{result['ops_per_sec'] / baseline[key]['ops_per_sec']:.2f} vs baseline"
+        sys.stdout.write(f"{line}\n")
+
+
+async def main(args: argparse.Namespace) -> None:
+    ops = 2_000 if args.quick else args.ops
+    results: List[Dict[str, Any]] = []
+    for name, benchmark in BENCHMARKS.items():
+        if args.filter and args.filter not in name:
+            continue
+        results.extend(await benchmark(ops))
+
+    baseline = None
+    if args.compare:
+        with Path(args.compare).open() as baseline_file:
+            baseline = {_result_key(result): result for result in json.load(baseline_file)["results"]}
+    print_results(results, baseline)
+
+    if args.output:
+        report = {
+            "meta": {
+                "timestamp": time.time(),
+                "python": sys.version,
+                "platform": platform.platform(),
+                "ops": ops,
+            },
+            "results": results,
+        }
+        with Path(args.output).open("w") as output_file:
+            json.dump(report, output_file, indent=2)
+        sys.stdout.write(f"Results written to {args.output}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Path of the JSON file to write the results to")
+    parser.add_argument("--compare", help="Path of a JSON file with the baseline results to compare with")
+    parser.add_argument("--ops", type=int, default=50_000, help="The number of operations per benchmark")
+    parser.add_argument("--quick", action="store_true", help="Run 2000 operations per benchmark for a smoke test")
+    parser.add_argument("--filter", help="Run only the benchmarks whose names contain the given string")
+    asyncio.run(main(parser.parse_args()))
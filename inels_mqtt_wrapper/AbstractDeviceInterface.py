@@ -1,11 +1,20 @@
 import asyncio
+import logging
 import re
-from typing import Any, Callable
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 
 import asyncio_mqtt as aiomqtt
 
 from ._logging import logger
+from ._metrics import message_queue_depth, metrics
 from ._tasks import background_tasks
+from .GatewayRouter import GatewayRouter
+from .SubscriptionBatch import current_subscription_batch, unsubscribe_in_bulk
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .HeartbeatMonitor import HeartbeatMonitor
+    from .traffic_log import TrafficRecorder
 
 
 class AbstractDeviceInterface:
@@ -13,7 +22,16 @@ class AbstractDeviceInterface:
 
     device_type: str = "UNDEFINED"
 
-    def __init__(self, mac_address: str, device_address: str, mqtt_client: aiomqtt.Client) -> None:
+    # Set by TrafficRecorder.start() for all the devices or by TrafficRecorder.attach() for a single device
+    _traffic_recorder: Optional["TrafficRecorder"] = None
+
+    def __init__(
+        self,
+        mac_address: str,
+        device_address: str,
+        mqtt_client: aiomqtt.Client,
+        router: Optional[GatewayRouter] = None,
+    ) -> None:
         assert self.device_type != "UNDEFINED", (
             f"Incomplete interface implementation for class '{self.__class__.__name__}': "
             "'device_type' class field must be overriden in inheriting class."
@@ -31,6 +49,11 @@ class AbstractDeviceInterface:
             device_address_pattern, device_address
         ), f"Invalid device address: {device_address}. Valid pattern: {device_address_pattern}"
 
+        assert router is None or router.mac_address == mac_address, (
+            f"Gateway router MAC address {router.mac_address} does not match "
+            f"the device's gateway MAC address {mac_address}"
+        )
+
         self.mac_address: str = mac_address
         self.device_address: str = device_address
 
@@ -40,11 +63,20 @@ class AbstractDeviceInterface:
         self._connected_topic_name: str = f"inels/connected/{mac_address}/{self.device_type}/{device_address}"
 
         self.is_connected: bool = False
+        self._last_heartbeat_at: Optional[float] = None
+        self._heartbeat_lost: bool = False
+        self._heartbeat_monitor: Optional["HeartbeatMonitor"] = None
 
         self._mqtt_client: aiomqtt.Client = mqtt_client
+        self._router: Optional[GatewayRouter] = router
+        self._listened_topics: Dict[str, str] = {}
+        self._topic_callbacks: Dict[str, Callable[[Any], None]] = {}
 
-        task = asyncio.create_task(self._listen_on_connected_topic())
-        background_tasks.append(task)
+        self._start_listening(
+            topic_kind="connected",
+            topic_name=self._connected_topic_name,
+            callback=self._connected_callback,
+        )
 
         logger.debug(f"Initialized Device interface at {id(self)} for device {self.dev_id}")
 
@@ -52,50 +84,152 @@ class AbstractDeviceInterface:
     def dev_id(self) -> str:
         return f"{self.device_type}:{self.device_address}"
 
-    async def _listen_on_topic(self, topic_name: str, callback: Callable[[Any], None]) -> None:
+    def _start_listening(self, topic_kind: str, topic_name: str, callback: Callable[[Any], None]) -> None:
         """
-        A task for subscribing to a given MQTT topic
-        and feeding the received data to the callback function
+        Start receiving the messages from the given MQTT topic of the device. The callback is
+        registered with the gateway router if the device has one, otherwise a dedicated
+        listener task is started in the background. If a subscription batch is active,
+        the topic is added to it instead of being subscribed to right away.
 
+        :param topic_kind: The kind of the topic: 'connected', 'status' or 'set'
         :param topic_name: The name of the topic to subscribe to
         :param callback: Sync function to execute when a message is received
         :return: None
         """
-        client = self._mqtt_client
-        async with client.filtered_messages(topic_name) as messages:
-            logger.debug(f"Attempting subscribing to the topic {topic_name}")
+        self._listened_topics[topic_kind] = topic_name
+        self._topic_callbacks[topic_kind] = callback
+        if self._router is not None:
+            self._router.register(topic_kind, self.device_type, self.device_address, callback)
+            return
+
+        subscription_batch = current_subscription_batch()
+        if subscription_batch is not None:
+            subscription_batch.add(topic_name)
+
+        background_tasks.spawn(
+            self._listen_on_topic(topic_name, callback, subscribe=subscription_batch is None),
+            owner=self,
+        )
 
-            try:
-                await client.subscribe(topic_name)
-            except Exception as e:
-                logger.error(str(e))
-                raise e
+    def _detach(self) -> Tuple[aiomqtt.Client, List[str]]:
+        """
+        Stop routing the messages to the device and stop tracking its heartbeats.
+        The listener tasks are left to the caller to cancel.
 
-            logger.info(f"Started listening on the {topic_name} topic of the device {self.dev_id}")
+        :return: The device's MQTT client and the topics to unsubscribe from
+        """
+        if self._heartbeat_monitor is not None:
+            self._heartbeat_monitor.untrack(self)
 
-            while True:
-                try:
-                    message = await messages.__anext__()
-                except asyncio.CancelledError:
-                    logger.warning(f"Task cancelled. Stopped listening on topic {topic_name}")
-                    break
+        topics = list(self._listened_topics.values())
+        if self._router is not None:
+            for topic_kind in self._listened_topics:
+                self._router.unregister(topic_kind, self.device_type, self.device_address)
+            # The router's wildcard subscription is shared with the other devices
+            topics = []
 
-                payload = message.payload
-                callback(payload)
+        self._listened_topics.clear()
+        self._topic_callbacks.clear()
+        return self._mqtt_client, topics
 
-    def _connected_callback(self, data: bytes) -> None:
-        data_decoded = data.decode("ascii").strip()
-        logger.debug(f"Received a new heartbeat for device {self.dev_id}: {data_decoded}")
-        self.is_connected = True
+    async def _reconnect(self, mqtt_client: aiomqtt.Client) -> List[str]:
+        """
+        Switch the device to a new MQTT client, e.g. after the connection to the broker has been lost.
+        The device's own listeners are restarted on the new client without subscribing.
 
-    async def _listen_on_connected_topic(self) -> None:
+        :param mqtt_client: The new, connected instance of asyncio_mqtt.Client
+        :return: The topics the caller has to subscribe to
+        """
+        self._mqtt_client = mqtt_client
+        if self._router is not None:
+            return []
+
+        await background_tasks.aclose(self)
+        for topic_kind, topic_name in self._listened_topics.items():
+            background_tasks.spawn(
+                self._listen_on_topic(topic_name, self._topic_callbacks[topic_kind], subscribe=False),
+                owner=self,
+            )
+        return list(self._listened_topics.values())
+
+    def close(self) -> None:
         """
-        A task for subscribing to the device's 'connected' MQTT topic
-        and updating its 'is_connected' field accordingly
+        Stop listening on the device's topics: cancel the device's listener tasks
+        and unsubscribe from its topics in the background.
 
         :return: None
         """
-        await self._listen_on_topic(
-            topic_name=self._connected_topic_name,
-            callback=self._connected_callback,
-        )
+        client, topics = self._detach()
+        background_tasks.cancel(self)
+        if topics:
+            background_tasks.spawn(unsubscribe_in_bulk(client, topics))
+        logger.info(f"Closed device {self.dev_id}")
+
+    async def aclose(self) -> None:
+        """
+        Stop listening on the device's topics: cancel the device's listener tasks,
+        wait for them to finish and unsubscribe from the device's topics.
+
+        :return: None
+        """
+        client, topics = self._detach()
+        await background_tasks.aclose(self)
+        if topics:
+            await unsubscribe_in_bulk(client, topics)
+        logger.info(f"Closed device {self.dev_id}")
+
+    async def _listen_on_topic(
+        self,
+        topic_name: str,
+        callback: Callable[[Any], None],
+        subscribe: bool = True,
+    ) -> None:
+        """
+        A task for subscribing to a given MQTT topic
+        and feeding the received data to the callback function
+
+        :param topic_name: The name of the topic to subscribe to
+        :param callback: Sync function to execute when a message is received
+        :param subscribe: Whether to subscribe to the topic or only listen to it. Defaults to True
+        :return: None
+        """
+        client = self._mqtt_client
+        async with client.filtered_messages(topic_name) as messages:
+            metrics.register_queue(topic_name, lambda: message_queue_depth(messages))
+            try:
+                if subscribe:
+                    logger.debug(f"Attempting subscribing to the topic {topic_name}")
+
+                    try:
+                        await client.subscribe(topic_name)
+                    except Exception as e:
+                        logger.error(str(e))
+                        raise e
+
+                logger.info(f"Started listening on the {topic_name} topic of the device {self.dev_id}")
+
+                while True:
+                    try:
+                        message = await messages.__anext__()
+                    except asyncio.CancelledError:
+                        logger.warning(f"Task cancelled. Stopped listening on topic {topic_name}")
+                        break
+                    except aiomqtt.MqttError as e:
+                        logger.warning(f"Connection lost. Stopped listening on topic {topic_name}: {e}")
+                        break
+
+                    payload = message.payload
+                    callback(payload)
+            finally:
+                metrics.unregister_queue(topic_name)
+
+    def _connected_callback(self, data: bytes) -> None:
+        if self._traffic_recorder is not None:
+            self._traffic_recorder.record("connected", self.device_type, self.device_address, data)
+        if metrics.enabled:
+            metrics.record_message("connected", self.device_type, self.dev_id)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received a new heartbeat for device %s: %s", self.dev_id, data.decode("ascii").strip())
+        self._last_heartbeat_at = time.monotonic()
+        self._heartbeat_lost = False
+        self.is_connected = True
@@ -1,17 +1,69 @@
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+
 from ._logging import logger
+from ._metrics import metrics
 from .AbstractDeviceInterface import AbstractDeviceInterface
+from .CommandScheduler import CommandScheduler
+from .exceptions import DeviceDisconnectedError
 
 
 class AbstractDeviceSupportsSet(AbstractDeviceInterface):
     """A base class for all the device interfaces supporting communication via the 'set' MQTT topic"""
 
     set_message_len_bytes: int = 0
+    # The leading payload bytes identifying the kind of the command
+    set_command_opcode_len_bytes: int = 1
+    # The opcodes of the idempotent commands, e.g. setting a value. A pending command with one of these opcodes
+    # is superseded by a newer command of the same kind when coalesced by a CommandScheduler.
+    # The other commands, e.g. toggles and impulses, are all published in order
+    coalescable_set_opcodes: Tuple[bytes, ...] = ()
+
+    # The payloads of the commands without parameters (or with a small finite set of them).
+    # They are encoded once when the class is defined instead of on every publish
+    cached_set_payloads: Tuple[bytes, ...] = ()
+
+    _command_scheduler: Optional[CommandScheduler] = None
+    _encoded_set_payloads: Dict[bytes, str] = {}
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if "cached_set_payloads" in cls.__dict__:
+            cls._encoded_set_payloads = {
+                payload: cls._encode_set_payload(payload) for payload in cls.cached_set_payloads
+            }
+
+    @classmethod
+    def _encode_set_payload(cls, payload: Union[bytes, bytearray]) -> str:
+        """
+        Pad the payload with zero bytes to the interface's 'set' message length and encode it.
+
+        :param payload: The bytes to be published
+        :return: The payload as a string of space separated hex bytes, e.g. "01 00 00"
+        """
+        target_len = cls.set_message_len_bytes
+        if (l := len(payload)) > target_len:
+            msg = (
+                "Set message payload size exceeds the target length for interface "
+                f"'{cls.__name__}'. Expected {target_len} bytes, got {l} bytes instead."
+            )
+            raise ValueError(msg)
+        return bytes(payload).ljust(target_len, b"\x00").hex(" ").upper()
 
-    async def _publish_to_set_topic(self, payload: bytearray) -> None:
+    async def _publish_to_set_topic(self, payload: Union[bytes, bytearray]) -> None:
         """
         A method for publishing the provided payload to the device's 'set' MQTT topic.
 
-        :param payload: A bytearray object containing the bytes to be published
+        The payloads listed in the 'cached_set_payloads' class field are not encoded again,
+        their encoded form is looked up instead.
+
+        If the device is attached to a CommandScheduler, the payload is queued in it instead of
+        being published right away.
+
+        Raises DeviceDisconnectedError if the device is tracked by a HeartbeatMonitor
+        and has missed its heartbeat.
+
+        :param payload: A bytes or bytearray object containing the bytes to be published
         :return: None
         """
         assert self.set_message_len_bytes != 0, (
@@ -19,21 +71,36 @@ class AbstractDeviceSupportsSet(AbstractDeviceInterface):
             "'set_message_len_bytes' class field must be overriden in inheriting class."
         )
 
-        client = self._mqtt_client
-        target_len = self.set_message_len_bytes
+        if self._heartbeat_lost:
+            raise DeviceDisconnectedError(f"Device {self.dev_id} missed its heartbeat and is considered disconnected")
 
-        if (l := len(payload)) < target_len:
-            payload.extend(bytearray(0 for _ in range(target_len - l)))
-        elif l > target_len:
-            msg = (
-                "Set message payload size exceeds the target length for interface "
-                f"'{self.__class__.__name__}'. Expected {target_len} bytes, got {l} bytes instead."
-            )
-            raise ValueError(msg)
+        payload_encoded = self._encoded_set_payloads.get(payload) if isinstance(payload, bytes) else None
+        if payload_encoded is None:
+            payload_encoded = self._encode_set_payload(payload)
+
+        if self._command_scheduler is not None:
+            opcode = bytes(payload[: self.set_command_opcode_len_bytes])
+            await self._command_scheduler.submit(self, opcode, payload_encoded)
+        else:
+            await self._publish_encoded_payload(payload_encoded)
+
+    async def _publish_encoded_payload(self, payload_encoded: str) -> None:
+        """
+        A method for publishing the already encoded payload to the device's 'set' MQTT topic.
 
-        payload_encoded = payload.hex(" ").upper()
-        await client.publish(
+        :param payload_encoded: The payload as a string of space separated hex bytes
+        :return: None
+        """
+        metrics_enabled = metrics.enabled
+        if metrics_enabled:
+            started_at = time.perf_counter()
+        await self._mqtt_client.publish(
             topic=self._set_topic_name,
             payload=payload_encoded,
         )
-        logger.debug(f"Payload '{payload_encoded}' published to the MQTT topic {self._set_topic_name}")
+        if metrics_enabled:
+            metrics.observe_stage("publish", self.device_type, time.perf_counter() - started_at)
+            metrics.record_publish(self.device_type)
+        if self._traffic_recorder is not None:
+            self._traffic_recorder.record("set", self.device_type, self.device_address, payload_encoded.encode("ascii"))
+        logger.debug("Payload '%s' published to the MQTT topic %s", payload_encoded, self._set_topic_name)
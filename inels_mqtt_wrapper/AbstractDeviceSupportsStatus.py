@@ -1,39 +1,115 @@
 import asyncio
 import contextlib
-from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+import logging
+import time
+from abc import ABC
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Tuple, Type
 
 import asyncio_mqtt as aiomqtt
 
 from ._logging import logger
-from ._tasks import background_tasks
+from ._metrics import metrics
 from .AbstractDeviceInterface import AbstractDeviceInterface
 from .exceptions import DeviceStatusUnknownError
+from .GatewayRouter import GatewayRouter
+from .StatusDecoder import StatusDataType, StatusDecoder, StatusField
+from .StatusHistory import StatusHistory
+from .StatusSnapshotStore import StatusSnapshotStore
+from .StatusSubscription import OverflowPolicyType, StatusSubscription
+from .StatusView import StatusView
+from .utils import diff_status
 
-StatusDataType = Dict[str, Any]
+if TYPE_CHECKING:  # pragma: no cover
+    from .ParallelDecoder import ParallelDecoder
+
+StatusCallbackType = Callable[[StatusDataType], None]
+StatusDiffCallbackType = Callable[[StatusDataType], None]
 
 
 class AbstractDeviceSupportsStatus(AbstractDeviceInterface, ABC):
     """A base class for all the device interfaces supporting communication via the 'status' MQTT topic"""
 
     status_message_len_bytes: int = 0
+    status_fields: Tuple[StatusField, ...] = ()
+
+    _status_decoder: Optional[StatusDecoder] = None
+    # The lazily decoded status class, None if the interface decodes its status with its own '_decode_status'
+    _status_view_class: Optional[Type[StatusView]] = None
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if "status_fields" in cls.__dict__ and cls.status_fields:
+            cls._status_decoder = StatusDecoder(cls.status_fields, cls.status_message_len_bytes)
+
+        overrides_decode_status = any(
+            "_decode_status" in klass.__dict__
+            for klass in cls.__mro__[: cls.__mro__.index(AbstractDeviceSupportsStatus)]
+        )
+        if cls._status_decoder is not None and not overrides_decode_status:
+            cls._status_view_class = cls._status_decoder.view_class
+        else:
+            cls._status_view_class = None
 
-    def __init__(self, mac_address: str, device_address: str, mqtt_client: aiomqtt.Client) -> None:
+    def __init__(
+        self,
+        mac_address: str,
+        device_address: str,
+        mqtt_client: aiomqtt.Client,
+        router: Optional[GatewayRouter] = None,
+        deduplicate_status: bool = False,
+        status_history_size: int = 0,
+        snapshot_store: Optional[StatusSnapshotStore] = None,
+    ) -> None:
+        """
+        :param mac_address: The MAC address of the eLAN gateway the device is connected to
+        :param device_address: The address of the device
+        :param mqtt_client: An instance of asyncio_mqtt.Client
+        :param router: The gateway router to register the device with. Defaults to None (own listeners)
+        :param deduplicate_status: Whether to skip decoding and notifications for the status messages
+            identical to the previous one. Defaults to False
+        :param status_history_size: How many of the latest statuses to keep in 'status_history'.
+            Defaults to 0 (no history)
+        :param snapshot_store: The store to keep the device's last known status in across restarts. The status
+            found in the store is restored right away and marked stale. Defaults to None (no snapshots)
+        """
         super().__init__(
             mac_address=mac_address,
             device_address=device_address,
             mqtt_client=mqtt_client,
+            router=router,
         )
         assert self.status_message_len_bytes != 0, (
             f"Incomplete interface implementation for class '{self.__class__.__name__}': "
             "'status_message_len_bytes' class field must be overriden in inheriting class."
         )
 
+        self.deduplicate_status: bool = deduplicate_status
+        self.last_status_diff: StatusDataType = {}
+        # Set when the connection to the broker is lost or the status is restored from a snapshot,
+        # the last known status may be outdated until the next one
+        self.status_stale: bool = False
+        self.status_history: Optional[StatusHistory] = None
+        if status_history_size:
+            self.status_history = StatusHistory(
+                status_history_size, self.status_message_len_bytes, decode=self._decode_status
+            )
+
         self._last_known_status: Optional[StatusDataType] = None
+        self._last_raw_status: Optional[bytes] = None
         self._status_updated_event: asyncio.Event = asyncio.Event()
+        self._status_diff_callbacks: List[StatusDiffCallbackType] = []
+        self._status_callbacks: List[StatusCallbackType] = []
+        self._status_subscriptions: List[StatusSubscription] = []
+        self._parallel_decoder: Optional["ParallelDecoder"] = None
+        self._snapshot_store: Optional[StatusSnapshotStore] = snapshot_store
+        if snapshot_store is not None:
+            self._restore_status_snapshot(snapshot_store)
 
-        task = asyncio.create_task(self._listen_on_status_topic())
-        background_tasks.append(task)
+        self._start_listening(
+            topic_kind="status",
+            topic_name=self._status_topic_name,
+            callback=self._status_callback,
+        )
 
     async def await_state_change(self, timeout_sec: int = 10) -> bool:
         """
@@ -54,12 +130,76 @@ class AbstractDeviceSupportsStatus(AbstractDeviceInterface, ABC):
             logger.warning(f"State change await timed out in {timeout_sec}s")
         return state_changed
 
+    def status_updates(
+        self,
+        maxsize: int = 16,
+        overflow_policy: OverflowPolicyType = "drop_oldest",
+        include_unchanged: bool = False,
+    ) -> StatusSubscription:
+        """
+        Subscribe to the device's status updates. Every subscription gets its own bounded queue,
+        so any number of consumers can follow the device without polling and losing updates.
+        Close the subscription (or use it as an async context manager) when it is not needed anymore.
+
+        :param maxsize: The maximum number of queued updates. Defaults to 16
+        :param overflow_policy: What to do when the queue is full: 'drop_oldest' discards the oldest
+            queued update, 'coalesce_latest' collapses all the queued updates into the latest one.
+            Defaults to 'drop_oldest'
+        :param include_unchanged: Whether to receive the statuses skipped by 'deduplicate_status' as well,
+            e.g. to confirm a command the device already reports. Defaults to False
+        :return: An async iterator of the device's statuses
+        """
+        subscription = StatusSubscription(
+            maxsize=maxsize,
+            overflow_policy=overflow_policy,
+            on_close=self._status_subscriptions.remove,
+            include_unchanged=include_unchanged,
+        )
+        self._status_subscriptions.append(subscription)
+        return subscription
+
+    def add_status_callback(self, callback: StatusCallbackType) -> None:
+        """
+        Register a callback to be called with the new status every time the device's status is updated.
+
+        :param callback: Sync function accepting the device's status dict
+        :return: None
+        """
+        self._status_callbacks.append(callback)
+
+    def remove_status_callback(self, callback: StatusCallbackType) -> None:
+        """
+        Remove the previously registered status callback.
+
+        :param callback: The callback to remove
+        :return: None
+        """
+        self._status_callbacks.remove(callback)
+
+    def add_status_diff_callback(self, callback: StatusDiffCallbackType) -> None:
+        """
+        Register a callback to be called with the changed status fields every time the device's status changes.
+
+        :param callback: Sync function accepting a dict of the changed fields and their new values
+        :return: None
+        """
+        self._status_diff_callbacks.append(callback)
+
+    def remove_status_diff_callback(self, callback: StatusDiffCallbackType) -> None:
+        """
+        Remove the previously registered status diff callback.
+
+        :param callback: The callback to remove
+        :return: None
+        """
+        self._status_diff_callbacks.remove(callback)
+
     @property
     def status(self) -> StatusDataType:
         """
-        A property for getting the last known device status as a dictionary with
-        device-specific keys. Example of the device-specific status dict can be found
-        in the docstring of the concrete implementation's _decode_status() method.
+        A property for getting the last known device status as a read-only mapping with
+        device-specific keys, decoded lazily on access (see StatusView). Example of the device-specific
+        status dict can be found next to the concrete implementation's 'status_fields' declaration.
 
         Raises DeviceStatusUnknownError if the device's last status is unknown.
 
@@ -70,48 +210,214 @@ class AbstractDeviceSupportsStatus(AbstractDeviceInterface, ABC):
         return self._last_known_status
 
     def _status_callback(self, raw_status_data: bytes) -> None:
-        message_str_repr = raw_status_data.decode("ascii").replace("\n", " ").strip()
-        logger.debug(f"Status message '{message_str_repr}' received from device {self.dev_id}")
-        status_data = bytearray(int(byte, 16) for byte in raw_status_data.split())
+        if self._traffic_recorder is not None:
+            self._traffic_recorder.record("status", self.device_type, self.device_address, raw_status_data)
+        metrics_enabled = metrics.enabled
+        if metrics_enabled:
+            metrics.record_message("status", self.device_type, self.dev_id)
 
-        if (l := len(status_data)) != self.status_message_len_bytes:
-            msg = (
-                f"Cannot decode device status. Wrong status message payload size: {l} bytes. "
-                f"Expected: {self.status_message_len_bytes} bytes"
-            )
-            logger.error(msg)
-            raise ValueError(msg)
+        if self._parallel_decoder is not None:
+            # Deduplicated once decoded, not to overtake the statuses still being decoded
+            self._parallel_decoder.submit(self, raw_status_data)
+            return
+        if self.deduplicate_status and raw_status_data == self._last_raw_status:
+            self._apply_unchanged_status()
+            return
+
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        if debug_enabled:
+            message_str_repr = raw_status_data.decode("ascii").replace("\n", " ").strip()
+            logger.debug("Status message '%s' received from device %s", message_str_repr, self.dev_id)
+
+        if metrics_enabled:
+            stage_started_at = time.perf_counter()
+        try:
+            status_data = self._parse_status(raw_status_data)
+        except ValueError as e:
+            logger.error(str(e))
+            if metrics_enabled:
+                metrics.record_decode_error(self.device_type)
+            raise e
+        if metrics_enabled:
+            stage_started_at = self._observe_stage("hex_parse", stage_started_at)
 
         try:
-            decoded_status = self._decode_status(status_data)
+            status_view_class = self._status_view_class
+            if status_view_class is not None:
+                # The fields are decoded on access
+                decoded_status: StatusDataType = status_view_class(status_data)
+            else:
+                decoded_status = self._decode_status(status_data)
         except Exception as e:
             logger.error(f"An error occurred while decoding status message: {e}")
+            if metrics_enabled:
+                metrics.record_decode_error(self.device_type)
             raise e
-        logger.debug(f"Status message '{message_str_repr}' decoded as {decoded_status}")
+        if metrics_enabled:
+            stage_started_at = self._observe_stage("decode", stage_started_at)
+        if debug_enabled:
+            logger.debug("Status message '%s' decoded as %s", message_str_repr, decoded_status)
+
+        self._apply_status(raw_status_data, status_data, decoded_status)
+        if metrics_enabled:
+            self._observe_stage("dispatch", stage_started_at)
+
+    @classmethod
+    def _parse_status(cls, raw_status_data: bytes) -> bytes:
+        """
+        Parse the status message payload into the raw status bytes.
+
+        Raises ValueError if the payload is not hex or has the wrong length.
+
+        :param raw_status_data: The status message payload as received from the 'status' MQTT topic
+        :return: The raw status bytes
+        """
+        try:
+            status_data = bytes.fromhex(raw_status_data.decode("ascii"))
+        except ValueError:
+            # Fall back to the byte by byte parsing for the bytes not padded to two hex digits
+            status_data = bytes(int(byte, 16) for byte in raw_status_data.split())
+        if (l := len(status_data)) != cls.status_message_len_bytes:
+            raise ValueError(
+                f"Cannot decode device status. Wrong status message payload size: {l} bytes. "
+                f"Expected: {cls.status_message_len_bytes} bytes"
+            )
+        return status_data
+
+    def _apply_unchanged_status(self) -> None:
+        """
+        Handle a status identical to the last known one, skipped by the deduplication: record it in the history,
+        clear the stale flag and pass it to the subscriptions receiving the unchanged statuses.
+
+        :return: None
+        """
+        # The history keeps every reading, also the unchanged ones
+        if self.status_history:
+            self.status_history.append(self.status_history.raw(-1))
+        self.status_stale = False
+        self._notify_unchanged_status()
+
+    def _apply_status(self, raw_status_data: bytes, status_data: bytes, decoded_status: StatusDataType) -> None:
+        """
+        Store the decoded status as the device's last known one and notify the waiters, callbacks and subscriptions.
+
+        :param raw_status_data: The status message payload as received from the 'status' MQTT topic
+        :param status_data: The raw status bytes, parsed from the payload
+        :param decoded_status: The decoded status
+        :return: None
+        """
+        if self.status_history is not None:
+            self.status_history.append(status_data)
+        self.status_stale = False
+        if self._snapshot_store is not None:
+            self._snapshot_store.update(self, status_data)
 
+        previous_status = self._last_known_status
         self._last_known_status = decoded_status
-        logger.debug(f"State of the device {self.dev_id} has changed")
+        self._last_raw_status = raw_status_data
+
+        if self.deduplicate_status or self._status_diff_callbacks:
+            self.last_status_diff = diff_status(previous_status, decoded_status)
+            if self.last_status_diff:
+                self._notify_status_diff(self.last_status_diff)
+            elif self.deduplicate_status:
+                self._notify_unchanged_status()
+                return
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("State of the device %s has changed", self.dev_id)
         self._status_updated_event.set()
+        self._notify_status(decoded_status)
 
-    async def _listen_on_status_topic(self) -> None:
+    def _restore_status_snapshot(self, snapshot_store: StatusSnapshotStore) -> None:
         """
-        A task for subscribing to the device's 'status' MQTT topic
-        and updating its '_last_known_status' field accordingly.
+        Restore the last known status from the device's snapshot, marked as stale. Statuses of the wrong length
+        or failing to decode, e.g. after the device class has changed, are skipped.
 
+        :param snapshot_store: The store to restore the status from
         :return: None
         """
-        await self._listen_on_topic(
-            topic_name=self._status_topic_name,
-            callback=self._status_callback,
-        )
+        snapshot = snapshot_store.get(self)
+        if snapshot is None:
+            return
 
-    @staticmethod
-    @abstractmethod
-    def _decode_status(raw_status_data: bytearray) -> StatusDataType:
+        timestamp, status_data = snapshot
+        if len(status_data) != self.status_message_len_bytes:
+            logger.warning(f"Skipping the status snapshot of the device {self.dev_id} of a wrong length")
+            return
+        try:
+            status_view_class = self._status_view_class
+            if status_view_class is not None:
+                self._last_known_status = status_view_class(status_data)
+            else:
+                self._last_known_status = self._decode_status(status_data)
+        except Exception as e:
+            logger.warning(f"Skipping the status snapshot of the device {self.dev_id} failing to decode: {e}")
+            return
+        self.status_stale = True
+        logger.debug(f"Restored the status of the device {self.dev_id} from {time.ctime(timestamp)}")
+
+    def _observe_stage(self, stage: str, stage_started_at: float) -> float:
         """
-        An abstract method for decoding the device's status from bytes.
+        Record the duration of a status processing stage.
+
+        :param stage: The stage name
+        :param stage_started_at: The time.perf_counter() value at the start of the stage
+        :return: The time.perf_counter() value at the end of the stage, i.e. the start of the next one
+        """
+        now = time.perf_counter()
+        metrics.observe_stage(stage, self.device_type, now - stage_started_at)
+        return now
+
+    def _notify_status(self, status: StatusDataType) -> None:
+        for subscription in self._status_subscriptions:
+            subscription.put(status)
+        for callback in self._status_callbacks:
+            try:
+                callback(status)
+            except Exception as e:
+                logger.error(f"An error occurred in the status callback of the device {self.dev_id}: {e}")
 
-        :param raw_status_data: A bytearray object containing the bytes, published by the device in the topic.
+    def _notify_unchanged_status(self) -> None:
+        """
+        Pass the last known status, skipped by the deduplication, to the subscriptions receiving the unchanged
+        statuses as well.
+
+        :return: None
+        """
+        status = self._last_known_status
+        if status is None:
+            return
+        for subscription in self._status_subscriptions:
+            if subscription.include_unchanged:
+                subscription.put(status)
+
+    def _notify_status_diff(self, status_diff: StatusDataType) -> None:
+        for callback in self._status_diff_callbacks:
+            try:
+                callback(status_diff)
+            except Exception as e:
+                logger.error(f"An error occurred in the status diff callback of the device {self.dev_id}: {e}")
+
+    def _detach(self) -> Tuple[aiomqtt.Client, List[str]]:
+        if self._parallel_decoder is not None:
+            self._parallel_decoder.detach(self)
+        for subscription in list(self._status_subscriptions):
+            subscription.close()
+        return super()._detach()
+
+    @classmethod
+    def _decode_status(cls, raw_status_data: bytes) -> StatusDataType:
+        """
+        A method for decoding the device's status from bytes using the decoder
+        compiled from the interface's 'status_fields' declaration.
+
+        :param raw_status_data: A bytes object containing the bytes, published by the device in the topic.
         :return: Decoded device status as a dictionary with device-specific keys.
         """
-        raise NotImplementedError
+        if cls._status_decoder is None:
+            raise NotImplementedError(
+                f"Incomplete interface implementation for class '{cls.__name__}': "
+                "either 'status_fields' class field or '_decode_status' method must be overriden in inheriting class."
+            )
+        return cls._status_decoder.decode(raw_status_data)
@@ -0,0 +1,220 @@
+import asyncio
+import itertools
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Tuple
+
+from ._logging import logger
+from ._metrics import metrics
+from ._tasks import background_tasks
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .AbstractDeviceSupportsSet import AbstractDeviceSupportsSet
+
+# The device ID, the opcode and the sequence number of a command which cannot be superseded, 0 otherwise
+CommandKeyType = Tuple[int, bytes, int]
+
+
+class TokenBucket:
+    """A token bucket rate limiter"""
+
+    def __init__(self, rate_per_sec: float, capacity: int) -> None:
+        """
+        :param rate_per_sec: The number of tokens added to the bucket per second
+        :param capacity: The maximum number of tokens in the bucket, i.e. the maximum burst size
+        """
+        assert rate_per_sec > 0, "Rate must be greater than zero"
+        assert capacity >= 1, "Capacity must be at least 1"
+
+        self.rate_per_sec: float = rate_per_sec
+        self.capacity: int = capacity
+        self._tokens: float = float(capacity)
+        self._updated_at: float = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_sec)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        """
+        Take a token from the bucket, waiting for it to be refilled if it is empty.
+
+        :return: None
+        """
+        self._refill()
+        while self._tokens < 1:
+            await asyncio.sleep((1 - self._tokens) / self.rate_per_sec)
+            self._refill()
+        self._tokens -= 1
+
+
+class _PendingCommand:
+    __slots__ = ("device", "payload", "enqueued_at", "waiters")
+
+    def __init__(self, device: "AbstractDeviceSupportsSet", payload: str, enqueued_at: float) -> None:
+        self.device = device
+        self.payload = payload
+        self.enqueued_at = enqueued_at
+        self.waiters: List["asyncio.Future[None]"] = []
+
+
+class CommandScheduler:
+    """
+    An outbound scheduler for the commands published to the devices' 'set' MQTT topics.
+
+    Commands are held for the coalescing window before being published. If another command
+    with the same opcode is sent to the same device within the window and the opcode is listed in
+    the device's 'coalescable_set_opcodes', it supersedes the pending one: only the latest payload
+    is published and the callers of both commands are notified when it is. The other commands,
+    e.g. toggles, are all published in the order they were sent.
+    All the commands go through a shared token bucket, limiting the publishing rate of the gateway.
+
+    Example:
+        scheduler = CommandScheduler(rate_per_sec=5, burst=10, coalesce_window_sec=0.2)
+        scheduler.attach(dimmer)
+    """
+
+    def __init__(self, rate_per_sec: float = 10.0, burst: int = 10, coalesce_window_sec: float = 0.1) -> None:
+        """
+        :param rate_per_sec: The maximum sustained number of commands published per second. Defaults to 10
+        :param burst: The maximum number of commands published at once after a quiet period. Defaults to 10
+        :param coalesce_window_sec: How long a command waits for being superseded before it is published.
+            Defaults to 0.1s
+        """
+        assert coalesce_window_sec >= 0, "Coalescing window must not be negative"
+
+        self.coalesce_window_sec: float = coalesce_window_sec
+        self.coalesced_commands: int = 0
+        self.published_commands: int = 0
+        self.failed_commands: int = 0
+
+        self._bucket: TokenBucket = TokenBucket(rate_per_sec=rate_per_sec, capacity=burst)
+        self._pending: Dict[CommandKeyType, _PendingCommand] = {}
+        self._sequence: Iterator[int] = itertools.count(1)
+        self._pending_event: asyncio.Event = asyncio.Event()
+
+        background_tasks.spawn(self._run(), owner=self)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    @property
+    def metrics(self) -> Dict[str, int]:
+        """
+        A snapshot of the scheduler's metrics.
+
+        :return: A dict containing the queue depth and the numbers of coalesced, published and failed commands
+        """
+        return {
+            "queue_depth": self.queue_depth,
+            "coalesced_commands": self.coalesced_commands,
+            "published_commands": self.published_commands,
+            "failed_commands": self.failed_commands,
+        }
+
+    def attach(self, device: "AbstractDeviceSupportsSet") -> None:
+        """
+        Route the device's commands through the scheduler.
+
+        :param device: The device supporting the 'set' MQTT topic
+        :return: None
+        """
+        device._command_scheduler = self
+
+    def detach(self, device: "AbstractDeviceSupportsSet") -> None:
+        """
+        Publish the device's commands directly again. Pending commands are still published.
+
+        :param device: The device supporting the 'set' MQTT topic
+        :return: None
+        """
+        device._command_scheduler = None
+
+    async def submit(self, device: "AbstractDeviceSupportsSet", opcode: bytes, payload: str) -> None:
+        """
+        Queue the command, superseding the pending command with the same opcode for the same device if there is one
+        and the opcode is listed in the device's 'coalescable_set_opcodes'.
+        The superseding command moves to the end of the queue, so the device receives its commands in the order
+        they were sent, but it is still published once the coalescing window of the superseded command has passed.
+
+        :param device: The device the command is sent to
+        :param opcode: The bytes identifying the kind of the command
+        :param payload: The encoded 'set' MQTT topic payload
+        :return: None. Returns as soon as the command (or the command superseding it) is published
+        """
+        loop = asyncio.get_running_loop()
+        key = (id(device), opcode, 0 if opcode in device.coalescable_set_opcodes else next(self._sequence))
+        pending_command = self._pending.get(key)
+        if pending_command is None:
+            pending_command = _PendingCommand(device, payload, loop.time())
+            self._pending[key] = pending_command
+            self._pending_event.set()
+        else:
+            pending_command.payload = payload
+            # Publish it after the commands queued since the superseded one, e.g. with other opcodes
+            del self._pending[key]
+            self._pending[key] = pending_command
+            self.coalesced_commands += 1
+
+        waiter: "asyncio.Future[None]" = loop.create_future()
+        pending_command.waiters.append(waiter)
+        await waiter
+
+    async def _publish(self, key: CommandKeyType) -> None:
+        pending_command = self._pending.pop(key, None)
+        if not self._pending:
+            self._pending_event.clear()
+        if pending_command is None:
+            return
+
+        error: Any = None
+        try:
+            await pending_command.device._publish_encoded_payload(pending_command.payload)
+            self.published_commands += 1
+        except asyncio.CancelledError:
+            # The command is not pending anymore, thus its waiters are not cancelled along with the pending ones
+            for waiter in pending_command.waiters:
+                waiter.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"Failed to publish a command to the device {pending_command.device.dev_id}: {e}")
+            self.failed_commands += 1
+            error = e
+
+        for waiter in pending_command.waiters:
+            if waiter.done():
+                continue
+            if error is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(error)
+
+    async def _run(self) -> None:
+        """
+        A task for publishing the pending commands in the order they were queued.
+
+        :return: None
+        """
+        loop = asyncio.get_running_loop()
+        queue_name = f"command_scheduler:{id(self)}"
+        metrics.register_queue(queue_name, lambda: self.queue_depth)
+        while True:
+            try:
+                await self._pending_event.wait()
+                key, pending_command = next(iter(self._pending.items()))
+                delay = pending_command.enqueued_at + self.coalesce_window_sec - loop.time()
+                if delay > 0:
+                    # The command may be superseded and moved to the end of the queue in the meantime
+                    await asyncio.sleep(delay)
+                    continue
+                await self._bucket.acquire()
+                await self._publish(key)
+            except asyncio.CancelledError:
+                logger.warning("Task cancelled. Stopped publishing the scheduled commands")
+                for pending_command in self._pending.values():
+                    for waiter in pending_command.waiters:
+                        waiter.cancel()
+                self._pending.clear()
+                metrics.unregister_queue(queue_name)
+                break
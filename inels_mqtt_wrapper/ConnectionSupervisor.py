@@ -0,0 +1,254 @@
+import asyncio
+import random
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import asyncio_mqtt as aiomqtt
+
+from ._logging import logger
+from ._tasks import background_tasks
+from .AbstractDeviceInterface import AbstractDeviceInterface
+from .AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus
+from .Gateway import Gateway
+from .GatewayRouter import GatewayRouter
+from .SubscriptionBatch import SubscriptionBatch
+
+ClientFactoryType = Callable[[], aiomqtt.Client]
+SupervisedType = Union[AbstractDeviceInterface, GatewayRouter, Gateway]
+
+
+class ConnectionSupervisor:
+    """
+    Keeps the MQTT session of the supervised devices, routers and gateways alive.
+
+    The supervisor connects a client made by the factory and waits for the connection to drop. When it does,
+    the statuses of all the supervised devices are marked stale and the supervisor reconnects with exponential
+    backoff and jitter. Once connected, all the supervised objects are switched to the new client, their
+    listeners are restarted and their topics are resubscribed with as few SUBSCRIBE packets as possible.
+
+    asyncio_mqtt.Client cannot be reconnected once disconnected, thus a new client is made for every connection.
+    The disconnection is detected through the client's '_disconnected' future, which asyncio_mqtt does not expose.
+
+    Example:
+        supervisor = ConnectionSupervisor(lambda: aiomqtt.Client("broker.local"))
+        supervisor.start()
+        await supervisor.wait_connected()
+        gateway = Gateway(mac_address="00:00:00:00:00:00", mqtt_client=supervisor.client)
+        supervisor.supervise(gateway)
+    """
+
+    def __init__(
+        self,
+        client_factory: ClientFactoryType,
+        initial_backoff_sec: float = 0.5,
+        max_backoff_sec: float = 30.0,
+        backoff_multiplier: float = 2.0,
+        jitter: float = 0.5,
+        connect_timeout_sec: int = 10,
+    ) -> None:
+        """
+        :param client_factory: Function returning a new, not connected instance of asyncio_mqtt.Client
+        :param initial_backoff_sec: The delay before the first reconnection attempt in seconds. Defaults to 0.5s
+        :param max_backoff_sec: The maximum delay between the reconnection attempts in seconds. Defaults to 30s
+        :param backoff_multiplier: The factor the delay grows by after every failed attempt. Defaults to 2
+        :param jitter: The fraction of the delay to randomize, to spread the reconnections of many processes
+            after a broker restart. Defaults to 0.5
+        :param connect_timeout_sec: The timeout of a single connection attempt in seconds. Defaults to 10s
+        """
+        assert 0 < initial_backoff_sec <= max_backoff_sec, "Initial backoff must be positive and not exceed the max"
+        assert backoff_multiplier >= 1, "Backoff multiplier must be at least 1"
+        assert 0 <= jitter <= 1, "Jitter must be between 0 and 1"
+
+        self.initial_backoff_sec: float = initial_backoff_sec
+        self.max_backoff_sec: float = max_backoff_sec
+        self.backoff_multiplier: float = backoff_multiplier
+        self.jitter: float = jitter
+        self.connect_timeout_sec: int = connect_timeout_sec
+
+        self.client: Optional[aiomqtt.Client] = None
+        self.connections: int = 0
+        self.failed_attempts: int = 0
+        self.last_recovery_sec: Optional[float] = None
+
+        self._client_factory: ClientFactoryType = client_factory
+        self._supervised: Dict[int, SupervisedType] = {}
+        self._connected: asyncio.Event = asyncio.Event()
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected.is_set()
+
+    def supervise(self, *objects: SupervisedType) -> None:
+        """
+        Keep the devices, routers and gateways connected. The devices of a gateway and the router of a device
+        are supervised along with them.
+
+        :param objects: The devices, routers and gateways to supervise
+        :return: None
+        """
+        for supervised in objects:
+            self._supervised[id(supervised)] = supervised
+
+    def unsupervise(self, *objects: SupervisedType) -> None:
+        for supervised in objects:
+            self._supervised.pop(id(supervised), None)
+
+    def _expand(self) -> List[SupervisedType]:
+        """
+        Collect all the supervised objects: the gateways first, then the routers, then the devices.
+
+        :return: A list of the supervised objects without duplicates
+        """
+        gateways: Dict[int, Gateway] = {}
+        routers: Dict[int, GatewayRouter] = {}
+        devices: Dict[int, AbstractDeviceInterface] = {}
+        for supervised in self._supervised.values():
+            if isinstance(supervised, Gateway):
+                gateways[id(supervised)] = supervised
+                routers[id(supervised.router)] = supervised.router
+                devices.update((id(device), device) for device in supervised)
+            elif isinstance(supervised, GatewayRouter):
+                routers[id(supervised)] = supervised
+            else:
+                devices[id(supervised)] = supervised
+                if supervised._router is not None:
+                    routers[id(supervised._router)] = supervised._router
+        return [*gateways.values(), *routers.values(), *devices.values()]
+
+    def start(self) -> None:
+        """
+        Start connecting and keeping the connection alive in the background.
+
+        :return: None
+        """
+        background_tasks.spawn(self._run(), owner=self)
+
+    async def wait_connected(self, timeout_sec: Optional[float] = None) -> aiomqtt.Client:
+        """
+        Wait until the supervisor is connected and the supervised objects are resubscribed.
+
+        :param timeout_sec: How long to wait in seconds. Defaults to None (no timeout)
+        :return: The connected client
+        """
+        await asyncio.wait_for(self._connected.wait(), timeout_sec)
+        assert self.client is not None
+        return self.client
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        :param attempt: The number of the failed attempts so far
+        :return: The delay before the next attempt in seconds
+        """
+        delay = min(self.initial_backoff_sec * self.backoff_multiplier**attempt, self.max_backoff_sec)
+        return delay * random.uniform(1 - self.jitter, 1)
+
+    async def _connect(self) -> aiomqtt.Client:
+        """
+        Connect a new client, retrying with exponential backoff until it succeeds.
+
+        :return: The connected client
+        """
+        attempt = 0
+        while True:
+            client = self._client_factory()
+            try:
+                await client.connect(timeout=self.connect_timeout_sec)
+                return client
+            except aiomqtt.MqttError as e:
+                delay = self.backoff_delay(attempt)
+                attempt += 1
+                self.failed_attempts += 1
+                logger.warning(f"Connecting to the MQTT broker failed: {e}. Retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _resubscribe(self, client: aiomqtt.Client) -> int:
+        """
+        Switch all the supervised objects to the client and subscribe to their topics in bulk.
+
+        :param client: The connected client
+        :return: The number of the topics subscribed to
+        """
+        batch = SubscriptionBatch(client)
+        for supervised in self._expand():
+            for topic_name in await supervised._reconnect(client):
+                batch.add(topic_name)
+        # Let the restarted listeners start receiving before subscribing
+        await asyncio.sleep(0)
+        await batch.flush()
+        return batch.topics_subscribed
+
+    def _mark_stale(self) -> None:
+        for supervised in self._expand():
+            if isinstance(supervised, AbstractDeviceSupportsStatus):
+                supervised.status_stale = True
+                # Apply the first status after reconnecting in full, even if it has not changed
+                supervised._last_raw_status = None
+
+    @staticmethod
+    async def _wait_disconnected(client: aiomqtt.Client) -> None:
+        disconnected: "asyncio.Future[Any]" = client._disconnected
+        await asyncio.wait([disconnected])
+        if not disconnected.cancelled() and disconnected.exception() is not None:
+            logger.warning(f"Connection to the MQTT broker lost: {disconnected.exception()}")
+
+    @staticmethod
+    async def _disconnect(client: aiomqtt.Client) -> None:
+        """
+        Disconnect the client, closing its socket. Falls back to marking the client disconnected
+        if the broker does not acknowledge the disconnection.
+
+        :param client: The connected client
+        :return: None
+        """
+        try:
+            await client.disconnect()
+        except aiomqtt.MqttError as e:
+            logger.warning(f"Disconnecting from the MQTT broker failed: {e}")
+            await client.force_disconnect()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        disconnected_at: Optional[float] = None
+        resubscribe_attempt = 0
+        while True:
+            client = await self._connect()
+            self.client = client
+            try:
+                topics_subscribed = await self._resubscribe(client)
+            except aiomqtt.MqttError as e:
+                delay = self.backoff_delay(resubscribe_attempt)
+                resubscribe_attempt += 1
+                self.failed_attempts += 1
+                logger.warning(f"Resubscribing failed: {e}. Reconnecting in {delay:.2f}s")
+                await self._disconnect(client)
+                await asyncio.sleep(delay)
+                continue
+            resubscribe_attempt = 0
+
+            self.connections += 1
+            self._connected.set()
+            if disconnected_at is not None:
+                self.last_recovery_sec = loop.time() - disconnected_at
+                logger.info(
+                    f"Reconnected to the MQTT broker and resubscribed to {topics_subscribed} topics "
+                    f"in {self.last_recovery_sec:.3f}s"
+                )
+            else:
+                logger.info(f"Connected to the MQTT broker and subscribed to {topics_subscribed} topics")
+
+            await self._wait_disconnected(client)
+            disconnected_at = loop.time()
+            self._connected.clear()
+            self._mark_stale()
+
+    async def aclose(self) -> None:
+        """
+        Stop supervising the connection and disconnect the current client.
+
+        :return: None
+        """
+        self._supervised.clear()
+        await background_tasks.aclose(self)
+        self._connected.clear()
+        if self.client is not None:
+            await self._disconnect(self.client)
+        logger.info("Closed connection supervisor")
@@ -0,0 +1,181 @@
+import asyncio
+from typing import Any, Callable, Dict, Generic, Iterable, Iterator, List, NamedTuple, Optional, Set, TypeVar, cast
+
+from ._logging import logger
+from .AbstractDeviceSupportsSet import AbstractDeviceSupportsSet
+from .AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus
+from .StatusDecoder import StatusDataType
+
+DeviceType = TypeVar("DeviceType", bound=AbstractDeviceSupportsSet)
+StatusPredicateType = Callable[[StatusDataType], bool]
+
+
+class GroupCommandResult(NamedTuple):
+    """The outcome of a group command for a single member device"""
+
+    device: AbstractDeviceSupportsSet
+    # The exception raised while sending the command or None if it has been sent
+    error: Optional[BaseException] = None
+    # Whether the device has confirmed the command with its status. None if no confirmation was requested
+    confirmed: Optional[bool] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.confirmed is not False
+
+
+class DeviceGroup(Generic[DeviceType]):
+    """
+    A group of devices implementing the same interface, for sending a command to all of them at once.
+
+    The command is sent to all the members concurrently (with bounded concurrency), so a scene of
+    hundreds of devices takes about as long as a single publish. Optionally, the members' statuses
+    are awaited until they confirm the command or a single overall deadline passes.
+
+    Example:
+        lights = DeviceGroup([kitchen_light, hall_light, porch_light])
+        results = await lights.broadcast(
+            "switch_off",
+            confirm=lambda status: not status["switched_on"],
+            timeout_sec=5,
+        )
+        failed = [dev_id for dev_id, result in results.items() if not result.ok]
+    """
+
+    def __init__(self, devices: Iterable[DeviceType] = (), max_concurrency: int = 50) -> None:
+        """
+        :param devices: The member devices. All of them must implement the same interface
+        :param max_concurrency: The maximum number of commands being sent at the same time. Defaults to 50
+        """
+        assert max_concurrency > 0, "Concurrency limit must be greater than zero"
+
+        self.max_concurrency: int = max_concurrency
+        self._devices: Dict[str, DeviceType] = {}
+        for device in devices:
+            self.add(device)
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def __iter__(self) -> Iterator[DeviceType]:
+        return iter(list(self._devices.values()))
+
+    def __contains__(self, device: object) -> bool:
+        return isinstance(device, AbstractDeviceSupportsSet) and self._devices.get(device.dev_id) is device
+
+    @property
+    def device_type(self) -> Optional[str]:
+        """
+        :return: The device type of the group members or None if the group is empty
+        """
+        return next(iter(self._devices.values())).device_type if self._devices else None
+
+    def add(self, device: DeviceType) -> None:
+        """
+        Add the device to the group.
+
+        :param device: The device to add. Must implement the same interface as the other members
+        :return: None
+        """
+        assert isinstance(device, AbstractDeviceSupportsSet), "Only devices supporting the 'set' topic can be grouped"
+        assert self.device_type in (None, device.device_type), (
+            f"Cannot add the device {device.dev_id} of type {device.device_type} "
+            f"to the group of devices of type {self.device_type}"
+        )
+        self._devices[device.dev_id] = device
+
+    def remove(self, device: DeviceType) -> None:
+        """
+        Remove the device from the group.
+
+        :param device: The member device
+        :return: None
+        """
+        del self._devices[device.dev_id]
+
+    async def broadcast(
+        self,
+        command: str,
+        *args: Any,
+        confirm: Optional[StatusPredicateType] = None,
+        timeout_sec: float = 10.0,
+        **kwargs: Any,
+    ) -> Dict[str, GroupCommandResult]:
+        """
+        Send the command to all the members of the group concurrently.
+
+        :param command: The name of the interface's command method, e.g. 'switch_off'
+        :param args: Positional arguments of the command method
+        :param confirm: A predicate telling whether a member's status confirms the command.
+            If provided, the members' status updates are awaited until the predicate holds
+            or the timeout runs out. Defaults to None (do not wait for the confirmation)
+        :param timeout_sec: The overall deadline for sending the command and confirming it
+            by all the members, in seconds. Defaults to 10s
+        :param kwargs: Keyword arguments of the command method
+        :return: A dict mapping the members' IDs to the results of the command
+        """
+        devices = dict(self._devices)
+        for device in devices.values():
+            assert callable(getattr(device, command, None)), f"Device {device.dev_id} has no '{command}' command"
+            assert confirm is None or isinstance(
+                device, AbstractDeviceSupportsStatus
+            ), f"Device {device.dev_id} does not support the 'status' topic, thus cannot confirm the command"
+
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        sent: Set[str] = set()
+
+        async def send(device: DeviceType) -> GroupCommandResult:
+            # Subscribe before sending the command not to miss a quick confirmation
+            subscription = (
+                cast(AbstractDeviceSupportsStatus, device).status_updates(
+                    maxsize=1, overflow_policy="coalesce_latest", include_unchanged=True
+                )
+                if confirm is not None
+                else None
+            )
+            try:
+                async with semaphore:
+                    await getattr(device, command)(*args, **kwargs)
+                sent.add(device.dev_id)
+                if subscription is None or confirm is None:
+                    return GroupCommandResult(device=device)
+
+                async for status in subscription:
+                    if confirm(status):
+                        return GroupCommandResult(device=device, confirmed=True)
+                return GroupCommandResult(device=device, confirmed=False)
+            except Exception as e:
+                return GroupCommandResult(device=device, error=e)
+            finally:
+                if subscription is not None:
+                    subscription.close()
+
+        tasks = {dev_id: asyncio.create_task(send(device)) for dev_id, device in devices.items()}
+        if tasks:
+            await asyncio.wait(tasks.values(), timeout=timeout_sec)
+
+        results: Dict[str, GroupCommandResult] = {}
+        for dev_id, task in tasks.items():
+            if task.done():
+                results[dev_id] = task.result()
+                continue
+            task.cancel()
+            results[dev_id] = GroupCommandResult(
+                device=devices[dev_id],
+                error=None if dev_id in sent else asyncio.TimeoutError(),
+                confirmed=False if confirm else None,
+            )
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        failed: List[str] = [dev_id for dev_id, result in results.items() if not result.ok]
+        logger.info(
+            "Command '%s' sent to %s devices of type %s in %.3fs, %s failed",
+            command,
+            len(results),
+            self.device_type,
+            loop.time() - started_at,
+            len(failed),
+        )
+        return results
@@ -0,0 +1,251 @@
+import asyncio
+import re
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Type, TypeVar
+
+import asyncio_mqtt as aiomqtt
+
+from ._device_interfaces import (
+    DeviceInterface02,
+    DeviceInterface03,
+    DeviceInterface05,
+    DeviceInterface09,
+    DeviceInterface10,
+    DeviceInterface12,
+    DeviceInterface19,
+)
+from ._logging import logger
+from .AbstractDeviceInterface import AbstractDeviceInterface
+from .GatewayRouter import GatewayRouter
+from .SubscriptionBatch import unsubscribe_in_bulk
+
+DeviceClassType = TypeVar("DeviceClassType", bound=AbstractDeviceInterface)
+
+# The interface class to create for every device type code found by the discovery
+DEVICE_INTERFACE_CLASSES: Dict[str, Type[AbstractDeviceInterface]] = {
+    device_class.device_type: device_class
+    for device_class in (
+        DeviceInterface02,
+        DeviceInterface03,
+        DeviceInterface05,
+        DeviceInterface09,
+        DeviceInterface10,
+        DeviceInterface12,
+        DeviceInterface19,
+    )
+}
+
+
+class Gateway:
+    """
+    A registry of all the devices behind a single eLAN gateway.
+
+    The devices are indexed by their address, device type and class, so any of the lookups takes constant time.
+    All the devices share the gateway's router. The devices can be added by hand or discovered from
+    the heartbeats the gateway publishes in its 'connected' topics.
+
+    Example:
+        gateway = Gateway(mac_address="00:00:00:00:00:00", mqtt_client=client)
+        await gateway.discover(duration_sec=90)
+        for thermostat in gateway.devices_of_type("09"):
+            ...
+    """
+
+    def __init__(
+        self,
+        mac_address: str,
+        mqtt_client: aiomqtt.Client,
+        router: Optional[GatewayRouter] = None,
+    ) -> None:
+        """
+        :param mac_address: The MAC address of the eLAN gateway
+        :param mqtt_client: An instance of asyncio_mqtt.Client
+        :param router: The router for the gateway's devices. Defaults to None (a new router is created)
+        """
+        mac_address = mac_address.upper()
+        assert (
+            router is None or router.mac_address == mac_address
+        ), f"Gateway router MAC address {router.mac_address} does not match the gateway MAC address {mac_address}"
+
+        self.mac_address: str = mac_address
+        self.router: GatewayRouter = router if router is not None else GatewayRouter(mac_address, mqtt_client)
+        self._mqtt_client: aiomqtt.Client = mqtt_client
+
+        self._devices_by_address: Dict[str, AbstractDeviceInterface] = {}
+        self._devices_by_type: Dict[str, Dict[str, AbstractDeviceInterface]] = {}
+        self._devices_by_class: Dict[Type[AbstractDeviceInterface], Dict[str, AbstractDeviceInterface]] = {}
+
+    def __len__(self) -> int:
+        return len(self._devices_by_address)
+
+    def __iter__(self) -> Iterator[AbstractDeviceInterface]:
+        return iter(list(self._devices_by_address.values()))
+
+    def __contains__(self, device_address: object) -> bool:
+        return isinstance(device_address, str) and device_address.upper() in self._devices_by_address
+
+    def __getitem__(self, device_address: str) -> AbstractDeviceInterface:
+        return self._devices_by_address[device_address.upper()]
+
+    def get(self, device_address: str) -> Optional[AbstractDeviceInterface]:
+        """
+        :param device_address: The device address, e.g. '01207D'
+        :return: The device with the address or None if there is no such device
+        """
+        return self._devices_by_address.get(device_address.upper())
+
+    def devices_of_type(self, device_type: str) -> List[AbstractDeviceInterface]:
+        """
+        :param device_type: The device type, e.g. '05'
+        :return: The devices of the type
+        """
+        return list(self._devices_by_type.get(device_type, {}).values())
+
+    def devices_of_class(self, device_class: Type[DeviceClassType]) -> List[DeviceClassType]:
+        """
+        :param device_class: The exact device class, e.g. RFDAC71B. Instances of its subclasses are not included
+        :return: The devices of the class
+        """
+        return list(self._devices_by_class.get(device_class, {}).values())  # type: ignore[arg-type]
+
+    def add_device(self, device: AbstractDeviceInterface) -> None:
+        """
+        Add the device to the registry.
+
+        :param device: The device to add. Must be connected to the gateway and have an address not taken yet
+        :return: None
+        """
+        assert (
+            device.mac_address == self.mac_address
+        ), f"Device {device.dev_id} is connected to the gateway {device.mac_address}, not {self.mac_address}"
+        assert (
+            device.device_address not in self._devices_by_address
+        ), f"Device address {device.device_address} is already taken"
+
+        self._devices_by_address[device.device_address] = device
+        self._devices_by_type.setdefault(device.device_type, {})[device.device_address] = device
+        self._devices_by_class.setdefault(type(device), {})[device.device_address] = device
+
+    def create_device(
+        self,
+        device_class: Type[DeviceClassType],
+        device_address: str,
+        **device_kwargs: Any,
+    ) -> DeviceClassType:
+        """
+        Create a device routed by the gateway's router and add it to the registry.
+
+        :param device_class: The device class, e.g. RFDAC71B
+        :param device_address: The device address, e.g. '01207D'
+        :param device_kwargs: Additional keyword arguments for the device class, e.g. 'deduplicate_status'
+        :return: The new device
+        """
+        device = device_class(
+            mac_address=self.mac_address,
+            device_address=device_address,
+            mqtt_client=self._mqtt_client,
+            router=self.router,
+            **device_kwargs,
+        )
+        self.add_device(device)
+        return device
+
+    def remove_device(self, device_address: str) -> Optional[AbstractDeviceInterface]:
+        """
+        Remove the device from the registry. The device is not closed.
+
+        :param device_address: The device address, e.g. '01207D'
+        :return: The removed device or None if there is no such device
+        """
+        device = self._devices_by_address.pop(device_address.upper(), None)
+        if device is not None:
+            del self._devices_by_type[device.device_type][device.device_address]
+            del self._devices_by_class[type(device)][device.device_address]
+        return device
+
+    async def _reconnect(self, mqtt_client: aiomqtt.Client) -> List[str]:
+        """
+        Switch the gateway to a new MQTT client for creating and discovering the devices.
+        The router and the devices are switched separately.
+
+        :param mqtt_client: The new, connected instance of asyncio_mqtt.Client
+        :return: The topics the caller has to subscribe to, none for the gateway itself
+        """
+        self._mqtt_client = mqtt_client
+        return []
+
+    async def discover(
+        self,
+        duration_sec: float = 60.0,
+        device_classes: Mapping[str, Type[AbstractDeviceInterface]] = DEVICE_INTERFACE_CLASSES,
+        **device_kwargs: Any,
+    ) -> List[AbstractDeviceInterface]:
+        """
+        Listen on the gateway's 'connected' topics and create a device for every device type and address seen.
+
+        The listening should last longer than the interval of the devices' heartbeats, unless the gateway
+        publishes them as retained messages. The devices already in the registry are kept as they are,
+        the devices of the types missing from 'device_classes' are skipped.
+
+        :param duration_sec: How long to listen in seconds. Defaults to 60s
+        :param device_classes: The class to create for every device type. Defaults to the generic
+            device interface classes, e.g. DeviceInterface05 for the type '05'
+        :param device_kwargs: Additional keyword arguments for the device classes, e.g. 'deduplicate_status'
+        :return: The newly discovered devices
+        """
+        assert duration_sec > 0, "Discovery duration must be greater than zero"
+
+        topic_filter = f"inels/connected/{self.mac_address.replace(':', '')}/#"
+        topic_pattern = re.compile(rf"{re.escape(topic_filter[:-1])}([0-9A-Fa-f]{{2}})/([0-9A-Fa-f]{{6}})")
+        discovered: List[AbstractDeviceInterface] = []
+        unknown_device_types = set()
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration_sec
+        client = self._mqtt_client
+        async with client.filtered_messages(topic_filter) as messages:
+            await client.subscribe(topic_filter)
+            logger.info(f"Discovering the devices of the gateway {self.mac_address} for {duration_sec}s")
+            try:
+                while (timeout := deadline - loop.time()) > 0:
+                    try:
+                        message = await asyncio.wait_for(messages.__anext__(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+
+                    match = topic_pattern.fullmatch(message.topic)
+                    if match is None:
+                        continue
+                    device_type, device_address = match.group(1), match.group(2).upper()
+                    if device_address in self._devices_by_address:
+                        continue
+
+                    device_class = device_classes.get(device_type)
+                    if device_class is None:
+                        if device_type not in unknown_device_types:
+                            unknown_device_types.add(device_type)
+                            logger.warning(f"Skipping the devices of the unknown device type {device_type}")
+                        continue
+
+                    device = self.create_device(device_class, device_address, **device_kwargs)
+                    # The heartbeat the device has been discovered from has been missed by the new device
+                    device._connected_callback(message.payload)
+                    discovered.append(device)
+            finally:
+                await unsubscribe_in_bulk(client, [topic_filter])
+
+        logger.info(f"Discovered {len(discovered)} new devices of the gateway {self.mac_address}")
+        return discovered
+
+    async def aclose(self) -> None:
+        """
+        Close all the devices and the gateway's router and clear the registry.
+
+        :return: None
+        """
+        devices = list(self._devices_by_address.values())
+        self._devices_by_address.clear()
+        self._devices_by_type.clear()
+        self._devices_by_class.clear()
+        await asyncio.gather(*(device.aclose() for device in devices))
+        await self.router.aclose()
+        logger.info(f"Closed gateway {self.mac_address}")
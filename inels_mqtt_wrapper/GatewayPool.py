@@ -0,0 +1,232 @@
+import asyncio
+import zlib
+from typing import Any, Dict, Iterator, List, Literal, Optional, Sequence, Type
+
+from ._logging import logger
+from .AbstractDeviceInterface import AbstractDeviceInterface
+from .AbstractDeviceSupportsSet import AbstractDeviceSupportsSet
+from .ConnectionSupervisor import ClientFactoryType, ConnectionSupervisor
+from .DeviceGroup import DeviceGroup, GroupCommandResult, StatusPredicateType
+from .Gateway import DeviceClassType, Gateway
+
+AssignmentType = Literal["least_loaded", "hash"]
+
+
+class GatewayPool:
+    """
+    Several eLAN gateways shared out among several MQTT connections.
+
+    Every connection is kept alive by its own ConnectionSupervisor and every gateway is assigned to one of
+    the connections, either to the least loaded one or by a hash of its MAC address. Each connection has its
+    own socket and message queues and each gateway its own router, so a slow or reconnecting connection does
+    not hold up the messages of the gateways on the other ones. The devices of all the gateways are queried
+    and commanded through the pool.
+
+    Example:
+        pool = GatewayPool([lambda: aiomqtt.Client("broker.local") for _ in range(4)])
+        pool.start()
+        await pool.wait_connected()
+        for mac_address in mac_addresses:
+            pool.add_gateway(mac_address)
+        await pool.discover(duration_sec=90)
+        await pool.broadcast("02", "switch_off")
+    """
+
+    def __init__(
+        self,
+        client_factories: Sequence[ClientFactoryType],
+        assignment: AssignmentType = "least_loaded",
+        **supervisor_kwargs: Any,
+    ) -> None:
+        """
+        :param client_factories: A function returning a new asyncio_mqtt.Client for every connection of the pool
+        :param assignment: How to assign the gateways to the connections: 'least_loaded' picks the connection
+            with the fewest gateways and devices, 'hash' picks the connection by the CRC32 of the MAC address,
+            which is stable across restarts. Defaults to 'least_loaded'
+        :param supervisor_kwargs: Keyword arguments of the connections' supervisors, e.g. 'max_backoff_sec'
+        """
+        assert client_factories, "At least one connection is required"
+        assert assignment in ("least_loaded", "hash"), f"Unknown gateway assignment: {assignment}"
+
+        self.assignment: AssignmentType = assignment
+        self.connections: List[ConnectionSupervisor] = [
+            ConnectionSupervisor(client_factory, **supervisor_kwargs) for client_factory in client_factories
+        ]
+        self._gateways: Dict[str, Gateway] = {}
+        self._gateway_connections: Dict[str, int] = {}
+
+    def start(self) -> None:
+        """
+        Start connecting all the connections in the background.
+
+        :return: None
+        """
+        for connection in self.connections:
+            connection.start()
+
+    async def wait_connected(self, timeout_sec: Optional[float] = None) -> None:
+        """
+        Wait until all the connections are connected.
+
+        :param timeout_sec: How long to wait in seconds. Defaults to None (no timeout)
+        :return: None
+        """
+        await asyncio.gather(*(connection.wait_connected(timeout_sec) for connection in self.connections))
+
+    def connection_loads(self) -> List[Dict[str, int]]:
+        """
+        :return: The number of the gateways and the devices assigned to every connection, in the connections' order
+        """
+        loads = [{"gateways": 0, "devices": 0} for _ in self.connections]
+        for mac_address, index in self._gateway_connections.items():
+            loads[index]["gateways"] += 1
+            loads[index]["devices"] += len(self._gateways[mac_address])
+        return loads
+
+    def _pick_connection(self, mac_address: str) -> int:
+        if self.assignment == "hash":
+            return zlib.crc32(mac_address.encode("ascii")) % len(self.connections)
+        loads = self.connection_loads()
+        return min(range(len(loads)), key=lambda index: (loads[index]["gateways"], loads[index]["devices"]))
+
+    def add_gateway(self, mac_address: str, connection_index: Optional[int] = None) -> Gateway:
+        """
+        Create a gateway on one of the pool's connections. The connection must be connected.
+
+        :param mac_address: The MAC address of the eLAN gateway
+        :param connection_index: The index of the connection to use. Defaults to None (assigned by the pool)
+        :return: The new gateway
+        """
+        mac_address = mac_address.upper()
+        assert mac_address not in self._gateways, f"Gateway {mac_address} is already in the pool"
+        if connection_index is None:
+            connection_index = self._pick_connection(mac_address)
+        connection = self.connections[connection_index]
+        assert connection.client is not None, f"Connection {connection_index} has not been connected yet"
+
+        gateway = Gateway(mac_address=mac_address, mqtt_client=connection.client)
+        connection.supervise(gateway)
+        self._gateways[mac_address] = gateway
+        self._gateway_connections[mac_address] = connection_index
+        logger.info(f"Assigned gateway {mac_address} to connection {connection_index}")
+        return gateway
+
+    async def remove_gateway(self, mac_address: str) -> None:
+        """
+        Close the gateway with all its devices and remove it from the pool.
+
+        :param mac_address: The MAC address of the eLAN gateway
+        :return: None
+        """
+        mac_address = mac_address.upper()
+        gateway = self._gateways.pop(mac_address)
+        self.connections[self._gateway_connections.pop(mac_address)].unsupervise(gateway)
+        await gateway.aclose()
+
+    @property
+    def gateways(self) -> List[Gateway]:
+        return list(self._gateways.values())
+
+    def gateway(self, mac_address: str) -> Gateway:
+        return self._gateways[mac_address.upper()]
+
+    def connection_of(self, mac_address: str) -> ConnectionSupervisor:
+        return self.connections[self._gateway_connections[mac_address.upper()]]
+
+    def __len__(self) -> int:
+        return sum(len(gateway) for gateway in self._gateways.values())
+
+    def __iter__(self) -> Iterator[AbstractDeviceInterface]:
+        for gateway in list(self._gateways.values()):
+            yield from gateway
+
+    def get(self, mac_address: str, device_address: str) -> Optional[AbstractDeviceInterface]:
+        """
+        :param mac_address: The MAC address of the device's eLAN gateway
+        :param device_address: The device address, e.g. '01207D'
+        :return: The device or None if there is no such device
+        """
+        gateway = self._gateways.get(mac_address.upper())
+        return gateway.get(device_address) if gateway is not None else None
+
+    def devices_of_type(self, device_type: str) -> List[AbstractDeviceInterface]:
+        """
+        :param device_type: The device type, e.g. '05'
+        :return: The devices of the type behind all the gateways
+        """
+        return [device for gateway in self._gateways.values() for device in gateway.devices_of_type(device_type)]
+
+    def devices_of_class(self, device_class: Type[DeviceClassType]) -> List[DeviceClassType]:
+        """
+        :param device_class: The exact device class, e.g. RFDAC71B
+        :return: The devices of the class behind all the gateways
+        """
+        return [device for gateway in self._gateways.values() for device in gateway.devices_of_class(device_class)]
+
+    async def discover(self, duration_sec: float = 60.0, **kwargs: Any) -> Dict[str, List[AbstractDeviceInterface]]:
+        """
+        Discover the devices of all the gateways at the same time, see Gateway.discover().
+
+        :param duration_sec: How long to listen in seconds. Defaults to 60s
+        :param kwargs: Keyword arguments of Gateway.discover()
+        :return: A dict mapping the gateways' MAC addresses to their newly discovered devices
+        """
+        gateways = list(self._gateways.values())
+        discovered = await asyncio.gather(*(gateway.discover(duration_sec, **kwargs) for gateway in gateways))
+        return {gateway.mac_address: devices for gateway, devices in zip(gateways, discovered)}
+
+    async def broadcast(
+        self,
+        device_type: str,
+        command: str,
+        *args: Any,
+        confirm: Optional[StatusPredicateType] = None,
+        timeout_sec: float = 10.0,
+        max_concurrency: int = 50,
+        **kwargs: Any,
+    ) -> Dict[str, Dict[str, GroupCommandResult]]:
+        """
+        Send the command to all the devices of the type behind all the gateways, see DeviceGroup.broadcast().
+        The gateways are commanded concurrently, each with its own concurrency limit.
+
+        :param device_type: The device type, e.g. '02'
+        :param command: The name of the interface's command method, e.g. 'switch_off'
+        :param args: Positional arguments of the command method
+        :param confirm: A predicate telling whether a device's status confirms the command. Defaults to None
+        :param timeout_sec: The overall deadline for sending and confirming the command in seconds. Defaults to 10s
+        :param max_concurrency: The maximum number of commands being sent through a gateway at the same time.
+            Defaults to 50
+        :param kwargs: Keyword arguments of the command method
+        :return: A dict mapping the gateways' MAC addresses to the results of the command by device ID
+        """
+        groups = {
+            mac_address: DeviceGroup(
+                [
+                    device
+                    for device in gateway.devices_of_type(device_type)
+                    if isinstance(device, AbstractDeviceSupportsSet)
+                ],
+                max_concurrency=max_concurrency,
+            )
+            for mac_address, gateway in self._gateways.items()
+        }
+        results = await asyncio.gather(
+            *(
+                group.broadcast(command, *args, confirm=confirm, timeout_sec=timeout_sec, **kwargs)
+                for group in groups.values()
+            )
+        )
+        return dict(zip(groups, results))
+
+    async def aclose(self) -> None:
+        """
+        Close all the gateways and their devices and disconnect all the connections.
+
+        :return: None
+        """
+        gateways = list(self._gateways.values())
+        self._gateways.clear()
+        self._gateway_connections.clear()
+        await asyncio.gather(*(gateway.aclose() for gateway in gateways))
+        await asyncio.gather(*(connection.aclose() for connection in self.connections))
+        logger.info("Closed gateway pool")
@@ -0,0 +1,172 @@
+import asyncio
+import re
+from typing import Callable, Dict, List, Tuple
+
+import asyncio_mqtt as aiomqtt
+
+from ._logging import logger
+from ._metrics import message_queue_depth, metrics
+from ._tasks import background_tasks
+from .SubscriptionBatch import current_subscription_batch, unsubscribe_in_bulk
+
+RouteKeyType = Tuple[str, str, str]
+MessageCallbackType = Callable[[bytes], None]
+
+
+class GatewayRouter:
+    """
+    A message router for all the devices behind a single eLAN gateway.
+
+    The router subscribes once to the 'inels/+/<MAC>/#' wildcard topic, parses the topic
+    of every received message and passes the payload to the callback registered for the
+    (topic kind, device type, device address) combination. This keeps the number of
+    subscriptions constant and the cost of dispatching a message independent of the
+    number of devices.
+    """
+
+    def __init__(self, mac_address: str, mqtt_client: aiomqtt.Client) -> None:
+        mac_address = mac_address.upper()
+        mac_address_pattern = r"([A-F0-9]{2}:){5}[A-F0-9]{2}"
+        assert re.fullmatch(
+            mac_address_pattern, mac_address
+        ), f"Invalid MAC address: {mac_address}. Valid pattern: {mac_address_pattern}"
+
+        self.mac_address: str = mac_address
+        self._topic_filter: str = f"inels/+/{mac_address.replace(':', '')}/#"
+        self._routes: Dict[RouteKeyType, MessageCallbackType] = {}
+        self._mqtt_client: aiomqtt.Client = mqtt_client
+
+        subscription_batch = current_subscription_batch()
+        if subscription_batch is not None:
+            subscription_batch.add(self._topic_filter)
+
+        background_tasks.spawn(self._listen(subscribe=subscription_batch is None), owner=self)
+
+        logger.debug(f"Initialized gateway router at {id(self)} for gateway {self.mac_address}")
+
+    def register(
+        self,
+        topic_kind: str,
+        device_type: str,
+        device_address: str,
+        callback: MessageCallbackType,
+    ) -> None:
+        """
+        Register a callback for the messages published in the given topic of the given device.
+
+        :param topic_kind: The kind of the topic: 'connected', 'status' or 'set'
+        :param device_type: The device type, e.g. '05'
+        :param device_address: The device address, e.g. '01207D'
+        :param callback: Sync function to execute when a message is received
+        :return: None
+        """
+        self._routes[(topic_kind, device_type, device_address.upper())] = callback
+
+    def unregister(self, topic_kind: str, device_type: str, device_address: str) -> None:
+        """
+        Remove the callback registered for the given topic of the given device if there is any.
+
+        :param topic_kind: The kind of the topic: 'connected', 'status' or 'set'
+        :param device_type: The device type, e.g. '05'
+        :param device_address: The device address, e.g. '01207D'
+        :return: None
+        """
+        self._routes.pop((topic_kind, device_type, device_address.upper()), None)
+
+    def _detach(self) -> Tuple[aiomqtt.Client, List[str]]:
+        """
+        Stop dispatching the messages to the registered devices.
+        The listener task is left to the caller to cancel.
+
+        :return: The router's MQTT client and the topics to unsubscribe from
+        """
+        self._routes.clear()
+        return self._mqtt_client, [self._topic_filter]
+
+    async def _reconnect(self, mqtt_client: aiomqtt.Client) -> List[str]:
+        """
+        Switch the router to a new MQTT client, e.g. after the connection to the broker has been lost.
+        The listener is restarted on the new client without subscribing.
+
+        :param mqtt_client: The new, connected instance of asyncio_mqtt.Client
+        :return: The topics the caller has to subscribe to
+        """
+        await background_tasks.aclose(self)
+        self._mqtt_client = mqtt_client
+        background_tasks.spawn(self._listen(subscribe=False), owner=self)
+        return [self._topic_filter]
+
+    async def aclose(self) -> None:
+        """
+        Stop dispatching the messages: cancel the router's listener task,
+        wait for it to finish and unsubscribe from the gateway's wildcard topic.
+
+        :return: None
+        """
+        client, topics = self._detach()
+        await background_tasks.aclose(self)
+        await unsubscribe_in_bulk(client, topics)
+        logger.info(f"Closed gateway router for gateway {self.mac_address}")
+
+    def dispatch(self, topic: str, payload: bytes) -> bool:
+        """
+        Pass the message payload to the callback registered for its topic.
+
+        :param topic: The full name of the topic the message was received from
+        :param payload: The message payload
+        :return: True if the message was delivered to a callback, False otherwise
+        """
+        parts = topic.split("/")
+        if len(parts) != 5:
+            return False
+
+        _, topic_kind, _, device_type, device_address = parts
+        callback = self._routes.get((topic_kind, device_type, device_address))
+        if callback is None:
+            if metrics.enabled:
+                metrics.unrouted_messages += 1
+            return False
+
+        try:
+            callback(payload)
+        except Exception as e:
+            logger.error(f"Failed to process a message from the topic {topic}: {e}")
+        return True
+
+    async def _listen(self, subscribe: bool = True) -> None:
+        """
+        A task for subscribing to the gateway's wildcard MQTT topic
+        and dispatching the received messages to the registered devices.
+
+        :param subscribe: Whether to subscribe to the topic or only listen to it. Defaults to True
+        :return: None
+        """
+        client = self._mqtt_client
+        topic_filter = self._topic_filter
+        async with client.filtered_messages(topic_filter) as messages:
+            metrics.register_queue(topic_filter, lambda: message_queue_depth(messages))
+            try:
+                if subscribe:
+                    logger.debug(f"Attempting subscribing to the topic {topic_filter}")
+
+                    try:
+                        await client.subscribe(topic_filter)
+                    except Exception as e:
+                        logger.error(str(e))
+                        raise e
+
+                logger.info(f"Started listening on the {topic_filter} topic of the gateway {self.mac_address}")
+
+                while True:
+                    try:
+                        message = await messages.__anext__()
+                    except asyncio.CancelledError:
+                        logger.warning(f"Task cancelled. Stopped listening on topic {topic_filter}")
+                        break
+                    except aiomqtt.MqttError as e:
+                        logger.warning(f"Connection lost. Stopped listening on topic {topic_filter}: {e}")
+                        break
+
+                    self.dispatch(message.topic, message.payload)
+            finally:
+                metrics.unregister_queue(topic_filter)
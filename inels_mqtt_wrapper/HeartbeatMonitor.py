@@ -0,0 +1,142 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from ._logging import logger
+from ._tasks import background_tasks
+from .AbstractDeviceInterface import AbstractDeviceInterface
+
+
+class HeartbeatMonitor:
+    """
+    Liveness tracking for the devices based on the heartbeats in their 'connected' MQTT topics.
+
+    A device that has not sent a heartbeat within its timeout is marked as disconnected:
+    its 'is_connected' field is set to False and commands sent to it raise DeviceDisconnectedError
+    until the next heartbeat arrives.
+
+    All the tracked devices share a single hashed timer wheel driven by one background task.
+    Receiving a heartbeat only records its timestamp on the device, the timer is not re-armed.
+    Instead, the device's deadline is re-checked lazily when the wheel reaches its slot, so both
+    a heartbeat and a tick cost O(1) amortized work per device.
+    """
+
+    def __init__(self, default_timeout_sec: float = 600.0, tick_sec: float = 1.0, wheel_size: int = 512) -> None:
+        """
+        :param default_timeout_sec: The maximum interval between the heartbeats before a device is
+            considered disconnected. Defaults to 600s
+        :param tick_sec: The timer wheel resolution in seconds. Defaults to 1s
+        :param wheel_size: The number of slots in the timer wheel. Defaults to 512
+        """
+        assert default_timeout_sec > 0, "Heartbeat timeout must be greater than zero"
+        assert tick_sec > 0, "Timer wheel tick must be greater than zero"
+        assert wheel_size > 0, "Timer wheel size must be greater than zero"
+
+        self.default_timeout_sec: float = default_timeout_sec
+        self.tick_sec: float = tick_sec
+
+        self._slots: List[Set[AbstractDeviceInterface]] = [set() for _ in range(wheel_size)]
+        self._slot_indices: Dict[AbstractDeviceInterface, int] = {}
+        self._tracked: Dict[AbstractDeviceInterface, Tuple[float, float]] = {}
+        self._current_tick: int = self._tick_of(time.monotonic())
+
+        background_tasks.spawn(self._run(), owner=self)
+
+    def _tick_of(self, timestamp: float) -> int:
+        return int(timestamp // self.tick_sec)
+
+    def _schedule(self, device: AbstractDeviceInterface, deadline: float) -> None:
+        """
+        Put the device into the timer wheel slot of the given deadline.
+
+        :param device: The tracked device
+        :param deadline: The monotonic timestamp to check the device at
+        :return: None
+        """
+        slot_index = max(self._tick_of(deadline), self._current_tick + 1) % len(self._slots)
+        self._slots[slot_index].add(device)
+        self._slot_indices[device] = slot_index
+
+    def track(self, device: AbstractDeviceInterface, timeout_sec: Optional[float] = None) -> None:
+        """
+        Start tracking the device's heartbeats.
+
+        :param device: The device to track
+        :param timeout_sec: The maximum interval between the device's heartbeats. Defaults to the monitor's default
+        :return: None
+        """
+        self.untrack(device)
+        timeout_sec = timeout_sec or self.default_timeout_sec
+        now = time.monotonic()
+        self._tracked[device] = (timeout_sec, now)
+        device._heartbeat_monitor = self
+        self._schedule(device, max(device._last_heartbeat_at or now, now - timeout_sec) + timeout_sec)
+        logger.debug(f"Tracking heartbeats of the device {device.dev_id} with {timeout_sec}s timeout")
+
+    def untrack(self, device: AbstractDeviceInterface) -> None:
+        """
+        Stop tracking the device's heartbeats.
+
+        :param device: The tracked device
+        :return: None
+        """
+        if self._tracked.pop(device, None) is None:
+            return
+        device._heartbeat_monitor = None
+        # Nothing marks the device connected again once it is not tracked
+        device._heartbeat_lost = False
+        self._slots[self._slot_indices.pop(device)].discard(device)
+
+    @property
+    def tracked_devices_count(self) -> int:
+        return len(self._tracked)
+
+    def tick(self, now: Optional[float] = None) -> List[AbstractDeviceInterface]:
+        """
+        Advance the timer wheel up to the given moment and mark the devices
+        which have missed their heartbeats as disconnected.
+
+        :param now: The current monotonic timestamp. Defaults to time.monotonic()
+        :return: A list of the devices that have just been marked as disconnected
+        """
+        now = time.monotonic() if now is None else now
+        target_tick = self._tick_of(now)
+        disconnected = []
+
+        # Every slot needs to be visited only once even if the monitor has been stalled for longer than a full turn
+        first_tick = max(self._current_tick + 1, target_tick - len(self._slots) + 1)
+        for tick in range(first_tick, target_tick + 1):
+            self._current_tick = tick
+            slot = self._slots[tick % len(self._slots)]
+            due_devices = list(slot)
+            slot.clear()
+            for device in due_devices:
+                timeout_sec, tracked_at = self._tracked[device]
+                deadline = (device._last_heartbeat_at or tracked_at) + timeout_sec
+                if deadline > now:
+                    self._schedule(device, deadline)
+                    continue
+
+                if not device._heartbeat_lost:
+                    device._heartbeat_lost = True
+                    device.is_connected = False
+                    disconnected.append(device)
+                    logger.warning(f"Device {device.dev_id} missed its heartbeat and is considered disconnected")
+                self._schedule(device, now + timeout_sec)
+
+        self._current_tick = target_tick
+        return disconnected
+
+    async def _run(self) -> None:
+        """
+        A task for advancing the timer wheel every tick.
+
+        :return: None
+        """
+        while True:
+            try:
+                await asyncio.sleep(self.tick_sec)
+            except asyncio.CancelledError:
+                logger.warning("Task cancelled. Stopped tracking the heartbeats")
+                break
+            self.tick()
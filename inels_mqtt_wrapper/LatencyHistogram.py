@@ -0,0 +1,73 @@
+from bisect import bisect_left
+from typing import Any, Dict, List, Sequence
+
+DEFAULT_LATENCY_BUCKETS_SEC = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class LatencyHistogram:
+    """
+    A histogram of latencies with fixed bucket bounds, cumulative the way Prometheus histograms are.
+    Recording a value costs a binary search over the bucket bounds and takes no extra memory.
+    """
+
+    def __init__(self, buckets_sec: Sequence[float] = DEFAULT_LATENCY_BUCKETS_SEC) -> None:
+        """
+        :param buckets_sec: The upper bounds of the buckets in seconds, in ascending order.
+            A bucket for the values exceeding the last bound is added implicitly
+        """
+        assert buckets_sec, "At least one bucket bound is required"
+        assert list(buckets_sec) == sorted(set(buckets_sec)), "Bucket bounds must be unique and in ascending order"
+
+        self.buckets_sec: List[float] = list(buckets_sec)
+        self.count: int = 0
+        self.sum_sec: float = 0.0
+        self._bucket_counts: List[int] = [0] * (len(self.buckets_sec) + 1)
+
+    def observe(self, latency_sec: float) -> None:
+        """
+        Record the latency.
+
+        :param latency_sec: The latency in seconds
+        :return: None
+        """
+        self._bucket_counts[bisect_left(self.buckets_sec, latency_sec)] += 1
+        self.count += 1
+        self.sum_sec += latency_sec
+
+    def cumulative_counts(self) -> Dict[str, int]:
+        """
+        :return: A dict mapping the bucket upper bounds to the numbers of the recorded latencies
+            less than or equal to them. The last key is '+Inf'
+        """
+        counts = {}
+        total = 0
+        for bound, bucket_count in zip([*map(str, self.buckets_sec), "+Inf"], self._bucket_counts):
+            total += bucket_count
+            counts[bound] = total
+        return counts
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate the quantile of the recorded latencies as the upper bound of the bucket it falls into.
+
+        :param q: The quantile between 0 and 1, e.g. 0.99
+        :return: The estimated quantile in seconds. 0 if nothing has been recorded,
+            infinity if it falls beyond the last bucket bound
+        """
+        assert 0 <= q <= 1, "Quantile must be between 0 and 1"
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        total = 0
+        for bound, bucket_count in zip(self.buckets_sec, self._bucket_counts):
+            total += bucket_count
+            if total >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        :return: A dict containing the number and the sum of the recorded latencies and the cumulative bucket counts
+        """
+        return {"count": self.count, "sum_sec": self.sum_sec, "buckets": self.cumulative_counts()}
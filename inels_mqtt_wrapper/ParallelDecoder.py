@@ -0,0 +1,258 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple, Type
+
+from ._logging import logger
+from ._metrics import metrics
+from ._tasks import background_tasks
+from .AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus
+from .StatusDecoder import StatusDataType
+
+# The parsed status bytes and the decoded status, or None and the error message if the status is invalid
+DecodeResultType = Tuple[Optional[bytes], Any]
+PendingStatusType = Tuple[AbstractDeviceSupportsStatus, bytes]
+
+
+def _decode_batch(batch: List[Tuple[Type[AbstractDeviceSupportsStatus], bytes]]) -> List[DecodeResultType]:
+    """
+    Parse and decode a batch of status messages. Runs in a worker process.
+
+    :param batch: The device class and the raw payload of every status message, in the order of their arrival
+    :return: The parsed status bytes and the decoded status dict for every message, in the same order
+    """
+    results: List[DecodeResultType] = []
+    for device_class, raw_status_data in batch:
+        try:
+            status_data = device_class._parse_status(raw_status_data)
+            results.append((status_data, dict(device_class._decode_status(status_data))))
+        except Exception as e:
+            results.append((None, str(e)))
+    return results
+
+
+class ParallelDecoder:
+    """
+    Decodes the status messages of the attached devices in a pool of worker processes.
+
+    The raw payloads received by the attached devices are buffered and sent to the pool in batches, either
+    when a batch is full or when the flush interval has passed since its first message. Only the decoded
+    statuses come back to the event loop, where they are applied to the devices the same way as the ones
+    decoded inline: the last known status, diffs, callbacks, subscriptions and history are all updated.
+
+    The batches are applied strictly in the order they were submitted, and every batch keeps the order of
+    its messages, so the statuses of every device are applied in the order they were received even though
+    the batches are decoded concurrently. A detached device keeps submitting its messages to the decoder
+    until its messages in flight are applied, and only then switches to the inline decoding.
+
+    Decoding in processes pays off for large fleets decoding heavy statuses on a machine with spare cores:
+    every message is pickled on the way to a worker and its decoded status on the way back.
+
+    Example:
+        decoder = ParallelDecoder(max_workers=4)
+        for device in gateway:
+            decoder.attach(device)
+        ...
+        await decoder.aclose()
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        batch_size: int = 256,
+        flush_interval_sec: float = 0.005,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        """
+        :param max_workers: The number of worker processes. Defaults to None (the number of CPUs)
+        :param batch_size: The number of messages to send to a worker at once. Defaults to 256
+        :param flush_interval_sec: The maximum time a message waits for its batch to fill up in seconds.
+            Defaults to 5ms
+        :param executor: The executor to decode the batches in. It is not shut down by the decoder.
+            Defaults to None (a new ProcessPoolExecutor with 'max_workers' workers)
+        """
+        assert batch_size > 0, "Batch size must be greater than zero"
+        assert flush_interval_sec >= 0, "Flush interval must not be negative"
+
+        self.batch_size: int = batch_size
+        self.flush_interval_sec: float = flush_interval_sec
+        self.batches_submitted: int = 0
+        self.statuses_decoded: int = 0
+
+        self._owns_executor: bool = executor is None
+        self._executor: Executor = executor if executor is not None else ProcessPoolExecutor(max_workers)
+        self._loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        self._devices: Dict[int, AbstractDeviceSupportsStatus] = {}
+        # The numbers of the submitted messages not applied yet, by the device
+        self._in_flight: Dict[int, int] = {}
+        # The detached devices waiting for their messages in flight to be applied
+        self._detaching: Set[int] = set()
+        self._buffer: List[PendingStatusType] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._batches: "asyncio.Queue[Tuple[asyncio.Future[List[DecodeResultType]], List[PendingStatusType]]]" = (
+            asyncio.Queue()
+        )
+
+        background_tasks.spawn(self._apply_batches(), owner=self)
+
+    def attach(self, *devices: AbstractDeviceSupportsStatus) -> None:
+        """
+        Decode the status messages of the devices in the worker processes.
+
+        :param devices: The devices to attach. Their classes must be importable by the worker processes
+        :return: None
+        """
+        for device in devices:
+            if device._parallel_decoder is not None:
+                device._parallel_decoder.detach(device)
+            device._parallel_decoder = self
+            self._devices[id(device)] = device
+            self._detaching.discard(id(device))
+
+    def detach(self, *devices: AbstractDeviceSupportsStatus) -> None:
+        """
+        Decode the status messages of the devices inline again. The messages already submitted are still applied,
+        and the devices switch to the inline decoding once they are, so that their statuses stay in order.
+
+        :param devices: The attached devices
+        :return: None
+        """
+        for device in devices:
+            if self._devices.pop(id(device), None) is None:
+                continue
+            if self._in_flight.get(id(device)):
+                self._detaching.add(id(device))
+            else:
+                device._parallel_decoder = None
+
+    @property
+    def attached_devices_count(self) -> int:
+        return len(self._devices)
+
+    @property
+    def pending_batches_count(self) -> int:
+        return self._batches.qsize()
+
+    def submit(self, device: AbstractDeviceSupportsStatus, raw_status_data: bytes) -> None:
+        """
+        Buffer a status message received by the device for decoding.
+
+        :param device: The device the message was received by
+        :param raw_status_data: The status message payload as received from the 'status' MQTT topic
+        :return: None
+        """
+        key = id(device)
+        self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        buffer = self._buffer
+        buffer.append((device, raw_status_data))
+        if len(buffer) >= self.batch_size:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self.flush_interval_sec, self.flush)
+
+    def flush(self) -> None:
+        """
+        Send the buffered messages to the worker processes right away.
+
+        :return: None
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._buffer:
+            return
+
+        batch, self._buffer = self._buffer, []
+        future = self._loop.run_in_executor(
+            self._executor, _decode_batch, [(type(device), raw_status_data) for device, raw_status_data in batch]
+        )
+        self._batches.put_nowait((future, batch))
+        self.batches_submitted += 1
+
+    async def _apply_batches(self) -> None:
+        """
+        A task for applying the decoded batches to their devices in the order the batches were submitted.
+
+        :return: None
+        """
+        while True:
+            try:
+                future, batch = await self._batches.get()
+            except asyncio.CancelledError:
+                logger.warning("Task cancelled. Stopped applying the decoded statuses")
+                break
+
+            try:
+                results = await future
+            except Exception as e:
+                logger.error(f"Failed to decode a batch of {len(batch)} status messages: {e}")
+                for device, _ in batch:
+                    if metrics.enabled:
+                        metrics.record_decode_error(device.device_type)
+                    self._settle(device)
+            else:
+                self._apply_results(batch, results)
+            finally:
+                self._batches.task_done()
+
+    def _settle(self, device: AbstractDeviceSupportsStatus) -> None:
+        """
+        Count a message of the device as applied, switching the device to the inline decoding
+        if it has been detached and it was its last message in flight.
+
+        :param device: The device the message was received by
+        :return: None
+        """
+        key = id(device)
+        in_flight = self._in_flight[key] - 1
+        if in_flight:
+            self._in_flight[key] = in_flight
+            return
+        del self._in_flight[key]
+        if key in self._detaching:
+            self._detaching.discard(key)
+            if device._parallel_decoder is self:
+                device._parallel_decoder = None
+
+    def _apply_results(self, batch: List[PendingStatusType], results: List[DecodeResultType]) -> None:
+        for (device, raw_status_data), (status_data, decoded) in zip(batch, results):
+            self._settle(device)
+            if device.deduplicate_status and raw_status_data == device._last_raw_status:
+                device._apply_unchanged_status()
+                continue
+            if status_data is None:
+                logger.error(f"Cannot decode status message of the device {device.dev_id}: {decoded}")
+                if metrics.enabled:
+                    metrics.record_decode_error(device.device_type)
+                continue
+
+            status_view_class = device._status_view_class
+            decoded_status: StatusDataType = (
+                status_view_class.from_decoded(status_data, decoded) if status_view_class is not None else decoded
+            )
+            try:
+                device._apply_status(raw_status_data, status_data, decoded_status)
+            except Exception as e:
+                logger.error(f"Failed to apply the status of the device {device.dev_id}: {e}")
+            self.statuses_decoded += 1
+
+    async def drain(self) -> None:
+        """
+        Flush the buffered messages and wait until all the submitted messages are decoded and applied.
+
+        :return: None
+        """
+        self.flush()
+        await self._batches.join()
+
+    async def aclose(self) -> None:
+        """
+        Apply the pending messages, detach all the devices and shut down the worker processes.
+
+        :return: None
+        """
+        self.detach(*self._devices.values())
+        await self.drain()
+        await background_tasks.aclose(self)
+        if self._owns_executor:
+            await self._loop.run_in_executor(None, self._executor.shutdown)
+        logger.info("Closed parallel decoder")
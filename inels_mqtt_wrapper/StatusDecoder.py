@@ -0,0 +1,231 @@
+import struct
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Type
+
+from .StatusView import StatusView
+
+# A decoded device status: either a dict or a lazily decoded StatusView
+StatusDataType = Mapping[str, Any]
+
+_STRUCT_FORMATS = {1: "b", 2: "h", 4: "i", 8: "q"}
+
+
+class StatusField(NamedTuple):
+    """
+    A declarative description of a single field of the device's status message.
+
+    The raw value is read from `width` bytes starting at `offset`. Then the following
+    steps are applied in order, each one only if the corresponding parameter is set:
+    `mask` (the masked bits are shifted down to the lowest bit), comparison with `equals`
+    (the value becomes a bool), multiplication by `scale`, division by `divisor`,
+    lookup in the `lookup` mapping and, finally, the `convert` callable.
+    """
+
+    name: str
+    offset: int
+    width: int = 1
+    byteorder: str = "big"
+    signed: bool = False
+    mask: Optional[int] = None
+    equals: Optional[int] = None
+    scale: Optional[float] = None
+    divisor: Optional[float] = None
+    lookup: Optional[Mapping[Any, Any]] = None
+    convert: Optional[Callable[[Any], Any]] = None
+
+    @property
+    def shift(self) -> int:
+        """
+        The number of bits to shift the masked value by.
+
+        :return: The position of the lowest bit set in the mask, 0 if there is no mask
+        """
+        if not self.mask:
+            return 0
+        return (self.mask & -self.mask).bit_length() - 1
+
+
+_SlotType = Tuple[int, int, str, bool]
+
+
+class StatusDecoder:
+    """
+    A status message decoder compiled from a sequence of status field descriptions.
+
+    The raw values of all the fields are read with a single precompiled struct.Struct
+    whenever the fields' byte ranges allow that, otherwise each byte range is read separately.
+    The field conversions are compiled into a single function building the status dict,
+    available as the `decode` attribute of the decoder, and into a StatusView subclass decoding
+    the fields one by one on access, available as the `view_class` attribute.
+    """
+
+    def __init__(self, fields: Sequence[StatusField], message_len_bytes: int) -> None:
+        """
+        :param fields: Descriptions of the status message fields
+        :param message_len_bytes: The length of the status message in bytes
+        """
+        assert fields, "At least one status field must be provided"
+        for field in fields:
+            assert field.byteorder in ("big", "little"), f"Invalid byte order of the status field '{field.name}'"
+            assert (
+                0 <= field.offset and field.offset + field.width <= message_len_bytes
+            ), f"Status field '{field.name}' does not fit into the status message of {message_len_bytes} bytes"
+
+        self.fields: Tuple[StatusField, ...] = tuple(fields)
+        self.message_len_bytes: int = message_len_bytes
+        self.slots: List[_SlotType] = sorted({(f.offset, f.width, f.byteorder, f.signed) for f in fields})
+        self.struct: Optional[struct.Struct] = self._compile_struct()
+        self.decode: Callable[[bytes], Dict[str, Any]] = self._compile_function()
+        self.view_class: Type[StatusView] = self._compile_view_class()
+
+    def slot_index(self, field: StatusField) -> int:
+        """
+        Get the index of the byte range the field's raw value is read from.
+
+        :param field: The status field description
+        :return: The index of the field's slot
+        """
+        return self.slots.index((field.offset, field.width, field.byteorder, field.signed))
+
+    def _compile_struct(self) -> Optional[struct.Struct]:
+        """
+        Build a single struct.Struct reading the raw values of all the slots at once.
+
+        :return: The compiled struct or None if the slots overlap, use different byte orders
+            or have a width not supported by the struct module
+        """
+        byteorders = {byteorder for _, width, byteorder, _ in self.slots if width > 1}
+        if len(byteorders) > 1 or any(width not in _STRUCT_FORMATS for _, width, _, _ in self.slots):
+            return None
+
+        fmt = "<" if byteorders == {"little"} else ">"
+        position = 0
+        for offset, width, _, signed in self.slots:
+            if offset < position:
+                return None
+            fmt += "x" * (offset - position)
+            struct_format = _STRUCT_FORMATS[width]
+            fmt += struct_format if signed else struct_format.upper()
+            position = offset + width
+        fmt += "x" * (self.message_len_bytes - position)
+        return struct.Struct(fmt)
+
+    @staticmethod
+    def _field_expression(i: int, field: StatusField, raw_value: str, namespace: Dict[str, Any]) -> str:
+        """
+        Build the Python expression converting the field's raw value, adding the constants it uses to the namespace.
+
+        :param i: The index of the field
+        :param field: The status field description
+        :param raw_value: The expression of the field's raw value
+        :param namespace: The namespace the expression is evaluated in
+        :return: The expression of the field's value
+        """
+        expression = raw_value
+        if field.mask is not None:
+            expression = f"(({expression} & {field.mask}) >> {field.shift})"
+        if field.equals is not None:
+            expression = f"({expression} == {field.equals})"
+        if field.scale is not None:
+            namespace[f"scale_{i}"] = field.scale
+            expression = f"({expression} * scale_{i})"
+        if field.divisor is not None:
+            namespace[f"divisor_{i}"] = field.divisor
+            expression = f"({expression} / divisor_{i})"
+        if field.lookup is not None:
+            namespace[f"lookup_{i}"] = field.lookup
+            expression = f"lookup_{i}[{expression}]"
+        if field.convert is not None:
+            namespace[f"convert_{i}"] = field.convert
+            expression = f"convert_{i}({expression})"
+        return expression
+
+    def _compile_function(self) -> Callable[[bytes], Dict[str, Any]]:
+        """
+        Generate the function decoding the status message into the status dict.
+
+        :return: The decoding function
+        """
+        namespace: Dict[str, Any] = {}
+        slot_names = [f"slot_{i}" for i in range(len(self.slots))]
+
+        lines = ["def decode(data):"]
+        if self.struct is not None:
+            namespace["unpack"] = self.struct.unpack
+            lines.append(f"    {', '.join(slot_names)}, = unpack(data)")
+        else:
+            namespace["from_bytes"] = int.from_bytes
+            for slot_name, (offset, width, byteorder, signed) in zip(slot_names, self.slots):
+                lines.append(
+                    f"    {slot_name} = from_bytes(data[{offset}:{offset + width}], {byteorder!r}, signed={signed})"
+                )
+
+        items = []
+        for i, field in enumerate(self.fields):
+            expression = self._field_expression(i, field, slot_names[self.slot_index(field)], namespace)
+            items.append(f"{field.name!r}: {expression}")
+        lines.append(f"    return {{{', '.join(items)}}}")
+
+        exec("\n".join(lines), namespace)  # pylint: disable=exec-used
+        return namespace["decode"]  # type: ignore
+
+    def _compile_field_getters(self) -> Dict[str, Callable[[bytes], Any]]:
+        """
+        Generate a function decoding a single field from the status message for every field.
+
+        :return: A dict mapping the field names to their decoding functions
+        """
+        namespace: Dict[str, Any] = {"from_bytes": int.from_bytes}
+        lines = []
+        for i, field in enumerate(self.fields):
+            if field.width == 1:
+                raw_value = f"((data[{field.offset}] ^ 128) - 128)" if field.signed else f"data[{field.offset}]"
+            else:
+                raw_value = (
+                    f"from_bytes(data[{field.offset}:{field.offset + field.width}], {field.byteorder!r}, "
+                    f"signed={field.signed})"
+                )
+            lines.append(f"def get_{i}(data):")
+            lines.append(f"    return {self._field_expression(i, field, raw_value, namespace)}")
+
+        exec("\n".join(lines), namespace)  # pylint: disable=exec-used
+        return {field.name: namespace[f"get_{i}"] for i, field in enumerate(self.fields)}
+
+    @staticmethod
+    def _lookup_may_fail(field: StatusField) -> bool:
+        """
+        Check whether the field's lookup table may miss any of the values it can be applied to.
+
+        :param field: The status field description
+        :return: True if the field has a lookup table that does not cover all the possible values
+        """
+        if field.lookup is None:
+            return False
+        if field.scale is not None or field.divisor is not None:
+            return True
+        if field.equals is not None:
+            possible_values: Sequence[Any] = (False, True)
+        elif field.mask is not None:
+            possible_values = range((field.mask >> field.shift) + 1)
+        elif field.width <= 2:
+            bits = field.width * 8
+            possible_values = range(-(1 << (bits - 1)), 1 << (bits - 1)) if field.signed else range(1 << bits)
+        else:
+            return True
+        return any(value not in field.lookup for value in possible_values)
+
+    def _compile_view_class(self) -> Type[StatusView]:
+        """
+        Build the lazily decoded status view class for the decoder's fields.
+
+        :return: A subclass of StatusView
+        """
+        view_namespace = {
+            "__module__": StatusView.__module__,
+            "__qualname__": StatusView.__qualname__,
+            "__slots__": (),
+            "_decode": staticmethod(self.decode),
+            "_field_getters": self._compile_field_getters(),
+            "_field_names": tuple(field.name for field in self.fields),
+            "_eager_field_names": tuple(field.name for field in self.fields if self._lookup_may_fail(field)),
+        }
+        return type("StatusView", (StatusView,), view_namespace)
@@ -0,0 +1,187 @@
+import time
+from array import array
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union, overload
+
+from .StatusDecoder import StatusDataType
+
+
+class StatusHistory:
+    """
+    A fixed-capacity ring buffer of the device's recent status messages.
+
+    The raw status bytes are stored in a single preallocated bytearray and the timestamps in a preallocated
+    array of doubles, so the memory taken by the history is fixed at construction: the capacity multiplied by
+    the status message length plus 8 bytes. The statuses are only decoded when they are read.
+
+    Once the history is full, every new status overwrites the oldest one. Index 0 is the oldest status kept,
+    index -1 is the latest one.
+
+    Example:
+        sensor = RFTI10B(..., status_history_size=360)
+        ...
+        timestamps = sensor.status_history.timestamps()
+        temperatures = sensor.status_history.column("temperature_in")
+    """
+
+    def __init__(self, capacity: int, message_len_bytes: int, decode: Callable[[bytes], StatusDataType]) -> None:
+        """
+        :param capacity: The maximum number of the statuses kept
+        :param message_len_bytes: The length of the device's status message in bytes
+        :param decode: The function decoding the raw status bytes, e.g. the device's '_decode_status' method
+        """
+        assert capacity > 0, "Status history capacity must be greater than zero"
+        assert message_len_bytes > 0, "Status message length must be greater than zero"
+
+        self.capacity: int = capacity
+        self.message_len_bytes: int = message_len_bytes
+        self._decode: Callable[[bytes], StatusDataType] = decode
+        self._data: bytearray = bytearray(capacity * message_len_bytes)
+        self._timestamps: array = array("d", bytes(8 * capacity))  # type: ignore[type-arg]
+        # The position the next status is written to
+        self._next: int = 0
+        self._count: int = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, status_data: bytes, timestamp: Optional[float] = None) -> None:
+        """
+        Store the raw status, overwriting the oldest one if the history is full.
+
+        :param status_data: The raw status bytes, parsed from the hex message
+        :param timestamp: The time the status was received at as a UNIX timestamp. Defaults to the current time
+        :return: None
+        """
+        message_len = self.message_len_bytes
+        assert len(status_data) == message_len, f"Status must be {message_len} bytes long, got {len(status_data)}"
+
+        position = self._next
+        start = position * message_len
+        end = start + message_len
+        self._data[start:end] = status_data
+        self._timestamps[position] = time.time() if timestamp is None else timestamp
+
+        self._next = (position + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def clear(self) -> None:
+        self._next = 0
+        self._count = 0
+
+    def _position(self, index: int) -> int:
+        """
+        Convert the index of a status in the history to its position in the buffers.
+
+        :param index: The index of the status, 0 being the oldest one. Negative indexes count from the latest one
+        :return: The position of the status in the buffers
+        """
+        count = self._count
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("Status history index out of range")
+        return (self._next - count + index) % self.capacity
+
+    def _positions(self) -> Iterator[int]:
+        capacity = self.capacity
+        first = self._next - self._count
+        for i in range(self._count):
+            yield (first + i) % capacity
+
+    def raw(self, index: int) -> bytes:
+        """
+        :param index: The index of the status, 0 being the oldest one. Negative indexes count from the latest one
+        :return: The raw status bytes
+        """
+        start = self._position(index) * self.message_len_bytes
+        end = start + self.message_len_bytes
+        return bytes(self._data[start:end])
+
+    def timestamp(self, index: int) -> float:
+        """
+        :param index: The index of the status, 0 being the oldest one. Negative indexes count from the latest one
+        :return: The time the status was received at as a UNIX timestamp
+        """
+        return float(self._timestamps[self._position(index)])
+
+    @overload
+    def __getitem__(self, index: int) -> Tuple[float, StatusDataType]:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Tuple[float, StatusDataType]]:
+        ...
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[Tuple[float, StatusDataType], List[Tuple[float, StatusDataType]]]:
+        """
+        Decode the status at the index or the statuses in the slice.
+
+        :param index: The index of the status or a slice of the indexes, 0 being the oldest one
+        :return: A tuple of the timestamp and the decoded status or a list of such tuples
+        """
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        return self.timestamp(index), self._decode(self.raw(index))
+
+    def __iter__(self) -> Iterator[Tuple[float, StatusDataType]]:
+        """
+        Decode the statuses one by one, from the oldest one to the latest one.
+
+        :return: An iterator of tuples of the timestamp and the decoded status
+        """
+        data = memoryview(self._data)
+        message_len = self.message_len_bytes
+        for position in self._positions():
+            start = position * message_len
+            end = start + message_len
+            yield self._timestamps[position], self._decode(bytes(data[start:end]))
+
+    def timestamps(self) -> array:  # type: ignore[type-arg]
+        """
+        :return: The timestamps of the statuses as an array of doubles, from the oldest one to the latest one
+        """
+        return array("d", (self._timestamps[position] for position in self._positions()))
+
+    def raw_column(self, offset: int, width: int = 1) -> List[bytes]:
+        """
+        Read a byte range of all the raw statuses without decoding them.
+
+        :param offset: The offset of the byte range in the status message
+        :param width: The width of the byte range in bytes. Defaults to 1
+        :return: The byte ranges of the statuses, from the oldest one to the latest one
+        """
+        assert 0 <= offset and offset + width <= self.message_len_bytes, "Byte range does not fit into the status"
+
+        data = self._data
+        message_len = self.message_len_bytes
+        slots = []
+        for position in self._positions():
+            start = position * message_len + offset
+            end = start + width
+            slots.append(bytes(data[start:end]))
+        return slots
+
+    def column(self, field_name: str) -> List[Any]:
+        """
+        Decode a single status field of all the statuses.
+
+        :param field_name: The name of the status field, e.g. 'temperature_in'
+        :return: The values of the field, from the oldest one to the latest one
+        """
+        return [status[field_name] for _, status in self]
+
+    def columns(self) -> Dict[str, List[Any]]:
+        """
+        Decode all the statuses at once and split them into columns.
+
+        :return: A dict mapping the status field names and 'timestamp' to the lists of their values,
+            from the oldest status to the latest one
+        """
+        columns: Dict[str, List[Any]] = {"timestamp": list(self.timestamps())}
+        for _, status in self:
+            for field_name, value in status.items():
+                columns.setdefault(field_name, []).append(value)
+        return columns
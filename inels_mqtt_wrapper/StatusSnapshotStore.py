@@ -0,0 +1,249 @@
+import asyncio
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from ._logging import logger
+from ._tasks import background_tasks
+from .traffic_log import TOPIC_KINDS
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus
+
+SNAPSHOT_MAGIC = b"INELSSS1"
+_TOPIC_KIND_CODES = {topic_kind: code for code, topic_kind in enumerate(TOPIC_KINDS)}
+
+# Topic kind, gateway MAC address (6 bytes), device type (2 ASCII chars), device address (3 bytes),
+# wall clock timestamp, data length
+_SNAPSHOT_HEADER = struct.Struct("<B6s2s3sdH")
+
+# The wall clock timestamp and the raw status bytes or the set payload
+SnapshotType = Tuple[float, bytes]
+
+
+class StatusSnapshotStore:
+    """
+    An on-disk store of the last known statuses of the devices, for warm restarts.
+
+    The devices created with the store update their snapshot with the raw bytes of every new status and restore
+    their last known status from the store on initialization, marked as stale until the device sends a new one.
+    The statuses are decoded lazily, so restoring them takes a dict lookup per device.
+
+    The devices keeping a shadow of their settings, e.g. DeviceInterface09, store the last payload written to
+    their 'set' topic as well, see 'get_settings()'.
+
+    The snapshots are saved periodically, only if any of them has changed. Every save writes the whole store to
+    a temporary file and replaces the previous file with it, so a crash never leaves a partially written store.
+
+    Example:
+        store = StatusSnapshotStore("statuses.bin", save_interval_sec=30)
+        sensor = RFTI10B(..., snapshot_store=store)
+        sensor.status  # the status from the last run, sensor.status_stale is True
+        ...
+        await store.aclose()
+    """
+
+    def __init__(self, path: str, save_interval_sec: Optional[float] = 30.0) -> None:
+        """
+        :param path: The path of the store file. The snapshots of an existing store are loaded
+        :param save_interval_sec: The interval of saving the changed snapshots in seconds.
+            Defaults to 30s, None to save only with 'save()' or on closing
+        """
+        assert save_interval_sec is None or save_interval_sec > 0, "Save interval must be greater than zero"
+
+        self.path: str = path
+        self.save_interval_sec: Optional[float] = save_interval_sec
+        self.saves: int = 0
+
+        # By the status or set topic name of the device
+        self._snapshots: Dict[str, SnapshotType] = self._load(path)
+        self._dirty: bool = False
+        # Serializes the writes to the temporary file, made both from the event loop and from the executor threads
+        self._write_lock: threading.Lock = threading.Lock()
+        # The last write started in a thread. It keeps running if the save awaiting it is cancelled
+        self._write_future: "Optional[asyncio.Future[None]]" = None
+
+        if save_interval_sec is not None:
+            background_tasks.spawn(self._run(), owner=self)
+
+    @staticmethod
+    def _load(path: str) -> Dict[str, SnapshotType]:
+        """
+        Read the snapshots from the store file.
+
+        :param path: The path of the store file
+        :return: The snapshots by the topic name of the device, empty if there is no valid store file
+        """
+        try:
+            data = Path(path).read_bytes()
+        except FileNotFoundError:
+            return {}
+
+        if data[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            logger.warning(f"File {path} is not a status snapshot store, ignoring it")
+            return {}
+
+        snapshots: Dict[str, SnapshotType] = {}
+        offset = len(SNAPSHOT_MAGIC)
+        while offset + _SNAPSHOT_HEADER.size <= len(data):
+            topic_kind, mac_address, device_type, device_address, timestamp, length = _SNAPSHOT_HEADER.unpack_from(
+                data, offset
+            )
+            offset += _SNAPSHOT_HEADER.size
+            end = offset + length
+            if end > len(data):
+                logger.warning(f"Status snapshot store {path} is truncated, ignoring its last snapshot")
+                break
+            topic_name = (
+                f"inels/{TOPIC_KINDS[topic_kind]}/{mac_address.hex().upper()}/"
+                f"{device_type.decode('ascii')}/{device_address.hex().upper()}"
+            )
+            snapshots[topic_name] = (timestamp, data[offset:end])
+            offset = end
+
+        logger.info(f"Loaded {len(snapshots)} status snapshots from {path}")
+        return snapshots
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def get(self, device: "AbstractDeviceSupportsStatus") -> Optional[SnapshotType]:
+        """
+        :param device: The device to get the snapshot of
+        :return: The wall clock timestamp and the raw bytes of the device's last known status or None if unknown
+        """
+        return self._snapshots.get(device._status_topic_name)
+
+    def update(self, device: "AbstractDeviceSupportsStatus", status_data: bytes) -> None:
+        """
+        Replace the device's snapshot. The snapshot is written to the disk by the next save.
+
+        :param device: The device the status belongs to
+        :param status_data: The raw status bytes
+        :return: None
+        """
+        self._snapshots[device._status_topic_name] = (time.time(), status_data)
+        self._dirty = True
+
+    def get_settings(self, device: "AbstractDeviceSupportsStatus") -> Optional[SnapshotType]:
+        """
+        :param device: The device to get the settings of
+        :return: The wall clock timestamp and the payload last written to the device's 'set' topic or None if unknown
+        """
+        return self._snapshots.get(device._set_topic_name)
+
+    def update_settings(self, device: "AbstractDeviceSupportsStatus", set_payload: bytes) -> None:
+        """
+        Replace the payload last written to the device's 'set' topic. The payload is written to the disk
+        by the next save.
+
+        :param device: The device the payload was written to
+        :param set_payload: The set payload bytes
+        :return: None
+        """
+        self._snapshots[device._set_topic_name] = (time.time(), set_payload)
+        self._dirty = True
+
+    @staticmethod
+    def _write(path: str, snapshots: List[Tuple[str, SnapshotType]]) -> None:
+        """
+        Atomically replace the store file with the snapshots.
+
+        :param path: The path of the store file
+        :param snapshots: The snapshots by the topic name of the device
+        :return: None
+        """
+        store_path = Path(path)
+        temporary_path = Path(f"{path}.tmp")
+        with temporary_path.open("wb") as file:
+            file.write(SNAPSHOT_MAGIC)
+            for topic_name, (timestamp, data) in snapshots:
+                _, topic_kind, mac_address, device_type, device_address = topic_name.split("/")
+                file.write(
+                    _SNAPSHOT_HEADER.pack(
+                        _TOPIC_KIND_CODES[topic_kind],
+                        bytes.fromhex(mac_address),
+                        device_type.encode("ascii"),
+                        bytes.fromhex(device_address),
+                        timestamp,
+                        len(data),
+                    )
+                )
+                file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        temporary_path.replace(store_path)
+        # Make the replacement itself durable. Directories cannot be opened on Windows
+        if hasattr(os, "O_DIRECTORY"):
+            directory_fd = os.open(store_path.parent, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(directory_fd)
+            finally:
+                os.close(directory_fd)
+
+    def _write_locked(self, snapshots: List[Tuple[str, SnapshotType]]) -> None:
+        with self._write_lock:
+            self._write(self.path, snapshots)
+
+    def save(self) -> None:
+        """
+        Write all the snapshots to the disk right away.
+
+        :return: None
+        """
+        self._dirty = False
+        self._write_locked(list(self._snapshots.items()))
+        self.saves += 1
+
+    async def _save_in_thread(self) -> None:
+        """
+        Write all the snapshots to the disk without blocking the event loop.
+        The snapshots updated during the write are saved by the next save.
+
+        :return: None
+        """
+        self._dirty = False
+        snapshots = list(self._snapshots.items())
+        self._write_future = asyncio.get_running_loop().run_in_executor(None, self._write_locked, snapshots)
+        # Cancelling the save does not stop the thread, so do not let it cancel the future tracking the write
+        await asyncio.shield(self._write_future)
+        self.saves += 1
+
+    async def _run(self) -> None:
+        """
+        A task for saving the changed snapshots every save interval.
+
+        :return: None
+        """
+        assert self.save_interval_sec is not None
+        while True:
+            try:
+                await asyncio.sleep(self.save_interval_sec)
+                if self._dirty:
+                    await self._save_in_thread()
+            except asyncio.CancelledError:
+                logger.warning("Task cancelled. Stopped saving the status snapshots")
+                break
+            except OSError as e:
+                self._dirty = True
+                logger.error(f"Failed to save the status snapshots to {self.path}: {e}")
+
+    async def aclose(self) -> None:
+        """
+        Stop saving periodically and save the changed snapshots.
+
+        :return: None
+        """
+        await background_tasks.aclose(self)
+        write_future = self._write_future
+        if write_future is not None:
+            # Wait for a periodic save interrupted by the closing
+            await asyncio.wait([write_future])
+            if write_future.exception() is not None:
+                self._dirty = True
+        if self._dirty:
+            await self._save_in_thread()
+        logger.info(f"Closed status snapshot store {self.path}")
@@ -0,0 +1,125 @@
+import asyncio
+from collections import deque
+from types import TracebackType
+from typing import Callable, Deque, Literal, Optional, Type
+
+from .StatusDecoder import StatusDataType
+
+OverflowPolicyType = Literal["drop_oldest", "coalesce_latest"]
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce_latest")
+
+
+class StatusSubscription:
+    """
+    A bounded queue of a device's status updates for a single consumer.
+
+    Each consumer gets its own queue, so the consumers do not race each other and no update
+    is lost between the iterations unless the queue overflows. On overflow, the 'drop_oldest'
+    policy discards the oldest queued update, while the 'coalesce_latest' policy collapses all
+    the queued updates into the latest one.
+
+    A subscription created with 'include_unchanged' also receives the statuses identical to the previous one,
+    which the device skips when it deduplicates its statuses, e.g. to see a command confirmed by a status
+    that has not changed.
+
+    Example:
+        async with device.status_updates(maxsize=8) as updates:
+            async for status in updates:
+                print(status)
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 16,
+        overflow_policy: OverflowPolicyType = "drop_oldest",
+        on_close: Optional[Callable[["StatusSubscription"], None]] = None,
+        include_unchanged: bool = False,
+    ) -> None:
+        """
+        :param maxsize: The maximum number of queued updates. Defaults to 16
+        :param overflow_policy: What to do when the queue is full: 'drop_oldest' or 'coalesce_latest'.
+            Defaults to 'drop_oldest'
+        :param on_close: Function to call when the subscription is closed. Defaults to None
+        :param include_unchanged: Whether to receive the statuses skipped by the deduplication as well.
+            Defaults to False
+        """
+        assert maxsize > 0, "Queue size must be greater than zero"
+        assert overflow_policy in OVERFLOW_POLICIES, f"Overflow policy must be one of {OVERFLOW_POLICIES}"
+
+        self.maxsize: int = maxsize
+        self.overflow_policy: OverflowPolicyType = overflow_policy
+        self.include_unchanged: bool = include_unchanged
+        self.dropped_updates: int = 0
+        self.closed: bool = False
+
+        self._queue: Deque[StatusDataType] = deque()
+        self._updated_event: asyncio.Event = asyncio.Event()
+        self._on_close: Optional[Callable[["StatusSubscription"], None]] = on_close
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def put(self, status: StatusDataType) -> None:
+        """
+        Queue the status update, applying the overflow policy if the queue is full.
+
+        :param status: The device status
+        :return: None
+        """
+        if self.closed:
+            return
+
+        if len(self._queue) >= self.maxsize:
+            if self.overflow_policy == "drop_oldest":
+                self._queue.popleft()
+                self.dropped_updates += 1
+            else:
+                self.dropped_updates += len(self._queue)
+                self._queue.clear()
+        self._queue.append(status)
+        self._updated_event.set()
+
+    async def get(self) -> StatusDataType:
+        """
+        Wait for the next status update.
+
+        Raises StopAsyncIteration if the subscription is closed and there are no queued updates left.
+
+        :return: The device status
+        """
+        while not self._queue:
+            if self.closed:
+                raise StopAsyncIteration
+            self._updated_event.clear()
+            await self._updated_event.wait()
+        return self._queue.popleft()
+
+    def close(self) -> None:
+        """
+        Stop receiving the updates. The already queued updates can still be consumed.
+
+        :return: None
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self._updated_event.set()
+        if self._on_close is not None:
+            self._on_close(self)
+
+    def __aiter__(self) -> "StatusSubscription":
+        return self
+
+    async def __anext__(self) -> StatusDataType:
+        return await self.get()
+
+    async def __aenter__(self) -> "StatusSubscription":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
@@ -0,0 +1,121 @@
+from typing import Any, Callable, ClassVar, Dict, ItemsView, Iterator, Mapping, Optional, Tuple, Type, ValuesView
+
+
+class StatusView(Mapping[str, Any]):
+    """
+    A read-only, lazily decoded device status.
+
+    The view holds the raw status bytes and decodes a field only when it is accessed for the first time.
+    The decoded values are cached. Operations that need all the fields, e.g. iterating over the items,
+    comparing or printing the status, decode the whole status in a single pass.
+
+    The view supports the same read access as a dict: `status["temperature_in"]`, `status.get(...)`,
+    `in`, `items()`, comparison with a dict, `status | {...}`, etc. Use `to_dict()` to get a mutable copy.
+    The view is not a dict subclass, thus `json.dumps()` needs `to_dict()` as well. Pickling or copying
+    the view yields a dict.
+
+    The fields with a lookup table not covering all the possible values are decoded right away, so that
+    a value missing from the table is reported as a decoding error when the message arrives rather than
+    when the field is read.
+
+    A subclass is compiled for every status decoder by StatusDecoder, see its 'view_class' attribute.
+    """
+
+    __slots__ = ("raw", "_values")
+
+    _decode: ClassVar[Callable[[bytes], Dict[str, Any]]]
+    _field_getters: ClassVar[Dict[str, Callable[[bytes], Any]]] = {}
+    _field_names: ClassVar[Tuple[str, ...]] = ()
+    _eager_field_names: ClassVar[Tuple[str, ...]] = ()
+
+    def __init__(self, raw_status_data: bytes) -> None:
+        """
+        :param raw_status_data: The raw status bytes, parsed from the hex message
+        """
+        self.raw: bytes = raw_status_data
+        self._values: Optional[Dict[str, Any]] = None
+        for key in self._eager_field_names:
+            self[key]
+
+    @classmethod
+    def from_decoded(cls, raw_status_data: bytes, values: Dict[str, Any]) -> "StatusView":
+        """
+        Create a view of a status decoded elsewhere, e.g. in a worker process, without decoding it again.
+
+        :param raw_status_data: The raw status bytes
+        :param values: All the decoded fields of the status
+        :return: The view
+        """
+        view = cls.__new__(cls)
+        view.raw = raw_status_data
+        view._values = values
+        return view
+
+    def __getitem__(self, key: str) -> Any:
+        values = self._values
+        if values is None:
+            values = self._values = {}
+        elif key in values:
+            return values[key]
+        value = values[key] = self._field_getters[key](self.raw)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._field_names)
+
+    def __len__(self) -> int:
+        return len(self._field_names)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._field_getters
+
+    def _decoded(self) -> Dict[str, Any]:
+        """
+        Decode all the fields, unless they have been decoded already.
+
+        :return: The internal dict of all the decoded fields, not to be modified
+        """
+        values = self._values
+        if values is None or len(values) != len(self._field_names):
+            values = self._values = type(self)._decode(self.raw)
+        return values
+
+    def items(self) -> ItemsView[str, Any]:
+        return self._decoded().items()
+
+    def values(self) -> ValuesView[Any]:
+        return self._decoded().values()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        :return: A new dict containing all the decoded status fields
+        """
+        return dict(self._decoded())
+
+    copy = to_dict
+
+    def __reduce__(self) -> Tuple[Type[Dict[str, Any]], Tuple[Dict[str, Any]]]:
+        # The compiled view classes cannot be looked up by name, so the view is pickled as a dict
+        return dict, (self.to_dict(),)
+
+    def __or__(self, other: object) -> Dict[str, Any]:
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return {**self._decoded(), **other}
+
+    def __ror__(self, other: object) -> Dict[str, Any]:
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return {**other, **self._decoded()}
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, StatusView):
+            if type(other) is type(self) and other.raw == self.raw:
+                return True
+            return self._decoded() == other._decoded()
+        if isinstance(other, Mapping):
+            return self._decoded() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(self._decoded())
@@ -0,0 +1,173 @@
+import asyncio
+import time
+from contextvars import ContextVar, Token
+from types import TracebackType
+from typing import Iterable, List, Optional, Type
+
+import asyncio_mqtt as aiomqtt
+
+from ._logging import logger
+
+# SUBSCRIBE/UNSUBSCRIBE fixed header: 1 byte of packet type and flags plus up to 4 bytes of remaining length
+_FIXED_HEADER_MAX_LEN_BYTES = 5
+_PACKET_ID_LEN_BYTES = 2
+_TOPIC_LEN_PREFIX_BYTES = 2
+_QOS_LEN_BYTES = 1
+
+_current_batch: ContextVar[Optional["SubscriptionBatch"]] = ContextVar("_current_batch", default=None)
+
+
+def current_subscription_batch() -> Optional["SubscriptionBatch"]:
+    """
+    Get the subscription batch, active in the current context.
+
+    :return: The active SubscriptionBatch instance or None if there is none
+    """
+    return _current_batch.get()
+
+
+def split_topics_into_packets(
+    topics: Iterable[str],
+    max_packet_size_bytes: int,
+    subscribe: bool = True,
+) -> List[List[str]]:
+    """
+    Split the topics into groups, each fitting into a single SUBSCRIBE (or UNSUBSCRIBE) packet.
+
+    :param topics: The names of the topics
+    :param max_packet_size_bytes: The maximum packet size accepted by the broker
+    :param subscribe: Whether the groups are meant for SUBSCRIBE or UNSUBSCRIBE packets. Defaults to True
+    :return: A list of topic groups
+    """
+    per_topic_overhead = _TOPIC_LEN_PREFIX_BYTES + (_QOS_LEN_BYTES if subscribe else 0)
+    packet_overhead = _FIXED_HEADER_MAX_LEN_BYTES + _PACKET_ID_LEN_BYTES
+
+    packets: List[List[str]] = []
+    current_packet: List[str] = []
+    current_size = packet_overhead
+    for topic in topics:
+        topic_size = per_topic_overhead + len(topic.encode("utf-8"))
+        if packet_overhead + topic_size > max_packet_size_bytes:
+            raise ValueError(f"Topic {topic} does not fit into a packet of {max_packet_size_bytes} bytes")
+        if current_packet and current_size + topic_size > max_packet_size_bytes:
+            packets.append(current_packet)
+            current_packet = []
+            current_size = packet_overhead
+        current_packet.append(topic)
+        current_size += topic_size
+
+    if current_packet:
+        packets.append(current_packet)
+    return packets
+
+
+async def unsubscribe_in_bulk(
+    mqtt_client: aiomqtt.Client,
+    topics: Iterable[str],
+    max_packet_size_bytes: int = 65535,
+) -> int:
+    """
+    Unsubscribe from the given topics using as few UNSUBSCRIBE packets as possible.
+
+    :param mqtt_client: An instance of asyncio_mqtt.Client
+    :param topics: The names of the topics to unsubscribe from
+    :param max_packet_size_bytes: The maximum packet size accepted by the broker. Defaults to 65535
+    :return: The number of UNSUBSCRIBE packets sent
+    """
+    packets = split_topics_into_packets(topics, max_packet_size_bytes, subscribe=False)
+    for packet_topics in packets:
+        await mqtt_client.unsubscribe(packet_topics)
+    return len(packets)
+
+
+class SubscriptionBatch:
+    """
+    An async context manager for bringing up many devices at once.
+
+    The devices initialized within the context do not subscribe to their topics one by one.
+    Instead, their topics are collected and subscribed to on exit using as few multi-topic
+    SUBSCRIBE packets as the broker's maximum packet size allows.
+
+    Example:
+        async with SubscriptionBatch(client) as batch:
+            devices = [RFTI10B(mac_address, address, client) for address in addresses]
+        print(batch.packets_sent, batch.duration_sec)
+    """
+
+    def __init__(self, mqtt_client: aiomqtt.Client, max_packet_size_bytes: int = 65535, qos: int = 0) -> None:
+        """
+        :param mqtt_client: An instance of asyncio_mqtt.Client
+        :param max_packet_size_bytes: The maximum packet size accepted by the broker. Defaults to 65535
+        :param qos: The QoS level of the subscriptions. Defaults to 0
+        """
+        self._mqtt_client: aiomqtt.Client = mqtt_client
+        self._max_packet_size_bytes: int = max_packet_size_bytes
+        self._qos: int = qos
+        self._pending_topics: List[str] = []
+
+        self.topics_subscribed: int = 0
+        self.packets_sent: int = 0
+        self.duration_sec: float = 0.0
+
+        self._started_at: float = 0.0
+        self._token: Optional["Token[Optional[SubscriptionBatch]]"] = None
+
+    def add(self, topic_name: str) -> None:
+        """
+        Add the topic to the batch. The subscription is sent when the batch is flushed.
+
+        :param topic_name: The name of the topic to subscribe to
+        :return: None
+        """
+        self._pending_topics.append(topic_name)
+
+    async def flush(self) -> None:
+        """
+        Subscribe to all the pending topics with multi-topic SUBSCRIBE packets.
+
+        :return: None
+        """
+        topics = list(dict.fromkeys(self._pending_topics))
+        self._pending_topics.clear()
+
+        for packet_topics in split_topics_into_packets(topics, self._max_packet_size_bytes):
+            try:
+                await self._mqtt_client.subscribe([(topic, self._qos) for topic in packet_topics])
+            except Exception as e:
+                logger.error(str(e))
+                raise e
+            self.packets_sent += 1
+            self.topics_subscribed += len(packet_topics)
+
+    async def __aenter__(self) -> "SubscriptionBatch":
+        self._started_at = time.monotonic()
+        self._token = _current_batch.set(self)
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        if self._token is not None:
+            _current_batch.reset(self._token)
+
+        # Let the listener tasks of the new devices start receiving before subscribing.
+        # The devices created before an error are listening already, thus their topics are subscribed to as well
+        await asyncio.sleep(0)
+        try:
+            await self.flush()
+        except Exception:
+            if exc_type is None:
+                raise
+            # Do not mask the error raised within the context, the flush error has been logged
+            return
+        if exc_type is not None:
+            return
+
+        self.duration_sec = time.monotonic() - self._started_at
+        logger.info(
+            f"Subscribed to {self.topics_subscribed} topics with {self.packets_sent} SUBSCRIBE packets "
+            f"in {self.duration_sec:.3f}s"
+        )
@@ -8,10 +8,14 @@ from ._device_interfaces import (
     DeviceInterface19,
 )
 from ._logging import logger
-from ._tasks import background_tasks
+from ._metrics import MetricsRegistry, metrics
+from ._tasks import TaskSupervisor, background_tasks
 from .AbstractDeviceInterface import AbstractDeviceInterface
 from .AbstractDeviceSupportsSet import AbstractDeviceSupportsSet
 from .AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus
+from .bulk_decoding import decode_status_bulk
+from .command_confirmation import confirm_command, confirmation_latency, confirmation_latency_snapshot
+from .CommandScheduler import CommandScheduler, TokenBucket
 from .concrete_devices import (
     RFATV2,
     RFDAC71B,
@@ -25,14 +29,56 @@ from .concrete_devices import (
     RFTC10G,
     RFTI10B,
 )
-from .exceptions import DeviceDisconnectedError, DeviceStatusUnknownError
+from .ConnectionSupervisor import ConnectionSupervisor
+from .DeviceGroup import DeviceGroup, GroupCommandResult
+from .exceptions import CommandNotConfirmedError, DeviceDisconnectedError, DeviceStatusUnknownError
+from .Gateway import DEVICE_INTERFACE_CLASSES, Gateway
+from .GatewayPool import GatewayPool
+from .GatewayRouter import GatewayRouter
+from .HeartbeatMonitor import HeartbeatMonitor
+from .LatencyHistogram import LatencyHistogram
+from .ParallelDecoder import ParallelDecoder
+from .simulator import DeviceSimulator, FaultProfile, SimulatedClient
+from .StatusDecoder import StatusDecoder, StatusField
+from .StatusHistory import StatusHistory
+from .StatusSnapshotStore import StatusSnapshotStore
+from .StatusSubscription import StatusSubscription
+from .StatusView import StatusView
+from .SubscriptionBatch import SubscriptionBatch, unsubscribe_in_bulk
+from .traffic_log import TrafficRecord, TrafficRecorder, TrafficReplayer
 
 __all__ = (
     "background_tasks",
+    "TaskSupervisor",
     "logger",
+    "metrics",
+    "MetricsRegistry",
     "AbstractDeviceInterface",
     "AbstractDeviceSupportsStatus",
     "AbstractDeviceSupportsSet",
+    "CommandScheduler",
+    "ConnectionSupervisor",
+    "TokenBucket",
+    "DeviceGroup",
+    "GroupCommandResult",
+    "DEVICE_INTERFACE_CLASSES",
+    "Gateway",
+    "GatewayPool",
+    "GatewayRouter",
+    "HeartbeatMonitor",
+    "LatencyHistogram",
+    "ParallelDecoder",
+    "confirm_command",
+    "confirmation_latency",
+    "confirmation_latency_snapshot",
+    "StatusDecoder",
+    "StatusField",
+    "StatusHistory",
+    "StatusSnapshotStore",
+    "StatusView",
+    "StatusSubscription",
+    "SubscriptionBatch",
+    "unsubscribe_in_bulk",
     "DeviceInterface02",
     "DeviceInterface03",
     "DeviceInterface05",
@@ -51,6 +97,14 @@ __all__ = (
     "RFTC10G",
     "RFGB40",
     "RFKEY40",
+    "DeviceSimulator",
+    "FaultProfile",
+    "SimulatedClient",
+    "decode_status_bulk",
+    "TrafficRecord",
+    "TrafficRecorder",
+    "TrafficReplayer",
+    "CommandNotConfirmedError",
     "DeviceDisconnectedError",
     "DeviceStatusUnknownError",
 )
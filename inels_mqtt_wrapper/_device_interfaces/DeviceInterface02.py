@@ -1,28 +1,28 @@
+from typing import Tuple
+
 from .._logging import logger
 from ..AbstractDeviceSupportsSet import AbstractDeviceSupportsSet
-from ..AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus, StatusDataType
+from ..AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus
+from ..command_confirmation import confirm_command
+from ..StatusDecoder import StatusField
 
 
 class DeviceInterface02(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet):
     """A base class for all the devices implementing the 'device type 02' interface"""
 
     device_type: str = "02"
+    status_message_len_bytes: int = 2
     set_message_len_bytes: int = 3
+    # Switching on and off and setting the ramp times, not the impulse, the ramps and the communication test
+    coalescable_set_opcodes: Tuple[bytes, ...] = (b"\x01", b"\x02", b"\x06", b"\x07")
+    cached_set_payloads: Tuple[bytes, ...] = (b"\x01", b"\x02", b"\x03", b"\x04", b"\x05", b"\x08")
 
-    @staticmethod
-    def _decode_status(raw_status_data: bytearray) -> StatusDataType:  # TODO: Testing required
-        """
-        A method for decoding the device's status from bytes.
-
-        :param raw_status_data: A bytearray object containing the bytes, published by the device in the topic.
-        :return: A device-specific dict, containing its status. For this device:
-            {"unit_id": 2, "switched_on": True}
-        """
-        data_0, data_1 = raw_status_data
-        return {
-            "unit_id": data_0,
-            "switched_on": bool(data_1),
-        }
+    # TODO: Testing required
+    # Status example: {"unit_id": 2, "switched_on": True}
+    status_fields: Tuple[StatusField, ...] = (
+        StatusField("unit_id", offset=0),
+        StatusField("switched_on", offset=1, convert=bool),
+    )
 
     @staticmethod
     def _encode_ramp_time(ramp_time_duration_sec: int) -> bytes:
@@ -43,9 +43,22 @@ class DeviceInterface02(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         :return: None
         """
         data_0 = b"\x01"
-        payload = bytearray(data_0)
-        await self._publish_to_set_topic(payload)
-        logger.info(f"Switch on command sent to the device {self.dev_id}")
+        await self._publish_to_set_topic(data_0)
+        logger.info("Switch on command sent to the device %s", self.dev_id)
+
+    async def switch_on_confirmed(self, timeout_sec: float = 5.0, retries: int = 0) -> float:
+        """
+        Switch on the device and wait until the device's status confirms it.
+
+        Raises CommandNotConfirmedError if the status has not been confirmed after all the retries.
+
+        :param timeout_sec: How long to wait for the confirmation after each attempt in seconds. Defaults to 5s
+        :param retries: How many times to resend the command if it is not confirmed. Defaults to 0
+        :return: The command-to-confirmation latency in seconds
+        """
+        return await confirm_command(
+            self, self.switch_on, {"switched_on": True}, timeout_sec=timeout_sec, retries=retries
+        )
 
     async def switch_off(self) -> None:  # TODO: Testing required
         """
@@ -54,9 +67,22 @@ class DeviceInterface02(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         :return: None
         """
         data_0 = b"\x02"
-        payload = bytearray(data_0)
-        await self._publish_to_set_topic(payload)
-        logger.info(f"Switch off command sent to the device {self.dev_id}")
+        await self._publish_to_set_topic(data_0)
+        logger.info("Switch off command sent to the device %s", self.dev_id)
+
+    async def switch_off_confirmed(self, timeout_sec: float = 5.0, retries: int = 0) -> float:
+        """
+        Switch off the device and wait until the device's status confirms it.
+
+        Raises CommandNotConfirmedError if the status has not been confirmed after all the retries.
+
+        :param timeout_sec: How long to wait for the confirmation after each attempt in seconds. Defaults to 5s
+        :param retries: How many times to resend the command if it is not confirmed. Defaults to 0
+        :return: The command-to-confirmation latency in seconds
+        """
+        return await confirm_command(
+            self, self.switch_off, {"switched_on": False}, timeout_sec=timeout_sec, retries=retries
+        )
 
     async def impulse(self) -> None:  # TODO: Testing required
         """
@@ -65,9 +91,8 @@ class DeviceInterface02(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         :return: None
         """
         data_0 = b"\x03"
-        payload = bytearray(data_0)
-        await self._publish_to_set_topic(payload)
-        logger.info(f"Impulse command sent to the device {self.dev_id}")
+        await self._publish_to_set_topic(data_0)
+        logger.info("Impulse command sent to the device %s", self.dev_id)
 
     async def ramp_down(self) -> None:  # TODO: Testing required
         """
@@ -76,8 +101,7 @@ class DeviceInterface02(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         :return: None
         """
         data_0 = b"\x04"
-        payload = bytearray(data_0)
-        await self._publish_to_set_topic(payload)
+        await self._publish_to_set_topic(data_0)
 
     async def ramp_up(self) -> None:  # TODO: Testing required
         """
@@ -86,9 +110,8 @@ class DeviceInterface02(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         :return: None
         """
         data_0 = b"\x05"
-        payload = bytearray(data_0)
-        await self._publish_to_set_topic(payload)
-        logger.info(f"Ramp up command sent to the device {self.dev_id}")
+        await self._publish_to_set_topic(data_0)
+        logger.info("Ramp up command sent to the device %s", self.dev_id)
 
     async def test_communication(self) -> None:  # TODO: Testing required
         """
@@ -97,9 +120,8 @@ class DeviceInterface02(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         :return: None
         """
         data_0 = b"\x08"
-        payload = bytearray(data_0)
-        await self._publish_to_set_topic(payload)
-        logger.info(f"Test communication command sent to the device {self.dev_id}")
+        await self._publish_to_set_topic(data_0)
+        logger.info("Test communication command sent to the device %s", self.dev_id)
 
     async def set_ramp_down_time_seconds(self, ramp_duration_seconds: int) -> None:  # TODO: Testing required
         """
@@ -1,6 +1,10 @@
+from typing import Tuple
+
 from .._logging import logger
 from ..AbstractDeviceSupportsSet import AbstractDeviceSupportsSet
-from ..AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus, StatusDataType
+from ..AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus
+from ..command_confirmation import confirm_command
+from ..StatusDecoder import StatusField
 
 
 class DeviceInterface03(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet):
@@ -9,22 +13,26 @@ class DeviceInterface03(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
     device_type: str = "03"
     status_message_len_bytes: int = 2
     set_message_len_bytes: int = 3
-
-    @staticmethod
-    def _decode_status(raw_status_data: bytearray) -> StatusDataType:  # TODO: Testing required
-        """
-        A method for decoding the device's status from bytes.
-
-        :param raw_status_data: A bytearray object containing the bytes, published by the device in the topic.
-        :return: A device-specific dict, containing its status. For this device:
-            {"unit_id": 3, "shutters_are_up": True, "shutters_are_down": False}
-        """
-        data_0, data_1 = raw_status_data
-        return {
-            "unit_id": data_0,
-            "shutters_are_up": data_1 == int.from_bytes(b"\x00", byteorder="big"),
-            "shutters_are_down": data_1 == int.from_bytes(b"\x01", byteorder="big"),
-        }
+    # Moving the shutters and setting the travel times, not the communication test
+    coalescable_set_opcodes: Tuple[bytes, ...] = (
+        b"\x01",
+        b"\x02",
+        b"\x03",
+        b"\x04",
+        b"\x05",
+        b"\x06",
+        b"\x07",
+        b"\x08",
+    )
+    cached_set_payloads: Tuple[bytes, ...] = (b"\x01", b"\x02", b"\x03", b"\x04", b"\x05", b"\x06", b"\x09")
+
+    # TODO: Testing required
+    # Status example: {"unit_id": 3, "shutters_are_up": True, "shutters_are_down": False}
+    status_fields: Tuple[StatusField, ...] = (
+        StatusField("unit_id", offset=0),
+        StatusField("shutters_are_up", offset=1, equals=0x00),
+        StatusField("shutters_are_down", offset=1, equals=0x01),
+    )
 
     async def immediately_pull_up_the_shutters(self) -> None:  # TODO: Testing required
         """
@@ -33,9 +41,26 @@ class DeviceInterface03(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         :return: None
         """
         data_0 = b"\x01"
-        payload = bytearray(data_0)
-        await self._publish_to_set_topic(payload)
-        logger.info(f"Command to immediately pull up the shutters sent to the device {self.dev_id}")
+        await self._publish_to_set_topic(data_0)
+        logger.info("Command to immediately pull up the shutters sent to the device %s", self.dev_id)
+
+    async def immediately_pull_up_the_shutters_confirmed(self, timeout_sec: float = 5.0, retries: int = 0) -> float:
+        """
+        Immediately pull up the shutters and wait until the device's status confirms it.
+
+        Raises CommandNotConfirmedError if the status has not been confirmed after all the retries.
+
+        :param timeout_sec: How long to wait for the confirmation after each attempt in seconds. Defaults to 5s
+        :param retries: How many times to resend the command if it is not confirmed. Defaults to 0
+        :return: The command-to-confirmation latency in seconds
+        """
+        return await confirm_command(
+            self,
+            self.immediately_pull_up_the_shutters,
+            {"shutters_are_up": True},
+            timeout_sec=timeout_sec,
+            retries=retries,
+        )
 
     async def immediately_pull_down_the_shutters(self) -> None:  # TODO: Testing required
         """
@@ -44,9 +69,26 @@ class DeviceInterface03(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         :return: None
         """
         data_0 = b"\x02"
-        payload = bytearray(data_0)
-        await self._publish_to_set_topic(payload)
-        logger.info(f"Command to immediately pull down the shutters sent to the device {self.dev_id}")
+        await self._publish_to_set_topic(data_0)
+        logger.info("Command to immediately pull down the shutters sent to the device %s", self.dev_id)
+
+    async def immediately_pull_down_the_shutters_confirmed(self, timeout_sec: float = 5.0, retries: int = 0) -> float:
+        """
+        Immediately pull down the shutters and wait until the device's status confirms it.
+
+        Raises CommandNotConfirmedError if the status has not been confirmed after all the retries.
+
+        :param timeout_sec: How long to wait for the confirmation after each attempt in seconds. Defaults to 5s
+        :param retries: How many times to resend the command if it is not confirmed. Defaults to 0
+        :return: The command-to-confirmation latency in seconds
+        """
+        return await confirm_command(
+            self,
+            self.immediately_pull_down_the_shutters,
+            {"shutters_are_down": True},
+            timeout_sec=timeout_sec,
+            retries=retries,
+        )
 
     async def start_shutters_up(self) -> None:  # TODO: Testing required
         """
@@ -55,9 +97,8 @@ class DeviceInterface03(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         :return: None
         """
         data_0 = b"\x03"
-        payload = bytearray(data_0)
-        await self._publish_to_set_topic(payload)
-        logger.info(f"Command to start pulling up the shutters sent to the device {self.dev_id}")
+        await self._publish_to_set_topic(data_0)
+        logger.info("Command to start pulling up the shutters sent to the device %s", self.dev_id)
 
     async def stop_shutters_up(self) -> None:  # TODO: Testing required
         """
@@ -66,9 +107,8 @@ class DeviceInterface03(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         :return: None
         """
         data_0 = b"\x04"
-        payload = bytearray(data_0)
-        await self._publish_to_set_topic(payload)
-        logger.info(f"Command to stop pulling up the shutters sent to the device {self.dev_id}")
+        await self._publish_to_set_topic(data_0)
+        logger.info("Command to stop pulling up the shutters sent to the device %s", self.dev_id)
 
     async def start_shutters_down(self) -> None:  # TODO: Testing required
         """
@@ -77,9 +117,8 @@ class DeviceInterface03(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         :return: None
         """
         data_0 = b"\x05"
-        payload = bytearray(data_0)
-        await self._publish_to_set_topic(payload)
-        logger.info(f"Command to start pulling down the shutters sent to the device {self.dev_id}")
+        await self._publish_to_set_topic(data_0)
+        logger.info("Command to start pulling down the shutters sent to the device %s", self.dev_id)
 
     async def stop_shutters_down(self) -> None:  # TODO: Testing required
         """
@@ -88,9 +127,8 @@ class DeviceInterface03(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         :return: None
         """
         data_0 = b"\x06"
-        payload = bytearray(data_0)
-        await self._publish_to_set_topic(payload)
-        logger.info(f"Command to stop pulling down the shutters sent to the device {self.dev_id}")
+        await self._publish_to_set_topic(data_0)
+        logger.info("Command to stop pulling down the shutters sent to the device %s", self.dev_id)
 
     async def test_communication(self) -> None:  # TODO: Testing required
         """
@@ -99,9 +137,8 @@ class DeviceInterface03(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         :return: None
         """
         data_0 = b"\x09"
-        payload = bytearray(data_0)
-        await self._publish_to_set_topic(payload)
-        logger.info(f"Test communication command sent to the device {self.dev_id}")
+        await self._publish_to_set_topic(data_0)
+        logger.info("Test communication command sent to the device %s", self.dev_id)
 
     @staticmethod
     def _encode_time(time_seconds_int: int) -> bytes:
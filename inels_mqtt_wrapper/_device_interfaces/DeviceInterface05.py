@@ -1,6 +1,32 @@
+from typing import Dict, Tuple
+
 from .._logging import logger
 from ..AbstractDeviceSupportsSet import AbstractDeviceSupportsSet
-from ..AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus, StatusDataType
+from ..AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus
+from ..command_confirmation import confirm_command
+from ..StatusDecoder import StatusField
+
+
+def _decode_brightness(raw_value: int) -> int:
+    """
+    Decode the brightness percentage from the raw value published by the device.
+
+    :param raw_value: The raw 2-byte brightness value as an integer
+    :return: The brightness percentage
+    """
+    return int((0xFFFF - raw_value - 10000) / 1000 * 5)
+
+
+def _encode_brightness(brightness: int) -> bytes:
+    """
+    Encode the brightness percentage data into bytes, accepted by the device.
+
+    :param brightness: The desired brightness percentage value.
+        Brightness percentage must be an integer between 0 and 100 increased in 10% steps.
+    :return: Bytes data, accepted by the device
+    """
+    out_real = 0xFFFF - (brightness / 5 * 1000 + 10000)
+    return int(out_real).to_bytes(length=2, byteorder="big")
 
 
 class DeviceInterface05(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet):
@@ -9,31 +35,19 @@ class DeviceInterface05(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
     device_type: str = "05"
     status_message_len_bytes: int = 2
     set_message_len_bytes: int = 3
+    # Setting the brightness and the ramp times, not the ramp, the toggle and the communication test
+    coalescable_set_opcodes: Tuple[bytes, ...] = (b"\x01", b"\x05", b"\x06")
 
-    @staticmethod
-    def _decode_status(raw_status_data: bytearray) -> StatusDataType:
-        """
-        A method for decoding the device's status from bytes.
+    # The 'set brightness' command payloads for every accepted brightness percentage
+    _brightness_payloads: Dict[int, bytes] = {
+        brightness: b"\x01" + _encode_brightness(brightness) for brightness in range(0, 110, 10)
+    }
+    cached_set_payloads: Tuple[bytes, ...] = (b"\x02", b"\x04", b"\x07", *_brightness_payloads.values())
 
-        :param raw_status_data: A bytearray object containing the bytes, published by the device in the topic.
-        :return: A device-specific dict, containing its status. For this device:
-            {"brightness_percentage": 100}
-        """
-        raw_value = 0xFFFF - int.from_bytes(raw_status_data, byteorder="big")
-        brightness_percentage = int((raw_value - 10000) / 1000 * 5)
-        return {"brightness_percentage": brightness_percentage}
-
-    @staticmethod
-    def _encode_brightness(brightness: int) -> bytes:
-        """
-        Encode the brightness percentage data into bytes, accepted by the device.
-
-        :param brightness: The desired brightness percentage value.
-            Brightness percentage must be an integer between 0 and 100 increased in 10% steps.
-        :return: Bytes data, accepted by the device
-        """
-        out_real = 0xFFFF - (brightness / 5 * 1000 + 10000)
-        return int(out_real).to_bytes(length=2, byteorder="big")
+    # Status example: {"brightness_percentage": 100}
+    status_fields: Tuple[StatusField, ...] = (
+        StatusField("brightness_percentage", offset=0, width=2, convert=_decode_brightness),
+    )
 
     @staticmethod
     def _encode_ramp_time(ramp_time_duration_sec: int) -> bytes:
@@ -57,13 +71,30 @@ class DeviceInterface05(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         assert brightness_percentage in range(
             0, 110, 10
         ), "Brightness percentage must be an integer between 0 and 100 increased in 10% steps"
-        data_0 = b"\x01"
-        payload = bytearray(data_0)
-        brightness_encoded = self._encode_brightness(brightness_percentage)
-        payload.extend(bytearray(brightness_encoded))
-        assert len(payload) == 3
-        await self._publish_to_set_topic(payload)
-        logger.info(f"Brightness percentage set to {brightness_percentage}% on the device {self.dev_id}")
+        await self._publish_to_set_topic(self._brightness_payloads[brightness_percentage])
+        logger.info("Brightness percentage set to %s%% on the device %s", brightness_percentage, self.dev_id)
+
+    async def set_brightness_percentage_confirmed(
+        self, brightness_percentage: int, timeout_sec: float = 5.0, retries: int = 0
+    ) -> float:
+        """
+        Set the device's desired brightness percentage and wait until the device's status confirms it.
+
+        Raises CommandNotConfirmedError if the status has not been confirmed after all the retries.
+
+        :param brightness_percentage: The desired brightness percentage value.
+            Brightness percentage must be an integer between 0 and 100 increased in 10% steps.
+        :param timeout_sec: How long to wait for the confirmation after each attempt in seconds. Defaults to 5s
+        :param retries: How many times to resend the command if it is not confirmed. Defaults to 0
+        :return: The command-to-confirmation latency in seconds
+        """
+        return await confirm_command(
+            self,
+            lambda: self.set_brightness_percentage(brightness_percentage),
+            {"brightness_percentage": brightness_percentage},
+            timeout_sec=timeout_sec,
+            retries=retries,
+        )
 
     async def ramp_up(self) -> None:
         """
@@ -72,9 +103,8 @@ class DeviceInterface05(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         :return: None
         """
         data_0 = b"\x02"
-        payload = bytearray(data_0)
-        await self._publish_to_set_topic(payload)
-        logger.info(f"Ramp up command sent to the device {self.dev_id}")
+        await self._publish_to_set_topic(data_0)
+        logger.info("Ramp up command sent to the device %s", self.dev_id)
 
     async def toggle_switch(self) -> None:
         """
@@ -83,9 +113,8 @@ class DeviceInterface05(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         :return: None
         """
         data_0 = b"\x04"
-        payload = bytearray(data_0)
-        await self._publish_to_set_topic(payload)
-        logger.info(f"Without function command sent to the device {self.dev_id}")
+        await self._publish_to_set_topic(data_0)
+        logger.info("Without function command sent to the device %s", self.dev_id)
 
     async def set_ramp_up_time_seconds(self, ramp_duration_seconds: int) -> None:
         """
@@ -126,6 +155,5 @@ class DeviceInterface05(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         :return: None
         """
         data_0 = b"\x07"
-        payload = bytearray(data_0)
-        await self._publish_to_set_topic(payload)
-        logger.info(f"Test communication command sent to the device {self.dev_id}")
+        await self._publish_to_set_topic(data_0)
+        logger.info("Test communication command sent to the device %s", self.dev_id)
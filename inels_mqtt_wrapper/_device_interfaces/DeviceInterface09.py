@@ -1,13 +1,18 @@
-from typing import Literal
+from typing import Any, Dict, Literal, Optional, Tuple
 
 from .._logging import logger
 from ..AbstractDeviceSupportsSet import AbstractDeviceSupportsSet
-from ..AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus, StatusDataType
+from ..AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus
+from ..command_confirmation import confirm_command
+from ..StatusDecoder import StatusDataType, StatusField
 
-# FIXME: The set methods currently reset some settings while setting the other.
-# For now there is no documented way to obtain the current setting of the
-# "Open window" feature to avoid resetting it's settings by sending the
-# already applied value. Same goes for the communication interval.
+# Every set payload carries all three settings: the communication interval, the required temperature and
+# the "Open window" feature settings. Only the required temperature is reported in the status, thus the other
+# two are taken from the shadow of the settings last written to the device (see '_write_settings()').
+# The settings never written through the library, e.g. after a restart without a snapshot store,
+# are written with their defaults.
+DEFAULT_COMMUNICATION_INTERVAL_SEC = 350
+DEFAULT_OPEN_WINDOW_SETTINGS = 0
 
 
 class DeviceInterface09(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet):
@@ -16,75 +21,189 @@ class DeviceInterface09(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
     device_type: str = "09"
     status_message_len_bytes: int = 5
     set_message_len_bytes: int = 3
-
-    @staticmethod
-    def _decode_status(raw_status_data: bytearray) -> StatusDataType:  # TODO: Testing required
+    # Every command rewrites all the settings, thus supersedes any other command
+    set_command_opcode_len_bytes: int = 0
+    coalescable_set_opcodes: Tuple[bytes, ...] = (b"",)
+
+    # TODO: Testing required
+    # Status example:
+    # {
+    #     "valve_open_state_percentage": 50,
+    #     "temperature": 40,
+    #     "battery_empty": False,
+    #     "required_temperature": 50,
+    #     "regular_traffic": ?,
+    # }
+    status_fields: Tuple[StatusField, ...] = (
+        StatusField("valve_open_state_percentage", offset=0, scale=0.5),
+        StatusField("temperature", offset=1, scale=0.5),
+        StatusField("battery_empty", offset=2, equals=8),
+        StatusField("required_temperature", offset=3, scale=0.5),
+        StatusField("regular_traffic", offset=4),
+    )
+
+    # The settings believed to be applied on the device: the payload last written to the 'set' topic
+    # with the required temperature updated by the device's statuses. None until known
+    _settings: Optional[bytearray] = None
+    _settings_seeded: bool = False
+
+    @property
+    def settings(self) -> Optional[Dict[str, Any]]:
         """
-        A method for decoding the device's status from bytes.
-
-        :param raw_status_data: A bytearray object containing the bytes, published by the device in the topic.
-        :return: A device-specific dict, containing its status. For this device:
-            {
-                "valve_open_state_percentage": 50,
-                "temperature": 40,
-                "battery_empty": False,
-                "required_temperature": 50,
-                "regular_traffic": ?,
-            }
+        The settings believed to be applied on the device, None if no settings have been written yet.
+
+        :return: A dict containing the communication interval in seconds, the required temperature
+            in degrees C and the raw 'Open window' feature settings byte
         """
-        data_0, data_1, data_2, data_3, data_4 = raw_status_data
+        if not self._settings_seeded:
+            self._seed_settings()
+        if self._settings is None:
+            return None
+        communication_interval, required_temperature, open_window = self._settings
         return {
-            "valve_open_state_percentage": data_0 * 0.5,
-            "temperature": data_1 * 0.5,
-            "battery_empty": data_2 == 8,
-            "required_temperature": data_3 * 0.5,
-            "regular_traffic": data_4,
+            "communication_interval_sec": communication_interval * 70,
+            "required_temperature": required_temperature * 0.5,
+            "open_window_settings": open_window,
         }
 
-    async def set_elan_communication_interval(self, interval_sec: int = 350) -> None:  # TODO: Testing required
+    def _seed_settings(self) -> None:
+        """
+        Seed the settings shadow from the payload persisted in the snapshot store, if any,
+        with the required temperature reported by the device's last known status.
+
+        :return: None
+        """
+        self._settings_seeded = True
+        if self._snapshot_store is None:
+            return
+        snapshot = self._snapshot_store.get_settings(self)
+        if snapshot is None or len(snapshot[1]) != self.set_message_len_bytes:
+            return
+
+        self._settings = bytearray(snapshot[1])
+        if self._last_known_status is not None:
+            self._settings[1] = int(self._last_known_status["required_temperature"] // 0.5)
+
+    def _apply_status(self, raw_status_data: bytes, status_data: bytes, decoded_status: StatusDataType) -> None:
+        if self._settings is not None:
+            # The required temperature can be changed on the device itself
+            self._settings[1] = status_data[3]
+        super()._apply_status(raw_status_data, status_data, decoded_status)
+
+    async def _write_settings(
+        self,
+        communication_interval: Optional[int] = None,
+        required_temperature: Optional[int] = None,
+        open_window: Optional[int] = None,
+        force: bool = False,
+    ) -> bool:
+        """
+        Compose the full set payload from the given settings and the settings shadow and publish it,
+        unless the device already has all the settings applied. The shadow is updated right away,
+        so concurrent writes of different settings do not revert each other.
+
+        Raises DeviceStatusUnknownError if the required temperature is neither given nor known.
+
+        :param communication_interval: The communication interval byte (multiples of 70s). Defaults to None (keep)
+        :param required_temperature: The required temperature byte (multiples of 0.5 C). Defaults to None (keep)
+        :param open_window: The 'Open window' feature settings byte. Defaults to None (keep)
+        :param force: Whether to publish the payload even if it matches the settings shadow. Defaults to False
+        :return: True if the payload has been published, False if it has been skipped
+        """
+        if not self._settings_seeded:
+            self._seed_settings()
+        settings = self._settings
+
+        if communication_interval is None:
+            communication_interval = settings[0] if settings is not None else DEFAULT_COMMUNICATION_INTERVAL_SEC // 70
+        if required_temperature is None:
+            if settings is not None:
+                required_temperature = settings[1]
+            else:
+                required_temperature = int(self.status["required_temperature"] // 0.5)
+        if open_window is None:
+            open_window = settings[2] if settings is not None else DEFAULT_OPEN_WINDOW_SETTINGS
+
+        payload = bytearray([communication_interval, required_temperature, open_window])
+        if payload == settings and not force:
+            logger.debug("Settings %s are already applied on the device %s, skipping", payload.hex(" "), self.dev_id)
+            return False
+
+        # Update the shadow before publishing, so that a concurrent write is composed on top of this one
+        self._settings = payload
+        try:
+            await self._publish_to_set_topic(payload)
+        except BaseException:
+            # Roll back, unless a newer write has been composed on top of the payload in the meantime
+            if self._settings is payload:
+                self._settings = settings
+            raise
+        if self._snapshot_store is not None and self._settings is payload:
+            self._snapshot_store.update_settings(self, bytes(payload))
+        return True
+
+    async def set_elan_communication_interval(
+        self, interval_sec: int = 350, force: bool = False
+    ) -> None:  # TODO: Testing required
         """
         Set the communication interval with the eLAN gateway.
 
         :param interval_sec: The communication interval with the gateway
             in seconds. Must be a multiple of 70. Defaults to 350.
+        :param force: Whether to send the command even if the interval is already set. Defaults to False
         :return: None
         """
         assert interval_sec >= 70, "The communication interval cannot be less than 70 seconds"
         assert interval_sec % 70 == 0 and interval_sec, "The communication interval must be a multiple of 70"
-        payload = bytearray(
-            [
-                int(interval_sec // 70),
-                self.status["required_temperature"],
-                0,  # FIXME: Resets the "Open window" feature settings
-            ]
-        )
-        await self._publish_to_set_topic(payload)
+        if not await self._write_settings(communication_interval=int(interval_sec // 70), force=force):
+            return
         logger.info(f"eLAN gateway communication interval set to {interval_sec}s on the device {self.dev_id}")
 
-    async def set_required_temperature(self, required_temperature_c: float) -> None:  # TODO: Testing required
+    async def set_required_temperature(
+        self, required_temperature_c: float, force: bool = False
+    ) -> None:  # TODO: Testing required
         """
         Set the desired room temperature.
 
         :param required_temperature_c: The desired room temperature in degrees C.
             Must be a multiple of 0.5.
+        :param force: Whether to send the command even if the temperature is already set. Defaults to False
         :return: None.
         """
         assert required_temperature_c > 0, "The required temperature must be more than 0"
         assert not required_temperature_c % 0.5, "The required temperature must be a multiple of 0.5"
-        payload = bytearray(
-            [
-                0,  # FIXME: Resets the communication interval
-                int(required_temperature_c // 0.5),
-                0,  # FIXME: Resets the "Open window" feature settings
-            ]
-        )
-        await self._publish_to_set_topic(payload)
+        if not await self._write_settings(required_temperature=int(required_temperature_c // 0.5), force=force):
+            return
         logger.info(f"Required temperature set to {required_temperature_c} C on the device {self.dev_id}")
 
+    async def set_required_temperature_confirmed(
+        self, required_temperature_c: float, timeout_sec: float = 5.0, retries: int = 0
+    ) -> float:
+        """
+        Set the desired room temperature and wait until the device's status confirms it.
+
+        Raises CommandNotConfirmedError if the status has not been confirmed after all the retries.
+
+        :param required_temperature_c: The desired room temperature in degrees C.
+            Must be a multiple of 0.5.
+        :param timeout_sec: How long to wait for the confirmation after each attempt in seconds. Defaults to 5s
+        :param retries: How many times to resend the command if it is not confirmed. Defaults to 0
+        :return: The command-to-confirmation latency in seconds
+        """
+        return await confirm_command(
+            self,
+            # The confirmation requires a new status, thus the command is sent even if the temperature is set
+            lambda: self.set_required_temperature(required_temperature_c, force=True),
+            {"required_temperature": required_temperature_c},
+            timeout_sec=timeout_sec,
+            retries=retries,
+        )
+
     async def set_open_window_parameters(
         self,
         sensitivity: Literal["off", "low", "medium", "high"],
         duration_min: int,
+        force: bool = False,
     ) -> None:  # TODO: Testing required
         """
         Set the sensitivity of detection for the 'Open window' feature.
@@ -98,6 +217,7 @@ class DeviceInterface09(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         :param duration_min: The 'Open window' feature duration in minutes.
             The duration must be a multiple of 10 between 0 and 60.
             Value 0 disables the feature.
+        :param force: Whether to send the command even if the parameters are already set. Defaults to False
         :return: None
         """
         duration_options = {
@@ -124,14 +244,8 @@ class DeviceInterface09(AbstractDeviceSupportsStatus, AbstractDeviceSupportsSet)
         settings = b"00" + b"0" + sensitivity_options[sensitivity] + duration_options[duration_min]
         assert len(settings) == 8
 
-        payload = bytearray(
-            [
-                0,  # FIXME: Resets the communication interval
-                self.status["required_temperature"],
-                int(settings, 2),
-            ]
-        )
-        await self._publish_to_set_topic(payload)
+        if not await self._write_settings(open_window=int(settings, 2), force=force):
+            return
         logger.info(
             f"Open window feature parameters set to: {sensitivity=}; {duration_min=} on the device {self.dev_id}"
         )
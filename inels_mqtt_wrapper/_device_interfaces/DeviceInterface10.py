@@ -1,4 +1,7 @@
-from ..AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus, StatusDataType
+from typing import Tuple
+
+from ..AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus
+from ..StatusDecoder import StatusField
 
 
 class DeviceInterface10(AbstractDeviceSupportsStatus):
@@ -7,13 +10,9 @@ class DeviceInterface10(AbstractDeviceSupportsStatus):
     device_type: str = "10"
     status_message_len_bytes: int = 5
 
-    @staticmethod
-    def _decode_status(raw_status_data: bytearray) -> StatusDataType:
-        data_0, data_2, data_3, data_4, data_5 = raw_status_data
-        temperature_in = int.from_bytes(bytearray((data_2, data_3)), byteorder="little", signed=True) / 100
-        temperature_out = int.from_bytes(bytearray((data_4, data_5)), byteorder="little", signed=True) / 100
-        return {
-            "battery_low": bool(data_0),
-            "temperature_in": temperature_in,
-            "temperature_out": temperature_out,
-        }
+    # Status example: {"battery_low": False, "temperature_in": 21.5, "temperature_out": 21.5}
+    status_fields: Tuple[StatusField, ...] = (
+        StatusField("battery_low", offset=0, convert=bool),
+        StatusField("temperature_in", offset=1, width=2, byteorder="little", signed=True, divisor=100),
+        StatusField("temperature_out", offset=3, width=2, byteorder="little", signed=True, divisor=100),
+    )
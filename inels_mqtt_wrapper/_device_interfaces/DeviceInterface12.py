@@ -1,4 +1,7 @@
-from ..AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus, StatusDataType
+from typing import Tuple
+
+from ..AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus
+from ..StatusDecoder import StatusField
 
 
 class DeviceInterface12(AbstractDeviceSupportsStatus):
@@ -7,12 +10,15 @@ class DeviceInterface12(AbstractDeviceSupportsStatus):
     device_type: str = "12"
     status_message_len_bytes: int = 5
 
-    @staticmethod
-    def _decode_status(raw_status_data: bytearray) -> StatusDataType:  # TODO: Testing required
-        data_0, data_1, data_2, data_3, data_4 = raw_status_data
-        rftc_status = "RFTC is switched to eLAN mode" if data_2 == int.from_bytes(b"\x80", byteorder="big") else None
-        return {
-            "battery_low": data_2 % 16 == 1,
-            "rftc_status": rftc_status,
-            "temperature": data_0 * 0.5,
-        }
+    # TODO: Testing required
+    # Status example: {"battery_low": False, "rftc_status": "RFTC is switched to eLAN mode", "temperature": 21.5}
+    status_fields: Tuple[StatusField, ...] = (
+        StatusField("battery_low", offset=2, mask=0x0F, equals=1),
+        StatusField(
+            "rftc_status",
+            offset=2,
+            equals=0x80,
+            lookup={True: "RFTC is switched to eLAN mode", False: None},
+        ),
+        StatusField("temperature", offset=0, scale=0.5),
+    )
@@ -1,9 +1,5 @@
 import logging
 
+# The library does not configure logging on its own: the level and the handlers are up to the application
 logger = logging.getLogger("inels_mqtt_wrapper")
-logger.setLevel(logging.DEBUG)
-formatter = logging.Formatter("%(asctime)s %(name)s %(module)s %(funcName)s %(levelname)s: %(message)s")
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.DEBUG)
-console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
+logger.addHandler(logging.NullHandler())
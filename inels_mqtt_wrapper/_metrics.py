@@ -0,0 +1,217 @@
+import asyncio
+import time
+from collections import Counter
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .LatencyHistogram import LatencyHistogram
+
+DEFAULT_STAGE_BUCKETS_SEC = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 1e-2)
+STAGES = ("hex_parse", "decode", "dispatch", "publish")
+
+QueueDepthCallbackType = Callable[[], Optional[int]]
+
+
+def message_queue_depth(messages: AsyncGenerator[Any, None]) -> Optional[int]:
+    """
+    Get the number of messages waiting in the queue behind an asyncio_mqtt message generator.
+    The queue is not exposed by asyncio_mqtt, thus it is looked up among the generator's variables.
+
+    :param messages: The generator returned by asyncio_mqtt.Client.filtered_messages()
+    :return: The number of the queued messages or None if the queue cannot be found
+    """
+    frame = getattr(messages, "ag_frame", None)
+    if frame is None:
+        return None
+    for value in frame.f_locals.values():
+        if isinstance(value, asyncio.Queue):
+            return value.qsize()
+    return None
+
+
+class MetricsRegistry:
+    """
+    Counters, timing histograms and gauges of the library's message pipeline.
+
+    The registry is disabled by default. While it is disabled, the instrumented code paths
+    only check the 'enabled' flag and skip recording altogether.
+
+    Example:
+        metrics.enable()
+        ...
+        print(metrics.snapshot())
+        print(metrics.export_prometheus())
+    """
+
+    def __init__(self, enabled: bool = False, stage_buckets_sec: Sequence[float] = DEFAULT_STAGE_BUCKETS_SEC) -> None:
+        """
+        :param enabled: Whether to record the metrics right away. Defaults to False
+        :param stage_buckets_sec: The upper bounds of the stage timing histogram buckets in seconds
+        """
+        self.enabled: bool = enabled
+        self.stage_buckets_sec: Tuple[float, ...] = tuple(stage_buckets_sec)
+
+        self.messages_received: Counter[Tuple[str, str]] = Counter()
+        self.unrouted_messages: int = 0
+        self.decode_errors: Counter[str] = Counter()
+        self.publishes: Counter[str] = Counter()
+        self.stage_durations: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.last_seen: Dict[str, float] = {}
+
+        self._queue_depth_callbacks: Dict[str, QueueDepthCallbackType] = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        """
+        Clear all the recorded metrics. The registered queues are kept.
+
+        :return: None
+        """
+        self.messages_received.clear()
+        self.unrouted_messages = 0
+        self.decode_errors.clear()
+        self.publishes.clear()
+        self.stage_durations.clear()
+        self.last_seen.clear()
+
+    def record_message(self, topic_kind: str, device_type: str, dev_id: str) -> None:
+        """
+        Count a message received from the device and update the device's last seen timestamp.
+
+        :param topic_kind: The kind of the topic: 'connected' or 'status'
+        :param device_type: The device type, e.g. '05'
+        :param dev_id: The device ID, e.g. '05:01207D'
+        :return: None
+        """
+        self.messages_received[(topic_kind, device_type)] += 1
+        self.last_seen[dev_id] = time.time()
+
+    def record_decode_error(self, device_type: str) -> None:
+        self.decode_errors[device_type] += 1
+
+    def record_publish(self, device_type: str) -> None:
+        self.publishes[device_type] += 1
+
+    def observe_stage(self, stage: str, device_type: str, duration_sec: float) -> None:
+        """
+        Record the duration of a message processing stage.
+
+        :param stage: The stage name: 'hex_parse', 'decode', 'dispatch' or 'publish'
+        :param device_type: The device type, e.g. '05'
+        :param duration_sec: The duration of the stage in seconds
+        :return: None
+        """
+        histogram = self.stage_durations.get((stage, device_type))
+        if histogram is None:
+            histogram = self.stage_durations[(stage, device_type)] = LatencyHistogram(self.stage_buckets_sec)
+        histogram.observe(duration_sec)
+
+    def register_queue(self, name: str, depth_callback: QueueDepthCallbackType) -> None:
+        """
+        Register a queue to report the depth of.
+
+        :param name: The name of the queue, e.g. the name of the topic it holds the messages of
+        :param depth_callback: Function returning the current number of the queued items or None if it is unknown
+        :return: None
+        """
+        self._queue_depth_callbacks[name] = depth_callback
+
+    def unregister_queue(self, name: str) -> None:
+        self._queue_depth_callbacks.pop(name, None)
+
+    def queue_depths(self) -> Dict[str, int]:
+        """
+        :return: A dict mapping the names of the registered queues to their current depths.
+            The queues of unknown depth are omitted
+        """
+        depths = {}
+        for name, depth_callback in list(self._queue_depth_callbacks.items()):
+            depth = depth_callback()
+            if depth is not None:
+                depths[name] = depth
+        return depths
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        :return: A dict containing the current values of all the metrics
+        """
+        return {
+            "messages_received": {
+                f"{topic_kind}/{device_type}": count
+                for (topic_kind, device_type), count in self.messages_received.items()
+            },
+            "unrouted_messages": self.unrouted_messages,
+            "decode_errors": dict(self.decode_errors),
+            "publishes": dict(self.publishes),
+            "stage_durations": {
+                f"{stage}/{device_type}": histogram.snapshot()
+                for (stage, device_type), histogram in self.stage_durations.items()
+            },
+            "last_seen": dict(self.last_seen),
+            "queue_depths": self.queue_depths(),
+        }
+
+    def export_prometheus(self) -> str:
+        """
+        Export the metrics in the Prometheus text exposition format, including
+        the command confirmation latency histograms.
+
+        :return: The metrics as text, ready to be served at a '/metrics' endpoint
+        """
+        from .command_confirmation import confirmation_latency
+
+        lines: List[str] = []
+
+        def header(name: str, metric_type: str, description: str) -> None:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        def histogram_lines(name: str, labels: str, histogram: LatencyHistogram) -> None:
+            for bound, count in histogram.cumulative_counts().items():
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.sum_sec}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+        header("inels_messages_received_total", "counter", "Messages received from the devices")
+        for (topic_kind, device_type), count in sorted(self.messages_received.items()):
+            lines.append(
+                f'inels_messages_received_total{{topic_kind="{topic_kind}",device_type="{device_type}"}} {count}'
+            )
+
+        header(
+            "inels_unrouted_messages_total", "counter", "Messages received by the gateway routers for unknown devices"
+        )
+        lines.append(f"inels_unrouted_messages_total {self.unrouted_messages}")
+
+        header("inels_decode_errors_total", "counter", "Status messages that could not be decoded")
+        for device_type, count in sorted(self.decode_errors.items()):
+            lines.append(f'inels_decode_errors_total{{device_type="{device_type}"}} {count}')
+
+        header("inels_publishes_total", "counter", "Messages published to the devices' 'set' topics")
+        for device_type, count in sorted(self.publishes.items()):
+            lines.append(f'inels_publishes_total{{device_type="{device_type}"}} {count}')
+
+        header("inels_stage_duration_seconds", "histogram", "Duration of the message processing stages")
+        for (stage, device_type), histogram in sorted(self.stage_durations.items()):
+            histogram_lines("inels_stage_duration_seconds", f'stage="{stage}",device_type="{device_type}"', histogram)
+
+        header("inels_command_confirmation_seconds", "histogram", "Command-to-confirmation latency")
+        for device_type, histogram in sorted(confirmation_latency.items()):
+            histogram_lines("inels_command_confirmation_seconds", f'device_type="{device_type}"', histogram)
+
+        header("inels_device_last_seen_timestamp_seconds", "gauge", "Time of the last message received from the device")
+        for dev_id, timestamp in sorted(self.last_seen.items()):
+            lines.append(f'inels_device_last_seen_timestamp_seconds{{device="{dev_id}"}} {timestamp}')
+
+        header("inels_queue_depth", "gauge", "Number of items waiting in the queue")
+        for name, depth in sorted(self.queue_depths().items()):
+            lines.append(f'inels_queue_depth{{queue="{name}"}} {depth}')
+
+        return "\n".join(lines) + "\n"
+
+
+metrics: MetricsRegistry = MetricsRegistry()
@@ -1,4 +1,143 @@
 import asyncio
-from typing import List
+from collections import Counter
+from typing import Any, Coroutine, Dict, Iterator, List, Optional, Set, Tuple
 
-background_tasks: List[asyncio.Task] = []  # type: ignore
+import asyncio_mqtt as aiomqtt
+
+from ._logging import logger
+from .SubscriptionBatch import unsubscribe_in_bulk
+
+
+class TaskSupervisor:
+    """
+    A registry of the library's background tasks.
+
+    The tasks are grouped by the objects that own them (devices, routers, etc.) and are removed
+    from the registry as soon as they finish, so neither the finished tasks nor their owners are
+    kept alive by the registry.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: Set["asyncio.Task[Any]"] = set()
+        self._owned_tasks: Dict[int, Set["asyncio.Task[Any]"]] = {}
+        self._owners: Dict[int, object] = {}
+        self._task_owners: Dict["asyncio.Task[Any]", int] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __iter__(self) -> Iterator["asyncio.Task[Any]"]:
+        return iter(list(self._tasks))
+
+    def spawn(self, coro: Coroutine[Any, Any, Any], owner: Optional[object] = None) -> "asyncio.Task[Any]":
+        """
+        Start the coroutine as a background task and register it.
+
+        :param coro: The coroutine to run
+        :param owner: The object the task belongs to. Defaults to None
+        :return: The created task
+        """
+        task = asyncio.create_task(coro)
+        self.add(task, owner=owner)
+        return task
+
+    def add(self, task: "asyncio.Task[Any]", owner: Optional[object] = None) -> None:
+        """
+        Register the task. It is removed from the registry automatically as soon as it finishes.
+
+        :param task: The task to register
+        :param owner: The object the task belongs to. Defaults to None
+        :return: None
+        """
+        self._tasks.add(task)
+        if owner is not None:
+            owner_id = id(owner)
+            self._owners[owner_id] = owner
+            self._owned_tasks.setdefault(owner_id, set()).add(task)
+            self._task_owners[task] = owner_id
+        task.add_done_callback(self._discard)
+
+    def _discard(self, task: "asyncio.Task[Any]") -> None:
+        self._tasks.discard(task)
+        owner_id = self._task_owners.pop(task, None)
+        if owner_id is None:
+            return
+
+        owned_tasks = self._owned_tasks[owner_id]
+        owned_tasks.discard(task)
+        if not owned_tasks:
+            del self._owned_tasks[owner_id]
+            del self._owners[owner_id]
+
+    def tasks_of(self, owner: object) -> List["asyncio.Task[Any]"]:
+        """
+        Get the live tasks of the owner.
+
+        :param owner: The object the tasks belong to
+        :return: A list of the owner's unfinished tasks
+        """
+        return list(self._owned_tasks.get(id(owner), ()))
+
+    def cancel(self, owner: object) -> List["asyncio.Task[Any]"]:
+        """
+        Cancel all the tasks of the owner.
+
+        :param owner: The object the tasks belong to
+        :return: A list of the cancelled tasks
+        """
+        tasks = self.tasks_of(owner)
+        for task in tasks:
+            task.cancel()
+        return tasks
+
+    async def aclose(self, owner: object) -> None:
+        """
+        Cancel all the tasks of the owner and wait for them to finish.
+
+        :param owner: The object the tasks belong to
+        :return: None
+        """
+        tasks = self.cancel(owner)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def aclose_all(self) -> None:
+        """
+        Close all the objects owning the background tasks: cancel every task, wait for them to finish
+        and unsubscribe from the owners' topics with as few UNSUBSCRIBE packets as possible.
+
+        :return: None
+        """
+        subscriptions: Dict[int, Tuple[aiomqtt.Client, List[str]]] = {}
+        for owner in list(self._owners.values()):
+            detach = getattr(owner, "_detach", None)
+            if detach is None:
+                continue
+            client, topics = detach()
+            subscriptions.setdefault(id(client), (client, []))[1].extend(topics)
+
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for client, topics in subscriptions.values():
+            if topics:
+                await unsubscribe_in_bulk(client, topics)
+        logger.info(f"Closed {len(tasks)} background tasks")
+
+    def live_task_counts(self) -> Dict[str, int]:
+        """
+        Count the unfinished tasks by the type of their owners. Useful for detecting leaks.
+
+        :return: A dict mapping owner class names to the numbers of their live tasks.
+            Tasks without an owner are counted under the 'None' key
+        """
+        counts: Counter[str] = Counter()
+        for task in self._tasks:
+            owner_id = self._task_owners.get(task)
+            owner_name = "None" if owner_id is None else self._owners[owner_id].__class__.__name__
+            counts[owner_name] += 1
+        return dict(counts)
+
+
+background_tasks: TaskSupervisor = TaskSupervisor()
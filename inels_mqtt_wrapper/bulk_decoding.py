@@ -0,0 +1,179 @@
+from typing import Dict, Sequence, Type, Union
+
+from .AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus
+from .StatusDecoder import StatusDecoder, StatusField
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore[assignment]
+
+ColumnsType = Dict[str, "np.ndarray"]
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError(
+            "Bulk status decoding requires NumPy. Install it with 'pip install inels-mqtt-wrapper[numpy]'"
+        )
+
+
+def parse_status_payloads(payloads: Sequence[bytes], message_len_bytes: int) -> "np.ndarray":
+    """
+    Parse the raw ASCII hex status payloads into a 2D array of bytes.
+
+    Every payload is parsed and checked on its own, so a payload of a wrong length is reported
+    instead of shifting the bytes of all the following ones.
+
+    :param payloads: Raw status message payloads as received from the 'status' MQTT topic, e.g. b"00 66 08 66 08"
+    :param message_len_bytes: The expected length of every status message in bytes
+    :return: A uint8 array of shape (number of payloads, message_len_bytes)
+    """
+    _require_numpy()
+    data = bytearray()
+    for i, payload in enumerate(payloads):
+        try:
+            status_data = bytes.fromhex(payload.decode("ascii"))
+        except ValueError:
+            # Fall back to the byte by byte parsing for the bytes not padded to two hex digits
+            status_data = bytes(int(byte, 16) for byte in payload.split())
+        if len(status_data) != message_len_bytes:
+            msg = (
+                f"Cannot decode device statuses. Wrong status message payload size of the message {i}: "
+                f"{len(status_data)} bytes. Expected: {message_len_bytes} bytes"
+            )
+            raise ValueError(msg)
+        data += status_data
+    return np.frombuffer(bytes(data), dtype=np.uint8).reshape(len(payloads), message_len_bytes)
+
+
+def _read_slot(data: "np.ndarray", offset: int, width: int, byteorder: str, signed: bool) -> "np.ndarray":
+    """
+    Read the raw integer values of a byte range from every status message.
+
+    :param data: A uint8 array of shape (number of messages, message length)
+    :param offset: The offset of the byte range
+    :param width: The width of the byte range
+    :param byteorder: The byte order of the byte range: 'big' or 'little'
+    :param signed: Whether the value is a signed integer
+    :return: An int64 array of the raw values
+    """
+    end = offset + width
+    columns = data[:, offset:end].astype(np.int64)
+    if byteorder == "little":
+        columns = columns[:, ::-1]
+
+    values = np.zeros(len(data), dtype=np.int64)
+    for i in range(width):
+        values = (values << 8) | columns[:, i]
+    if signed:
+        sign_bit = 1 << (width * 8 - 1)
+        values = np.where(values & sign_bit, values - (sign_bit << 1), values)
+    return values
+
+
+def _apply_lookup(values: "np.ndarray", field: StatusField) -> "np.ndarray":
+    """
+    Replace every value with the one from the field's lookup mapping.
+
+    :param values: The values to look up
+    :param field: The status field description
+    :return: The array of the looked-up values
+    """
+    assert field.lookup is not None
+    result = np.array([None] * len(values), dtype=object)
+    matched = np.zeros(len(values), dtype=bool)
+    for key, value in field.lookup.items():
+        selection = values == key
+        result[selection] = value
+        matched |= selection
+
+    if not matched.all():
+        raise KeyError(values[~matched][0].item())
+    if all(isinstance(value, (bool, int, float)) for value in field.lookup.values()):
+        return np.array(result.tolist())
+    return result
+
+
+def _decode_field(values: "np.ndarray", field: StatusField) -> "np.ndarray":
+    """
+    Apply the field's conversion steps to the raw values, same as StatusDecoder does for a single message.
+
+    :param values: The raw values of the field
+    :param field: The status field description
+    :return: The array of the decoded values
+    """
+    if field.mask is not None:
+        values = (values & field.mask) >> field.shift
+    if field.equals is not None:
+        values = values == field.equals
+    if field.scale is not None:
+        values = values * field.scale
+    if field.divisor is not None:
+        values = values / field.divisor
+    if field.lookup is not None:
+        values = _apply_lookup(values, field)
+    if field.convert is bool:
+        values = values.astype(bool)
+    elif field.convert is not None:
+        # Arbitrary converters cannot be vectorized, thus are applied element-wise
+        values = np.array(np.frompyfunc(field.convert, 1, 1)(values).tolist())
+    return values
+
+
+def _decode_columns(decoder: StatusDecoder, data: "np.ndarray") -> ColumnsType:
+    """
+    Decode a 2D array of status messages into columns.
+
+    :param decoder: The decoder compiled for the device class
+    :param data: A uint8 array of shape (number of messages, message length)
+    :return: A dict mapping the status field names to the arrays of their values
+    """
+    if data.ndim != 2 or data.shape[1] != decoder.message_len_bytes:
+        raise ValueError(
+            f"Cannot decode device statuses. Wrong status data shape: {data.shape}. "
+            f"Expected: (N, {decoder.message_len_bytes})"
+        )
+
+    slot_values = [_read_slot(data, *slot) for slot in decoder.slots]
+    return {field.name: _decode_field(slot_values[decoder.slot_index(field)], field) for field in decoder.fields}
+
+
+def decode_status_bulk(
+    device_class: Type[AbstractDeviceSupportsStatus],
+    payloads: Union[Sequence[bytes], "np.ndarray"],
+    verify_sample_size: int = 0,
+) -> ColumnsType:
+    """
+    Decode many status messages of a single device type into columnar NumPy arrays
+    in one vectorized pass. The decoding is driven by the device class' 'status_fields'
+    declaration, so the same scaling rules are applied as when decoding a single message.
+
+    Example:
+        columns = decode_status_bulk(RFTI10B, [b"00 66 08 66 08", b"01 70 08 66 08"])
+        columns["temperature_in"]  # array([21.5, 21.6])
+
+    :param device_class: The device class (interface or concrete device) the messages were published by
+    :param payloads: Raw status message payloads or a uint8 array of shape (number of messages, message length)
+    :param verify_sample_size: The number of first messages to decode one by one with the device class'
+        '_decode_status' method and check against the bulk decoding result. Defaults to 0 (no check)
+    :return: A dict mapping the status field names to the arrays of their values, one value per message
+    """
+    _require_numpy()
+    decoder = device_class._status_decoder
+    if decoder is None:
+        raise NotImplementedError(f"Device class '{device_class.__name__}' does not declare its 'status_fields'")
+
+    data = (
+        payloads
+        if isinstance(payloads, np.ndarray)
+        else parse_status_payloads(payloads, device_class.status_message_len_bytes)
+    )
+    columns = _decode_columns(decoder, data)
+
+    for i in range(min(verify_sample_size, len(data))):
+        expected = device_class._decode_status(data[i].tobytes())
+        actual = {name: column[i] for name, column in columns.items()}
+        if actual != expected:
+            raise ValueError(f"Bulk decoding of the message {i} resulted in {actual}, expected {expected}")
+    return columns
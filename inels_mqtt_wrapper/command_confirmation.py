@@ -0,0 +1,85 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from ._logging import logger
+from .AbstractDeviceSupportsStatus import AbstractDeviceSupportsStatus
+from .exceptions import CommandNotConfirmedError
+from .LatencyHistogram import LatencyHistogram
+from .StatusDecoder import StatusDataType
+
+# Command-to-confirmation latencies by device type
+confirmation_latency: Dict[str, LatencyHistogram] = {}
+
+
+def confirmation_latency_snapshot() -> Dict[str, Dict[str, Any]]:
+    """
+    Export the command-to-confirmation latency histograms.
+
+    :return: A dict mapping the device types to the snapshots of their latency histograms
+    """
+    return {device_type: histogram.snapshot() for device_type, histogram in confirmation_latency.items()}
+
+
+def _status_matches(status: StatusDataType, expected_status: StatusDataType) -> bool:
+    return all(status.get(key) == value for key, value in expected_status.items())
+
+
+async def confirm_command(
+    device: AbstractDeviceSupportsStatus,
+    command: Callable[[], Awaitable[None]],
+    expected_status: StatusDataType,
+    timeout_sec: float = 5.0,
+    retries: int = 0,
+) -> float:
+    """
+    Send the command and wait until the device publishes a status confirming it. The command is resent
+    if no confirmation arrives within the timeout, as long as there are retries left.
+
+    Raises CommandNotConfirmedError if the command has not been confirmed after all the retries
+    or if the device is closed while waiting for the confirmation.
+
+    :param device: The device the command is sent to
+    :param command: A coroutine function sending the command, e.g. a bound command method of the device
+    :param expected_status: The status fields and their values the device reports once it has applied the command
+    :param timeout_sec: How long to wait for the confirmation after each attempt in seconds. Defaults to 5s
+    :param retries: How many times to resend the command if it is not confirmed. Defaults to 0
+    :return: The command-to-confirmation latency in seconds, measured from the first attempt
+    """
+    assert timeout_sec > 0, "Timeout must be greater than zero"
+    assert retries >= 0, "Number of retries must not be negative"
+
+    loop = asyncio.get_running_loop()
+    histogram = confirmation_latency.setdefault(device.device_type, LatencyHistogram())
+    sent_at = loop.time()
+
+    # Subscribe before sending the command not to miss a quick confirmation
+    async with device.status_updates(maxsize=1, overflow_policy="coalesce_latest", include_unchanged=True) as updates:
+        for attempt in range(retries + 1):
+            await command()
+            deadline = loop.time() + timeout_sec
+            try:
+                while True:
+                    status = await asyncio.wait_for(updates.get(), max(deadline - loop.time(), 0))
+                    if _status_matches(status, expected_status):
+                        latency_sec = loop.time() - sent_at
+                        histogram.observe(latency_sec)
+                        return latency_sec
+            except StopAsyncIteration:
+                # The subscription is closed along with the device
+                raise CommandNotConfirmedError(
+                    f"Device {device.dev_id} was closed before confirming the command. "
+                    f"Expected status: {expected_status}"
+                ) from None
+            except asyncio.TimeoutError:
+                logger.warning(
+                    "Device %s has not confirmed the command within %ss (attempt %s of %s)",
+                    device.dev_id,
+                    timeout_sec,
+                    attempt + 1,
+                    retries + 1,
+                )
+
+    raise CommandNotConfirmedError(
+        f"Device {device.dev_id} has not confirmed the command after {retries + 1} attempts. "
+        f"Expected status: {expected_status}"
+    )
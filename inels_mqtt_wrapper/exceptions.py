@@ -4,3 +4,7 @@ class DeviceDisconnectedError(Exception):
 
 class DeviceStatusUnknownError(Exception):
     pass
+
+
+class CommandNotConfirmedError(Exception):
+    pass
@@ -0,0 +1,593 @@
+import asyncio
+import contextlib
+import heapq
+import random
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, NamedTuple, Optional, Set, Tuple, Type, Union
+
+from paho.mqtt.client import topic_matches_sub
+
+from ._device_interfaces.DeviceInterface05 import _decode_brightness, _encode_brightness
+from ._logging import logger
+from ._tasks import background_tasks
+
+# The message kinds scheduled by the simulator
+_HEARTBEAT = 0
+_STATUS = 1
+
+
+class SimulatedMessage:
+    """A stand-in for paho.mqtt.client.MQTTMessage"""
+
+    __slots__ = ("topic", "payload")
+
+    def __init__(self, topic: str, payload: bytes) -> None:
+        self.topic = topic
+        self.payload = payload
+
+
+class FaultProfile(NamedTuple):
+    """The faults injected into the messages sent by the virtual devices"""
+
+    # The share of the messages that are silently dropped, between 0 and 1
+    drop_rate: float = 0.0
+    # The share of the status messages with a wrong length (one byte missing or extra), between 0 and 1
+    malformed_rate: float = 0.0
+    # The range of the delay before a virtual device responds to a command, in seconds
+    response_delay_sec: Tuple[float, float] = (0.0, 0.0)
+
+
+class VirtualDevice:
+    """
+    A base class for the virtual devices. A virtual device keeps its state,
+    renders it as a status message and applies the commands sent to it.
+    """
+
+    device_type: str = "UNDEFINED"
+
+    def __init__(self, device_address: str, rng: random.Random) -> None:
+        self.device_address: str = device_address.upper()
+        self.rng: random.Random = rng
+
+    def status_bytes(self) -> bytes:
+        """
+        :return: The device's status message as the device publishes it, before the hex encoding
+        """
+        raise NotImplementedError
+
+    def apply_command(self, data: bytes) -> bool:
+        """
+        Apply the command received in the 'set' topic.
+
+        :param data: The command payload
+        :return: True if the device responds with a status message
+        """
+        return False
+
+    def is_test_communication(self, data: bytes) -> bool:
+        """
+        :param data: The command payload
+        :return: True if the command makes the device send a heartbeat
+        """
+        return False
+
+    def evolve(self) -> None:
+        """
+        Change the state spontaneously, the way the sensors do between two status messages.
+
+        :return: None
+        """
+
+
+class VirtualDevice02(VirtualDevice):
+    """A virtual switching unit"""
+
+    device_type = "02"
+
+    def __init__(self, device_address: str, rng: random.Random) -> None:
+        super().__init__(device_address, rng)
+        self.switched_on: bool = False
+
+    def status_bytes(self) -> bytes:
+        return bytes([0x02, int(self.switched_on)])
+
+    def apply_command(self, data: bytes) -> bool:
+        opcode = data[0]
+        if opcode in (0x01, 0x05):
+            self.switched_on = True
+        elif opcode in (0x02, 0x04):
+            self.switched_on = False
+        elif opcode == 0x03:
+            self.switched_on = not self.switched_on
+        elif opcode not in (0x06, 0x07):
+            return False
+        return True
+
+    def is_test_communication(self, data: bytes) -> bool:
+        return data[0] == 0x08
+
+
+class VirtualDevice03(VirtualDevice):
+    """A virtual shutter unit"""
+
+    device_type = "03"
+
+    def __init__(self, device_address: str, rng: random.Random) -> None:
+        super().__init__(device_address, rng)
+        self.shutters_are_down: bool = False
+
+    def status_bytes(self) -> bytes:
+        return bytes([0x03, int(self.shutters_are_down)])
+
+    def apply_command(self, data: bytes) -> bool:
+        opcode = data[0]
+        if opcode in (0x01, 0x03):
+            self.shutters_are_down = False
+        elif opcode in (0x02, 0x05):
+            self.shutters_are_down = True
+        elif opcode not in (0x04, 0x06, 0x07, 0x08):
+            return False
+        return True
+
+    def is_test_communication(self, data: bytes) -> bool:
+        return data[0] == 0x09
+
+
+class VirtualDevice05(VirtualDevice):
+    """A virtual dimmer"""
+
+    device_type = "05"
+
+    def __init__(self, device_address: str, rng: random.Random) -> None:
+        super().__init__(device_address, rng)
+        self.brightness_percentage: int = 0
+
+    def status_bytes(self) -> bytes:
+        return _encode_brightness(self.brightness_percentage)
+
+    def apply_command(self, data: bytes) -> bool:
+        opcode = data[0]
+        if opcode == 0x01:
+            self.brightness_percentage = _decode_brightness(int.from_bytes(data[1:3], byteorder="big"))
+        elif opcode == 0x02:
+            self.brightness_percentage = 100
+        elif opcode == 0x04:
+            self.brightness_percentage = 0 if self.brightness_percentage == 100 else 100
+        elif opcode not in (0x05, 0x06):
+            return False
+        return True
+
+    def is_test_communication(self, data: bytes) -> bool:
+        return data[0] == 0x07
+
+
+class VirtualDevice09(VirtualDevice):
+    """A virtual thermostatic valve"""
+
+    device_type = "09"
+
+    def __init__(self, device_address: str, rng: random.Random) -> None:
+        super().__init__(device_address, rng)
+        self.temperature_raw: int = 42  # 21 C in 0.5 C steps
+        self.required_temperature_raw: int = 42
+        self.communication_interval: int = 5
+        self.open_window_settings: int = 0
+
+    def status_bytes(self) -> bytes:
+        valve_raw = 200 if self.temperature_raw < self.required_temperature_raw else 0
+        return bytes([valve_raw, self.temperature_raw, 0, self.required_temperature_raw, 0])
+
+    def apply_command(self, data: bytes) -> bool:
+        # Like the real device, every command overwrites all the settings, zeroes included
+        self.communication_interval, self.required_temperature_raw, self.open_window_settings = data[:3]
+        return True
+
+    def evolve(self) -> None:
+        self.temperature_raw += 1 if self.temperature_raw < self.required_temperature_raw else -1
+
+
+class VirtualDevice10(VirtualDevice):
+    """A virtual two-channel thermometer"""
+
+    device_type = "10"
+
+    def __init__(self, device_address: str, rng: random.Random) -> None:
+        super().__init__(device_address, rng)
+        self.temperature_in_centi: int = 2150
+        self.temperature_out_centi: int = 500
+
+    def status_bytes(self) -> bytes:
+        return (
+            b"\x00"
+            + self.temperature_in_centi.to_bytes(2, byteorder="little", signed=True)
+            + self.temperature_out_centi.to_bytes(2, byteorder="little", signed=True)
+        )
+
+    def evolve(self) -> None:
+        self.temperature_in_centi += self.rng.randint(-10, 10)
+        self.temperature_out_centi += self.rng.randint(-50, 50)
+
+
+class VirtualDevice12(VirtualDevice):
+    """A virtual room temperature controller"""
+
+    device_type = "12"
+
+    def __init__(self, device_address: str, rng: random.Random) -> None:
+        super().__init__(device_address, rng)
+        self.temperature_raw: int = 43
+
+    def status_bytes(self) -> bytes:
+        return bytes([self.temperature_raw, 0, 0x80, 0, 0])
+
+    def evolve(self) -> None:
+        self.temperature_raw = max(0, min(0xFF, self.temperature_raw + self.rng.randint(-1, 1)))
+
+
+class VirtualDevice19(VirtualDevice):
+    """A virtual wireless button panel"""
+
+    device_type = "19"
+
+    def __init__(self, device_address: str, rng: random.Random) -> None:
+        super().__init__(device_address, rng)
+        self.last_button_pressed: int = 1
+        self.button_state_changed: bool = False
+
+    def status_bytes(self) -> bytes:
+        return bytes([0b00100000 if self.button_state_changed else 0, self.last_button_pressed, 0, 0, 0])
+
+    def evolve(self) -> None:
+        self.button_state_changed = True
+        self.last_button_pressed = self.rng.randint(1, 4)
+
+
+VIRTUAL_DEVICE_CLASSES: Dict[str, Type[VirtualDevice]] = {
+    device_class.device_type: device_class
+    for device_class in (
+        VirtualDevice02,
+        VirtualDevice03,
+        VirtualDevice05,
+        VirtualDevice09,
+        VirtualDevice10,
+        VirtualDevice12,
+        VirtualDevice19,
+    )
+}
+
+
+class SimulatedClient:
+    """
+    An in-process stand-in for asyncio_mqtt.Client, acting as both the client and the broker.
+
+    The messages published by the virtual devices are delivered to the listeners subscribed to the matching
+    topics. The messages the library publishes to the 'set' topics are passed to the DeviceSimulator.
+    """
+
+    def __init__(self) -> None:
+        self.subscribe_calls: int = 0
+        self.unsubscribe_calls: int = 0
+        self.published_messages: int = 0
+        self.delivered_messages: int = 0
+
+        self._subscribed_topics: Set[str] = set()
+        self._subscribed_wildcards: Set[str] = set()
+        self._exact_filters: Dict[str, List["asyncio.Queue[SimulatedMessage]"]] = {}
+        self._wildcard_filters: List[Tuple[str, "asyncio.Queue[SimulatedMessage]"]] = []
+        self._simulator: Optional["DeviceSimulator"] = None
+
+    @staticmethod
+    def _topics_of(topic: Union[str, List[Tuple[str, int]], List[str]]) -> List[str]:
+        if isinstance(topic, str):
+            return [topic]
+        return [item if isinstance(item, str) else item[0] for item in topic]
+
+    async def subscribe(self, topic: Union[str, List[Tuple[str, int]]], *args: Any, **kwargs: Any) -> None:
+        self.subscribe_calls += 1
+        for topic_name in self._topics_of(topic):
+            if "+" in topic_name or "#" in topic_name:
+                self._subscribed_wildcards.add(topic_name)
+            else:
+                self._subscribed_topics.add(topic_name)
+
+    async def unsubscribe(self, topic: Union[str, List[str]], *args: Any, **kwargs: Any) -> None:
+        self.unsubscribe_calls += 1
+        for topic_name in self._topics_of(topic):
+            self._subscribed_topics.discard(topic_name)
+            self._subscribed_wildcards.discard(topic_name)
+
+    async def publish(self, topic: str, payload: Any = None, *args: Any, **kwargs: Any) -> None:
+        self.published_messages += 1
+        if self._simulator is not None:
+            self._simulator._on_publish(topic, payload)
+
+    @contextlib.asynccontextmanager
+    async def filtered_messages(
+        self, topic_filter: str, *, queue_maxsize: int = 0
+    ) -> AsyncIterator[AsyncGenerator[SimulatedMessage, None]]:
+        messages: "asyncio.Queue[SimulatedMessage]" = asyncio.Queue(maxsize=queue_maxsize)
+        is_wildcard = "+" in topic_filter or "#" in topic_filter
+        if is_wildcard:
+            self._wildcard_filters.append((topic_filter, messages))
+        else:
+            self._exact_filters.setdefault(topic_filter, []).append(messages)
+
+        async def message_generator() -> AsyncGenerator[SimulatedMessage, None]:
+            while True:
+                yield await messages.get()
+
+        try:
+            yield message_generator()
+        finally:
+            if is_wildcard:
+                self._wildcard_filters.remove((topic_filter, messages))
+            else:
+                self._exact_filters[topic_filter].remove(messages)
+                if not self._exact_filters[topic_filter]:
+                    del self._exact_filters[topic_filter]
+
+    def _is_subscribed(self, topic: str) -> bool:
+        return topic in self._subscribed_topics or any(
+            topic_matches_sub(wildcard, topic) for wildcard in self._subscribed_wildcards
+        )
+
+    def deliver(self, topic: str, payload: bytes) -> int:
+        """
+        Deliver the message to every listener with a matching topic filter, as the broker would
+        if the client is subscribed to the topic.
+
+        :param topic: The topic of the message
+        :param payload: The payload of the message
+        :return: The number of listeners the message was delivered to
+        """
+        if not self._is_subscribed(topic):
+            return 0
+
+        message = SimulatedMessage(topic, payload)
+        queues = [
+            *self._exact_filters.get(topic, ()),
+            *(messages for topic_filter, messages in self._wildcard_filters if topic_matches_sub(topic_filter, topic)),
+        ]
+        for messages in queues:
+            messages.put_nowait(message)
+        self.delivered_messages += len(queues)
+        return len(queues)
+
+
+class DeviceSimulator:
+    """
+    A simulator of the virtual iNELS devices behind a single eLAN gateway, for load and resilience testing
+    without the RF hardware.
+
+    The virtual devices send heartbeats and status messages at the configured intervals and respond to the
+    commands the way the hardware does: e.g. a dimmer reports its new brightness after a 'set brightness'
+    command. Faults (dropped messages, wrong message lengths, delayed responses) are injected according
+    to the fault profile. A single background task drives all the virtual devices.
+
+    Example:
+        client = SimulatedClient()
+        simulator = DeviceSimulator(client, mac_address="00:00:00:00:00:00", status_interval_sec=1)
+        simulator.add_devices("05", count=1000)
+        simulator.start()
+        router = GatewayRouter(mac_address="00:00:00:00:00:00", mqtt_client=client)
+        dimmers = [RFDAC71B(..., mqtt_client=client, router=router) for ...]
+    """
+
+    def __init__(
+        self,
+        client: SimulatedClient,
+        mac_address: str,
+        heartbeat_interval_sec: Optional[float] = 60.0,
+        status_interval_sec: Optional[float] = 10.0,
+        faults: Optional[FaultProfile] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        """
+        :param client: The simulated MQTT client shared with the library
+        :param mac_address: The MAC address of the simulated eLAN gateway
+        :param heartbeat_interval_sec: The interval between the heartbeats of every device. None disables
+            the heartbeats. Defaults to 60s
+        :param status_interval_sec: The interval between the periodic status messages of every device. None disables
+            the periodic status messages, the devices still respond to the commands. Defaults to 10s
+        :param faults: The faults to inject. Defaults to None (no faults)
+        :param seed: The seed of the random number generator for reproducible runs. Defaults to None
+        """
+        assert heartbeat_interval_sec is None or heartbeat_interval_sec > 0, "Heartbeat interval must be positive"
+        assert status_interval_sec is None or status_interval_sec > 0, "Status interval must be positive"
+        faults = faults if faults is not None else FaultProfile()
+        assert 0 <= faults.drop_rate <= 1, "Drop rate must be between 0 and 1"
+        assert 0 <= faults.malformed_rate <= 1, "Malformed message rate must be between 0 and 1"
+
+        self.mac_address: str = mac_address.upper()
+        self.heartbeat_interval_sec: Optional[float] = heartbeat_interval_sec
+        self.status_interval_sec: Optional[float] = status_interval_sec
+        self.faults: FaultProfile = faults
+        self.rng: random.Random = random.Random(seed)
+
+        self.sent_messages: int = 0
+        self.dropped_messages: int = 0
+        self.malformed_messages: int = 0
+        self.received_commands: int = 0
+
+        self._client: SimulatedClient = client
+        self._topic_mac_address: str = self.mac_address.replace(":", "")
+        self._devices: Dict[Tuple[str, str], VirtualDevice] = {}
+        self._schedule: List[Tuple[float, int, int, VirtualDevice]] = []
+        self._schedule_counter: int = 0
+        self._schedule_updated: asyncio.Event = asyncio.Event()
+
+        client._simulator = self
+
+    @property
+    def devices(self) -> List[VirtualDevice]:
+        return list(self._devices.values())
+
+    def get_device(self, device_type: str, device_address: str) -> VirtualDevice:
+        return self._devices[(device_type, device_address.upper())]
+
+    def add_device(self, device_type: str, device_address: str) -> VirtualDevice:
+        """
+        Add a virtual device to the simulated gateway.
+
+        :param device_type: The device type, e.g. '05'
+        :param device_address: The device address, e.g. '01207D'
+        :return: The virtual device
+        """
+        assert (
+            device_type in VIRTUAL_DEVICE_CLASSES
+        ), f"Device type {device_type} cannot be simulated. Supported types: {list(VIRTUAL_DEVICE_CLASSES)}"
+        device = VIRTUAL_DEVICE_CLASSES[device_type](device_address, self.rng)
+        self._devices[(device_type, device.device_address)] = device
+
+        # Spread the periodic messages of the devices evenly instead of sending them all at once
+        loop_time = asyncio.get_running_loop().time()
+        if self.heartbeat_interval_sec is not None:
+            self._push(loop_time + self.rng.uniform(0, self.heartbeat_interval_sec), _HEARTBEAT, device)
+        if self.status_interval_sec is not None:
+            self._push(loop_time + self.rng.uniform(0, self.status_interval_sec), _STATUS, device)
+        return device
+
+    def add_devices(self, device_type: str, count: int, first_address: int = 1) -> List[VirtualDevice]:
+        """
+        Add a number of virtual devices of the same type with consecutive addresses.
+
+        :param device_type: The device type, e.g. '05'
+        :param count: The number of devices to add
+        :param first_address: The address of the first device as an integer. Defaults to 1
+        :return: A list of the virtual devices
+        """
+        return [
+            self.add_device(device_type, f"{address:06X}") for address in range(first_address, first_address + count)
+        ]
+
+    def start(self) -> None:
+        """
+        Start sending the periodic messages in the background.
+
+        :return: None
+        """
+        background_tasks.spawn(self._run(), owner=self)
+
+    async def aclose(self) -> None:
+        """
+        Stop sending the periodic messages.
+
+        :return: None
+        """
+        await background_tasks.aclose(self)
+
+    def _topic(self, topic_kind: str, device: VirtualDevice) -> str:
+        return f"inels/{topic_kind}/{self._topic_mac_address}/{device.device_type}/{device.device_address}"
+
+    def _push(self, due_at: float, message_kind: int, device: VirtualDevice) -> None:
+        self._schedule_counter += 1
+        heapq.heappush(self._schedule, (due_at, self._schedule_counter, message_kind, device))
+        self._schedule_updated.set()
+
+    def _send(self, topic: str, payload: bytes) -> None:
+        if self.faults.drop_rate and self.rng.random() < self.faults.drop_rate:
+            self.dropped_messages += 1
+            return
+        self.sent_messages += 1
+        self._client.deliver(topic, payload)
+
+    def send_heartbeat(self, device: VirtualDevice) -> None:
+        """
+        Publish a heartbeat of the device to its 'connected' topic.
+
+        :param device: The virtual device
+        :return: None
+        """
+        self._send(self._topic("connected", device), b"on\n")
+
+    def send_status(self, device: VirtualDevice) -> None:
+        """
+        Publish the device's current status to its 'status' topic.
+
+        :param device: The virtual device
+        :return: None
+        """
+        status_bytes = device.status_bytes()
+        if self.faults.malformed_rate and self.rng.random() < self.faults.malformed_rate:
+            self.malformed_messages += 1
+            status_bytes = status_bytes[:-1] if self.rng.random() < 0.5 else status_bytes + b"\x00"
+        self._send(self._topic("status", device), status_bytes.hex(" ").upper().encode("ascii") + b"\n")
+
+    def _on_publish(self, topic: str, payload: Any) -> None:
+        """
+        Pass the message published by the library to the virtual device if it is a command.
+
+        :param topic: The topic of the message
+        :param payload: The payload of the message
+        :return: None
+        """
+        parts = topic.split("/")
+        if len(parts) != 5 or parts[1] != "set" or parts[2] != self._topic_mac_address:
+            return
+        device = self._devices.get((parts[3], parts[4]))
+        if device is None:
+            return
+
+        self.received_commands += 1
+        raw_payload = payload.decode("ascii") if isinstance(payload, (bytes, bytearray)) else str(payload)
+        data = bytes.fromhex(raw_payload)
+        if device.is_test_communication(data):
+            respond = self.send_heartbeat
+        elif device.apply_command(data):
+            respond = self.send_status
+        else:
+            logger.debug("Virtual device %s ignored the command '%s'", topic, raw_payload)
+            return
+
+        min_delay_sec, max_delay_sec = self.faults.response_delay_sec
+        delay_sec = self.rng.uniform(min_delay_sec, max_delay_sec) if max_delay_sec else 0.0
+        if delay_sec > 0:
+            asyncio.get_running_loop().call_later(delay_sec, respond, device)
+        else:
+            asyncio.get_running_loop().call_soon(respond, device)
+
+    async def _run(self) -> None:
+        """
+        A task for sending the periodic heartbeats and status messages of all the virtual devices.
+
+        :return: None
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                if not self._schedule:
+                    self._schedule_updated.clear()
+                    await self._schedule_updated.wait()
+                    continue
+
+                delay = self._schedule[0][0] - loop.time()
+                if delay > 0:
+                    self._schedule_updated.clear()
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(self._schedule_updated.wait(), delay)
+                    continue
+
+                self._send_due_messages(loop.time())
+                # Let the listeners process the messages
+                await asyncio.sleep(0)
+            except asyncio.CancelledError:
+                logger.warning("Task cancelled. Stopped simulating the devices")
+                break
+
+    def _send_due_messages(self, now: float) -> None:
+        """
+        Send the periodic messages due by the given moment and schedule the next ones.
+
+        :param now: The current event loop time
+        :return: None
+        """
+        while self._schedule and self._schedule[0][0] <= now:
+            _, _, message_kind, device = heapq.heappop(self._schedule)
+            if message_kind == _HEARTBEAT:
+                assert self.heartbeat_interval_sec is not None
+                self.send_heartbeat(device)
+                self._push(now + self.heartbeat_interval_sec, _HEARTBEAT, device)
+            else:
+                assert self.status_interval_sec is not None
+                device.evolve()
+                self.send_status(device)
+                self._push(now + self.status_interval_sec, _STATUS, device)
@@ -0,0 +1,342 @@
+import asyncio
+import mmap
+import struct
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import TYPE_CHECKING, BinaryIO, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple, Type, Union
+
+from ._logging import logger
+from .GatewayRouter import GatewayRouter
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .AbstractDeviceInterface import AbstractDeviceInterface
+
+LOG_MAGIC = b"INELSLG1"
+TOPIC_KINDS = ("connected", "status", "set")
+_TOPIC_KIND_CODES = {topic_kind: code for code, topic_kind in enumerate(TOPIC_KINDS)}
+# Set in the topic kind byte if the payload was converted from the ASCII hex text to binary
+_HEX_FLAG = 0x80
+# The topic kind byte of the marker written by every recorder opening the log
+_SESSION_CODE = 0x7F
+SESSION_TOPIC_KIND = "session"
+
+# Wall clock timestamp, topic kind and flags, device type (2 ASCII chars), device address (3 bytes), payload length
+_RECORD_HEADER = struct.Struct("<dB2s3sH")
+
+
+class TrafficRecord(NamedTuple):
+    """A single message of the recorded traffic"""
+
+    timestamp: float
+    topic_kind: str
+    device_type: str
+    device_address: str
+    payload: bytes
+
+
+def _encode_payload(payload: bytes) -> Tuple[int, bytes]:
+    """
+    Convert the ASCII hex text payload to binary if possible.
+
+    :param payload: The raw message payload
+    :return: The flags to store and the payload to store
+    """
+    try:
+        return _HEX_FLAG, bytes.fromhex(payload.decode("ascii"))
+    except ValueError:
+        return 0, payload
+
+
+def _decode_payload(flags: int, stored_payload: bytes) -> bytes:
+    """
+    Restore the message payload. The payloads converted from the ASCII hex text are restored
+    in the canonical form ('0A 1B'), which the devices decode the same way as the original.
+
+    :param flags: The stored flags
+    :param stored_payload: The stored payload
+    :return: The message payload
+    """
+    if flags & _HEX_FLAG:
+        return stored_payload.hex(" ").upper().encode("ascii")
+    return stored_payload
+
+
+class TrafficRecorder:
+    """
+    An append-only binary log of the messages received from and sent to the devices.
+
+    Every record holds the wall clock timestamp, the topic kind, the device type and address and the payload.
+    The hex payloads are stored as binary, which takes about half the size of their ASCII form.
+
+    A log can be appended to by many runs, thus every recorder starts its records with a session marker.
+    The replay restarts its clock at every marker, so the time between the runs is not replayed.
+
+    Example:
+        with TrafficRecorder("traffic.bin") as recorder:
+            recorder.start()  # Record the messages of all the devices
+            await asyncio.sleep(3600)
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :param path: The path of the log file. New records are appended to an existing log
+        """
+        self.path: str = path
+        self.records_written: int = 0
+        self.bytes_written: int = 0
+
+        log_path = Path(path)
+        if log_path.exists() and log_path.stat().st_size:
+            with log_path.open("rb") as existing_file:
+                assert existing_file.read(len(LOG_MAGIC)) == LOG_MAGIC, f"File {path} is not a traffic log"
+
+        self._file: BinaryIO = log_path.open("ab")
+        if self._file.tell() == 0:
+            self._file.write(LOG_MAGIC)
+        self._file.write(_RECORD_HEADER.pack(time.time(), _SESSION_CODE, b"\0\0", b"\0\0\0", 0))
+
+    def record(self, topic_kind: str, device_type: str, device_address: str, payload: bytes) -> None:
+        """
+        Append a message to the log.
+
+        :param topic_kind: The kind of the topic: 'connected', 'status' or 'set'
+        :param device_type: The device type, e.g. '05'
+        :param device_address: The device address, e.g. '01207D'
+        :param payload: The raw message payload
+        :return: None
+        """
+        flags, stored_payload = _encode_payload(payload)
+        record_header = _RECORD_HEADER.pack(
+            time.time(),
+            _TOPIC_KIND_CODES[topic_kind] | flags,
+            device_type.encode("ascii"),
+            bytes.fromhex(device_address),
+            len(stored_payload),
+        )
+        self._file.write(record_header)
+        self._file.write(stored_payload)
+        self.records_written += 1
+        self.bytes_written += len(record_header) + len(stored_payload)
+
+    def attach(self, device: "AbstractDeviceInterface") -> None:
+        """
+        Record the messages of the device.
+
+        :param device: The device to record the messages of
+        :return: None
+        """
+        device._traffic_recorder = self
+
+    def detach(self, device: "AbstractDeviceInterface") -> None:
+        device._traffic_recorder = None
+
+    def start(self) -> None:
+        """
+        Record the messages of all the devices, except for the ones attached to another recorder.
+
+        :return: None
+        """
+        from .AbstractDeviceInterface import AbstractDeviceInterface
+
+        AbstractDeviceInterface._traffic_recorder = self
+
+    def stop(self) -> None:
+        """
+        Stop recording the messages of all the devices. The devices attached with 'attach()' are still recorded.
+
+        :return: None
+        """
+        from .AbstractDeviceInterface import AbstractDeviceInterface
+
+        if AbstractDeviceInterface._traffic_recorder is self:
+            AbstractDeviceInterface._traffic_recorder = None
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        """
+        Stop recording and close the log file.
+
+        :return: None
+        """
+        self.stop()
+        self._file.close()
+        logger.info(f"Recorded {self.records_written} messages ({self.bytes_written} bytes) to {self.path}")
+
+    def __enter__(self) -> "TrafficRecorder":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+class TrafficReplayer:
+    """
+    A reader of the traffic logs written by TrafficRecorder, which feeds the recorded messages
+    back into the library at the original speed, faster or as fast as possible.
+
+    The log is memory-mapped by default, so even the multi-gigabyte logs are scanned without being loaded
+    into memory.
+
+    Example:
+        replayer = TrafficReplayer("traffic.bin")
+        await replayer.replay(router, speed=10)
+    """
+
+    def __init__(self, path: str, use_mmap: bool = True) -> None:
+        """
+        :param path: The path of the log file
+        :param use_mmap: Whether to memory-map the log file instead of reading it. Defaults to True
+        """
+        self.path: str = path
+        self.use_mmap: bool = use_mmap
+
+    def __iter__(self) -> Iterator[TrafficRecord]:
+        return self.records()
+
+    def records(self, include_sessions: bool = False) -> Iterator[TrafficRecord]:
+        """
+        Read the records of the log one by one.
+
+        :param include_sessions: Whether to yield the session markers as well, as records with the 'session'
+            topic kind, the timestamp of the recording start and no device or payload. Defaults to False
+        :return: An iterator of the recorded messages
+        """
+        records = self._records()
+        if include_sessions:
+            return records
+        return (record for record in records if record.topic_kind != SESSION_TOPIC_KIND)
+
+    def _records(self) -> Iterator[TrafficRecord]:
+        with Path(self.path).open("rb") as log_file:
+            assert log_file.read(len(LOG_MAGIC)) == LOG_MAGIC, f"File {self.path} is not a traffic log"
+            if not self.use_mmap:
+                yield from self._read_records(log_file)
+                return
+
+            log_file.seek(0, 2)
+            if log_file.tell() == len(LOG_MAGIC):
+                return
+            with mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as log_map:
+                yield from self._scan_records(log_map)
+
+    @staticmethod
+    def _record(header: Tuple[float, int, bytes, bytes, int], stored_payload: bytes) -> TrafficRecord:
+        timestamp, topic_kind_code, device_type, device_address, _ = header
+        if topic_kind_code == _SESSION_CODE:
+            return TrafficRecord(
+                timestamp=timestamp, topic_kind=SESSION_TOPIC_KIND, device_type="", device_address="", payload=b""
+            )
+        return TrafficRecord(
+            timestamp=timestamp,
+            topic_kind=TOPIC_KINDS[topic_kind_code & ~_HEX_FLAG],
+            device_type=device_type.decode("ascii"),
+            device_address=device_address.hex().upper(),
+            payload=_decode_payload(topic_kind_code, stored_payload),
+        )
+
+    def _scan_records(self, log_map: mmap.mmap) -> Iterator[TrafficRecord]:
+        offset = len(LOG_MAGIC)
+        size = len(log_map)
+        while offset + _RECORD_HEADER.size <= size:
+            header = _RECORD_HEADER.unpack_from(log_map, offset)
+            offset += _RECORD_HEADER.size
+            payload_end = offset + header[-1]
+            if payload_end > size:
+                logger.warning(f"Traffic log {self.path} ends with an incomplete record")
+                return
+            yield self._record(header, log_map[offset:payload_end])
+            offset = payload_end
+
+    def _read_records(self, log_file: BinaryIO) -> Iterator[TrafficRecord]:
+        while True:
+            raw_header = log_file.read(_RECORD_HEADER.size)
+            if len(raw_header) < _RECORD_HEADER.size:
+                return
+            header = _RECORD_HEADER.unpack(raw_header)
+            stored_payload = log_file.read(header[-1])
+            if len(stored_payload) < header[-1]:
+                logger.warning(f"Traffic log {self.path} ends with an incomplete record")
+                return
+            yield self._record(header, stored_payload)
+
+    async def replay(
+        self,
+        target: Union[GatewayRouter, Iterable["AbstractDeviceInterface"]],
+        speed: Optional[float] = 1.0,
+    ) -> int:
+        """
+        Feed the recorded 'connected' and 'status' messages to the devices. The 'set' messages are skipped.
+        The replay clock restarts at every recording session, so the pauses between the sessions are skipped too.
+
+        :param target: A gateway router to dispatch the messages with or the devices to pass the messages to
+        :param speed: The replay speed relative to the recording, e.g. 10 for 10x. None replays
+            the messages as fast as possible. Defaults to 1.0
+        :return: The number of messages delivered to the devices
+        """
+        assert speed is None or speed > 0, "Replay speed must be greater than zero"
+
+        deliver: Callable[[TrafficRecord], bool]
+        if isinstance(target, GatewayRouter):
+            router = target
+            topic_prefix = f"inels/{{}}/{router.mac_address.replace(':', '')}/"
+
+            def route(record: TrafficRecord) -> bool:
+                topic = f"{topic_prefix.format(record.topic_kind)}{record.device_type}/{record.device_address}"
+                return router.dispatch(topic, record.payload)
+
+            deliver = route
+
+        else:
+            devices: Dict[Tuple[str, str], "AbstractDeviceInterface"] = {
+                (device.device_type, device.device_address): device for device in target
+            }
+
+            def call_back(record: TrafficRecord) -> bool:
+                device = devices.get((record.device_type, record.device_address))
+                callback = getattr(device, f"_{record.topic_kind}_callback", None)
+                if callback is None:
+                    return False
+                try:
+                    callback(record.payload)
+                except Exception as e:
+                    logger.error(
+                        f"Failed to process a replayed message of the device {record.device_type}:"
+                        f"{record.device_address}: {e}"
+                    )
+                return True
+
+            deliver = call_back
+
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        first_timestamp: Optional[float] = None
+        delivered = 0
+        for i, record in enumerate(self.records(include_sessions=True)):
+            if record.topic_kind == SESSION_TOPIC_KIND:
+                first_timestamp = None
+                continue
+            if record.topic_kind == "set":
+                continue
+
+            if speed is None:
+                # Let the other tasks run every now and then
+                if i % 1000 == 0:
+                    await asyncio.sleep(0)
+            else:
+                if first_timestamp is None:
+                    started_at = loop.time()
+                    first_timestamp = record.timestamp
+                delay = started_at + (record.timestamp - first_timestamp) / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            delivered += deliver(record)
+        return delivered
@@ -1,4 +1,6 @@
-from typing import List
+from typing import List, Optional
+
+from .StatusDecoder import StatusDataType
 
 
 def extract_bits(byte_data: int, target_len: int = 8) -> List[int]:
@@ -16,3 +18,24 @@ def extract_bits(byte_data: int, target_len: int = 8) -> List[int]:
         leading_bits = [0 for _ in range(target_len - len(bits))]
         bits = leading_bits + bits
     return bits
+
+
+def diff_status(previous_status: Optional[StatusDataType], current_status: StatusDataType) -> StatusDataType:
+    """
+    Get the status fields that have changed.
+
+    :param previous_status: The previous device status or None if it is unknown.
+    :param current_status: The current device status.
+    :return: A dict containing only the fields of the current status that differ from the previous one.
+        All the fields are returned if the previous status is unknown.
+    """
+    if previous_status is None:
+        return dict(current_status)
+    if previous_status == current_status:
+        # Status views of the same raw bytes compare equal without being decoded
+        return {}
+    return {
+        key: value
+        for key, value in current_status.items()
+        if key not in previous_status or previous_status[key] != value
+    }